@@ -1,44 +1,401 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+import asyncio
+import json
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from ..models.db import get_db
-from ..models.schemas import OHLCV, Signal, Trade, Portfolio
+from ..models.schemas import OHLCV, Signal, Trade, Portfolio, SweepRequest, WalkForwardRequest, BatchBacktestRequest, PortfolioBacktestRequest, SignalScanRequest, ScreenRequest, OptimizeRequest, Watchlist, AlertRule
 from ..services.data_service import DataService
+from ..services.market_data_fetcher import market_data
+from ..services.cache_service import response_cache, ttl_for
+from ..services.resample_service import resample_cache
+from ..services.serialization import FORMATS, encode_table, negotiate
+from ..services.metrics import timed
 from ..services.indicator_service import IndicatorService
 from ..services.signal_service import SignalService
 from ..services.backtest_service import BacktestService
+from ..services.backtest_engine import BacktestEngine
+from ..services.walk_forward_service import WalkForwardService
 from ..services.portfolio_service import PortfolioService
+from ..services.valuation_service import ValuationService
+from ..services.ledger_service import LedgerService
+from ..services.batch_service import BatchBacktestService
+from ..services.alert_service import AlertService, alert_engine
+from ..services.stream_service import Subscriber, stream_hub
+from ..services.screener_service import screener
+from ..services.risk_service import RISK_BENCHMARK, MC_SIMULATIONS, RiskService
 
 router = APIRouter()
 
+def _chart_columns(data) -> Dict[str, np.ndarray]:
+    """Bars plus the chart's SMA_20/SMA_50/RSI overlays, as parallel arrays (the OHLCV fields)."""
+    indicators = IndicatorService.compute(data, ["SMA_20", "SMA_50", "RSI_14"])
+    return {**data.columns(), "SMA_20": indicators["SMA_20"], "SMA_50": indicators["SMA_50"], "RSI": indicators["RSI_14"]}
+
+@timed("encode")
+def _render_json(content) -> bytes:
+    return json.dumps(jsonable_encoder(content)).encode()
+
+def _negotiate(request: Request, format: Optional[str]) -> str:
+    try:
+        return negotiate(request.headers.get("accept"), format)
+    except ValueError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+def _respond(body: bytes, fmt: str) -> Response:
+    return Response(content=body, media_type=FORMATS[fmt], headers={"Vary": "Accept"})
+
 @router.get("/data/{symbol}", response_model=List[OHLCV])
-def get_data(symbol: str, period: str = "1y"):
-    data = DataService.fetch_history(symbol, period=period)
-    if not data:
-        raise HTTPException(status_code=404, detail="Data not found")
-    return data
+async def get_data(symbol: str, request: Request, period: str = "1y", interval: str = "1d", format: Optional[str] = None):
+    """
+    Bars with chart overlays at `interval` (1m/5m/15m/30m/1h/1d/1wk/1mo/3mo).
+    Rows of OHLCV by default; `format` or the Accept header selects columnar
+    JSON, MessagePack or Arrow IPC instead.
+    """
+    fmt = _negotiate(request, format)
+    try:
+        interval = DataService.check_interval(interval, period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def render() -> bytes:
+        data = await market_data.fetch_history(symbol, period=period, interval=interval)
+        if not data:
+            raise HTTPException(status_code=404, detail="Data not found")
+        return await run_in_threadpool(lambda: encode_table(_chart_columns(data), fmt))
+
+    body = await response_cache.get_or_compute(("data", symbol, period, interval, fmt), ttl_for(interval), render)
+    return _respond(body, fmt)
 
 @router.get("/search")
-def search_symbols(query: str):
-    return DataService.search_symbols(query)
+def search_symbols(query: str, limit: int = 20):
+    return DataService.search_symbols(query, limit=limit)
 
 @router.post("/backtest")
-def run_backtest(symbol: str, initial_capital: float = 10000.0):
-    data = DataService.fetch_history(symbol, period="2y") # Fetch enough data
-    if not data:
-        raise HTTPException(status_code=404, detail="Data not found")
-    
-    result = BacktestService.run_sma_cross_backtest(data, initial_capital=initial_capital)
-    if "error" in result:
-        raise HTTPException(status_code=400, detail=result["error"])
-    return result
+async def run_backtest(symbol: str, request: Request, initial_capital: float = 10000.0, format: Optional[str] = None):
+    """
+    Metrics and equity curve. Non-JSON formats carry the equity curve as
+    date/equity columns with the metrics alongside.
+    """
+    fmt = _negotiate(request, format)
+
+    async def render() -> bytes:
+        data = await market_data.fetch_history(symbol, period="2y") # Fetch enough data
+        if not data:
+            raise HTTPException(status_code=404, detail="Data not found")
+
+        result = await run_in_threadpool(BacktestService.run_sma_cross_backtest, data, initial_capital=initial_capital)
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        if fmt == "json":
+            return _render_json(result)
+        curve = result.pop("equity_curve")
+        columns = {
+            "date": np.array(list(curve), dtype="datetime64[ns]").view(np.int64),
+            "equity": np.fromiter(curve.values(), dtype=np.float64, count=len(curve)),
+        }
+        return encode_table(columns, fmt, meta=result)
+
+    key = ("backtest", symbol, "2y", "1d", "SMA_CROSS", 50, 200, initial_capital, fmt)
+    body = await response_cache.get_or_compute(key, ttl_for("1d"), render)
+    return _respond(body, fmt)
+
+@router.post("/backtest/sweep")
+def run_backtest_sweep(request: SweepRequest):
+    rows = []
+    for symbol in request.symbols:
+        data = DataService.fetch_history(symbol, period=request.period)
+        rows.extend(BacktestService.run_sma_cross_sweep(
+            data, request.short_windows, request.long_windows, initial_capital=request.initial_capital
+        ))
+    if not rows:
+        raise HTTPException(status_code=400, detail="No valid window pairs for the available data")
+
+    rows.sort(key=lambda r: r["sharpe_ratio"], reverse=True)
+    return {"evaluated": len(rows), "results": rows[:request.top]}
+
+@router.post("/backtest/walk-forward")
+def run_walk_forward(request: WalkForwardRequest):
+    data = DataService.fetch_history(request.symbol, period=request.period)
+    try:
+        return WalkForwardService.run_sma_cross(
+            data, request.short_windows, request.long_windows,
+            train_bars=request.train_bars,
+            test_bars=request.test_bars,
+            mode=request.mode,
+            objective=request.objective,
+            initial_capital=request.initial_capital,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/backtest/batch")
+def run_backtest_batch(request: BatchBacktestRequest):
+    symbols = request.symbols or DataService.list_symbols()
+    results = BatchBacktestService.run(
+        symbols,
+        period=request.period,
+        initial_capital=request.initial_capital,
+        short_window=request.short_window,
+        long_window=request.long_window,
+        timeout=request.timeout,
+    )
+
+    if not request.stream:
+        results = list(results)
+        return {"aggregate": BatchBacktestService.aggregate(results), "results": results}
+
+    def ndjson():
+        finished = []
+        for result in results:
+            finished.append(result)
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"aggregate": BatchBacktestService.aggregate(finished)}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.post("/backtest/portfolio")
+async def run_portfolio_backtest(request: PortfolioBacktestRequest):
+    series = await market_data.fetch_many(request.symbols, period=request.period)
+    try:
+        return await run_in_threadpool(
+            BacktestEngine.run, series, request.strategy,
+            initial_capital=request.initial_capital,
+            commission=request.commission,
+            min_commission=request.min_commission,
+            slippage=request.slippage,
+            lot_size=request.lot_size,
+            rebalance=request.rebalance,
+            include_trades=request.include_trades,
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/signals")
+async def scan_signals(request: SignalScanRequest):
+    symbols = request.symbols or DataService.list_symbols()
+    series = await market_data.fetch_many(symbols, period=request.period)
+    since = None
+    if request.since is not None:
+        # Bar dates are tz-naive exchange time.
+        since = int(np.datetime64(request.since.replace(tzinfo=None), "ns").astype(np.int64))
+    try:
+        table = await run_in_threadpool(SignalService.scan, [series[s] for s in symbols], request.strategies, since)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "count": len(table["date"]),
+        "date": np.datetime_as_string(table["date"].view("datetime64[ns]"), unit="s").tolist(),
+        **{col: table[col].tolist() for col in ("symbol", "signal_type", "price", "strategy")},
+    }
+
+@router.post("/screener")
+def screen_symbols(request: ScreenRequest):
+    """
+    Filter and rank the symbol universe on its latest bars and indicators, e.g.
+    filter "RSI_14 < 30 and close > SMA_200", sort "ROC_20". Returns columns of
+    symbol, date, close, each referenced field and the sort score.
+    """
+    if request.limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    try:
+        return screener.screen(request.filter, request.sort, request.descending, request.limit,
+                               request.fields, request.symbols)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/portfolio", response_model=Portfolio)
 def get_portfolio(db: Session = Depends(get_db)):
     service = PortfolioService(db)
     return service.get_portfolio()
 
+def _shrinkage(value: Optional[str]):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+@router.get("/portfolio/risk")
+def get_portfolio_risk(period: str = "2y", window: int = 252, confidence: float = 0.95, horizon: int = 1,
+                       shrinkage: Optional[str] = "ledoit_wolf", simulations: int = MC_SIMULATIONS,
+                       benchmark: str = RISK_BENCHMARK, include_matrix: bool = False,
+                       db: Session = Depends(get_db)):
+    """
+    Risk of the current holdings: volatility, historical and Monte Carlo VaR/CVaR
+    (currency losses over `horizon` bars), beta against `benchmark`, risk
+    contributions and rolling volatility/correlation.
+    """
+    try:
+        return RiskService(db).portfolio_risk(period, window=window, confidence=confidence, horizon=horizon,
+                                              shrinkage=_shrinkage(shrinkage), simulations=simulations,
+                                              benchmark=benchmark, include_matrix=include_matrix)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/portfolio/optimize")
+def optimize_portfolio(request: OptimizeRequest, db: Session = Depends(get_db)):
+    try:
+        return RiskService(db).optimize(request.symbols, request.period, method=request.method, window=request.window,
+                                        shrinkage=_shrinkage(request.shrinkage), risk_free_rate=request.risk_free_rate,
+                                        frontier_points=request.frontier_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/portfolio/trades", response_model=List[Trade])
+def record_trades(trades: List[Trade], db: Session = Depends(get_db)):
+    try:
+        return LedgerService(db).record(trades)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/portfolio/trades/import")
+async def import_trades(request: Request, db: Session = Depends(get_db)):
+    """Bulk import a CSV body (date, symbol, trade_type, price, quantity) in one transaction."""
+    text = (await request.body()).decode("utf-8-sig")
+    try:
+        return await run_in_threadpool(LedgerService(db).import_csv, text)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/portfolio/cash")
+def deposit_cash(amount: float, db: Session = Depends(get_db)):
+    return {"cash": LedgerService(db).deposit(amount)}
+
+@router.post("/portfolio/rebuild")
+def rebuild_portfolio(db: Session = Depends(get_db)):
+    try:
+        return LedgerService(db).rebuild()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/portfolio/snapshot", response_model=Portfolio)
+def snapshot_portfolio(db: Session = Depends(get_db)):
+    return ValuationService(db).snapshot()
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    return {**response_cache.stats(), "resample": resample_cache.stats()}
+
 @router.get("/alerts")
-def get_alerts():
-    # Placeholder for alerts
-    return {"alerts": []}
+def get_alerts(limit: int = 50, db: Session = Depends(get_db)):
+    return {"alerts": AlertService(db).recent_alerts(limit=limit)}
+
+@router.get("/alerts/stats")
+def get_alert_stats():
+    return alert_engine.stats()
+
+@router.post("/alerts/check")
+def check_alerts_now(db: Session = Depends(get_db)):
+    stats = alert_engine.tick(db)
+    if stats is None:
+        raise HTTPException(status_code=409, detail="An alert check is already running")
+    return stats
+
+@router.get("/alerts/rules", response_model=List[AlertRule])
+def list_alert_rules(db: Session = Depends(get_db)):
+    return AlertService(db).list_rules()
+
+@router.post("/alerts/rules", response_model=AlertRule)
+def create_alert_rule(rule: AlertRule, db: Session = Depends(get_db)):
+    try:
+        return AlertService(db).create_rule(rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/alerts/rules/{rule_id}")
+def delete_alert_rule(rule_id: int, db: Session = Depends(get_db)):
+    AlertService(db).delete_rule(rule_id)
+    return {"deleted": rule_id}
+
+@router.get("/watchlists", response_model=List[Watchlist])
+def list_watchlists(db: Session = Depends(get_db)):
+    return AlertService(db).list_watchlists()
+
+@router.post("/watchlists", response_model=Watchlist)
+def create_watchlist(watchlist: Watchlist, db: Session = Depends(get_db)):
+    return AlertService(db).create_watchlist(watchlist)
+
+@router.post("/watchlists/{watchlist_id}/symbols", response_model=Watchlist)
+def add_watchlist_symbol(watchlist_id: int, symbol: str, db: Session = Depends(get_db)):
+    service = AlertService(db)
+    if not service.get_watchlist(watchlist_id):
+        raise HTTPException(status_code=404, detail="Watchlist not found")
+    service.add_symbol(watchlist_id, symbol)
+    return service.get_watchlist(watchlist_id)
+
+@router.delete("/watchlists/{watchlist_id}/symbols/{symbol}", response_model=Watchlist)
+def remove_watchlist_symbol(watchlist_id: int, symbol: str, db: Session = Depends(get_db)):
+    service = AlertService(db)
+    if not service.get_watchlist(watchlist_id):
+        raise HTTPException(status_code=404, detail="Watchlist not found")
+    service.remove_symbol(watchlist_id, symbol)
+    return service.get_watchlist(watchlist_id)
+
+def _symbol_list(symbols: str) -> List[str]:
+    return [s.strip().upper() for s in symbols.split(",") if s.strip()]
+
+@router.websocket("/stream")
+async def stream_ws(websocket: WebSocket, symbols: str = ""):
+    """
+    Live bars and alerts. Subscribe with ?symbols=AAPL,MSFT or by sending
+    {"action": "subscribe" | "unsubscribe", "symbols": [...]}; each symbol gets a
+    snapshot message first, then bar/alert deltas.
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+
+    async def receive():
+        while True:
+            message = await websocket.receive_json()
+            requested = [s.upper() for s in message.get("symbols", [])]
+            if message.get("action") == "unsubscribe":
+                stream_hub.unsubscribe(subscriber, requested)
+            else:
+                await stream_hub.subscribe(subscriber, requested)
+
+    async def send():
+        while not subscriber.closed:
+            for message in await subscriber.next_batch():
+                await websocket.send_json(message)
+        await websocket.close(code=1013, reason="Client too slow")
+
+    try:
+        await stream_hub.subscribe(subscriber, _symbol_list(symbols))
+        tasks = [asyncio.ensure_future(receive()), asyncio.ensure_future(send())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                raise error
+    finally:
+        stream_hub.unsubscribe(subscriber)
+
+@router.get("/stream/sse")
+async def stream_sse(symbols: str):
+    """Server-Sent Events variant of /stream for one fixed set of symbols."""
+    subscriber = Subscriber()
+    await stream_hub.subscribe(subscriber, _symbol_list(symbols))
+
+    async def events():
+        try:
+            while not subscriber.closed:
+                batch = await subscriber.next_batch(timeout=15)
+                if not batch:
+                    yield ": keep-alive\n\n"
+                for message in batch:
+                    yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            stream_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/stream/stats")
+def get_stream_stats():
+    return stream_hub.stats()
@@ -0,0 +1,90 @@
+from typing import Dict, List, Optional
+import numpy as np
+from .schemas import OHLCV
+
+
+class BarSeries:
+    """
+    Columnar OHLCV series backed by NumPy arrays.
+
+    This is what the services pass between each other. Dates are int64 nanoseconds
+    since the epoch (tz-naive), prices float64 and volume int64. Pydantic `OHLCV`
+    objects are only built at the API boundary via `to_ohlcv()`.
+    """
+
+    __slots__ = ("symbol", "interval", "date", "open", "high", "low", "close", "volume")
+
+    def __init__(self, date: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, volume: np.ndarray, symbol: str = "", interval: str = "1d"):
+        self.symbol = symbol
+        self.interval = interval
+        self.date = np.asarray(date, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.int64)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], symbol: str = "", interval: str = "1d") -> "BarSeries":
+        return cls(columns["date"], columns["open"], columns["high"], columns["low"],
+                   columns["close"], columns["volume"], symbol=symbol, interval=interval)
+
+    @classmethod
+    def from_ohlcv(cls, data: List[OHLCV], symbol: str = "", interval: str = "1d") -> "BarSeries":
+        data = sorted(data, key=lambda d: d.date)
+        return cls(
+            np.array([d.date for d in data], dtype="datetime64[ns]").astype(np.int64),
+            [d.open for d in data], [d.high for d in data], [d.low for d in data],
+            [d.close for d in data], [d.volume for d in data],
+            symbol=symbol, interval=interval,
+        )
+
+    @classmethod
+    def empty(cls, symbol: str = "", interval: str = "1d") -> "BarSeries":
+        return cls(np.empty(0, np.int64), np.empty(0), np.empty(0), np.empty(0), np.empty(0),
+                   np.empty(0, np.int64), symbol=symbol, interval=interval)
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def __getitem__(self, key: slice) -> "BarSeries":
+        if not isinstance(key, slice):
+            raise TypeError("BarSeries only supports slicing")
+        return BarSeries(self.date[key], self.open[key], self.high[key], self.low[key],
+                         self.close[key], self.volume[key], symbol=self.symbol, interval=self.interval)
+
+    def since(self, start_ns: int) -> "BarSeries":
+        """Bars at or after `start_ns` (binary search on the sorted dates)."""
+        return self[int(np.searchsorted(self.date, start_ns, side="left")):]
+
+    @property
+    def datetimes(self) -> np.ndarray:
+        return self.date.view("datetime64[ns]")
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {"date": self.date, "open": self.open, "high": self.high, "low": self.low,
+                "close": self.close, "volume": self.volume}
+
+    def to_dataframe(self):
+        """DataFrame indexed by date, same layout as `IndicatorService.to_dataframe` used to build."""
+        import pandas as pd
+        return pd.DataFrame({
+            "open": self.open, "high": self.high, "low": self.low,
+            "close": self.close, "volume": self.volume,
+        }, index=pd.DatetimeIndex(self.datetimes, name="date"))
+
+    def to_ohlcv(self, indicators: Optional[Dict[str, np.ndarray]] = None) -> List[OHLCV]:
+        """
+        Build the pydantic models for an API response. `indicators` maps OHLCV field
+        names (SMA_20, SMA_50, RSI) to arrays aligned with the bars; NaN becomes None.
+        """
+        fields = {
+            "date": self.datetimes.astype("datetime64[us]").tolist(),
+            "open": self.open.tolist(), "high": self.high.tolist(), "low": self.low.tolist(),
+            "close": self.close.tolist(), "volume": self.volume.tolist(),
+        }
+        for name, values in (indicators or {}).items():
+            fields[name] = [v if v == v else None for v in values.tolist()]
+        names = list(fields)
+        return [OHLCV(**dict(zip(names, row))) for row in zip(*fields.values())]
@@ -0,0 +1,25 @@
+import os
+from typing import Optional
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+
+def upgrade_database(url: Optional[str] = None, revision: str = "head") -> None:
+    """Apply pending schema migrations in-process (same as `alembic upgrade head`)."""
+    from alembic import command
+    from alembic.config import Config
+    config = Config(ALEMBIC_INI)
+    config.attributes["embedded"] = True
+    if url:
+        config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    command.upgrade(config, revision)
+
+
+def downgrade_database(url: Optional[str] = None, revision: str = "base") -> None:
+    from alembic import command
+    from alembic.config import Config
+    config = Config(ALEMBIC_INI)
+    config.attributes["embedded"] = True
+    if url:
+        config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    command.downgrade(config, revision)
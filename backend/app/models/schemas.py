@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 
 class OHLCV(BaseModel):
     date: datetime
@@ -9,6 +9,9 @@ class OHLCV(BaseModel):
     low: float
     close: float
     volume: int
+    SMA_20: Optional[float] = None
+    SMA_50: Optional[float] = None
+    RSI: Optional[float] = None
 
 class Signal(BaseModel):
     date: datetime
@@ -26,7 +29,109 @@ class Trade(BaseModel):
     quantity: int
     pnl: Optional[float] = 0.0
 
+class Position(BaseModel):
+    symbol: str
+    quantity: int
+    price: Optional[float] = None  # None when no quote is available
+    market_value: Optional[float] = None
+    cost_basis: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+    weight: Optional[float] = None  # Share of total_value
+
 class Portfolio(BaseModel):
     cash: float
     holdings: Dict[str, int]  # Symbol -> Quantity
     total_value: float
+    market_value: float = 0.0
+    unrealized_pnl: float = 0.0
+    realized_pnl: float = 0.0
+    positions: List[Position] = []
+    unpriced: List[str] = []  # Held symbols left out of total_value for lack of a quote
+    as_of: Optional[datetime] = None
+
+class SweepRequest(BaseModel):
+    symbols: List[str]
+    short_windows: List[int] = [10, 20, 30, 40, 50]
+    long_windows: List[int] = [100, 150, 200]
+    period: str = "2y"
+    initial_capital: float = 10000.0
+    top: int = 20  # Number of ranked rows returned
+
+class WalkForwardRequest(BaseModel):
+    symbol: str
+    short_windows: List[int] = [10, 20, 30, 40, 50]
+    long_windows: List[int] = [100, 150, 200]
+    period: str = "10y"
+    train_bars: int = 504
+    test_bars: int = 126
+    mode: str = "rolling"  # rolling | anchored
+    objective: str = "sharpe_ratio"
+    initial_capital: float = 10000.0
+
+class BatchBacktestRequest(BaseModel):
+    symbols: Optional[List[str]] = None  # Defaults to the whole symbol universe
+    period: str = "2y"
+    initial_capital: float = 10000.0
+    short_window: int = 50
+    long_window: int = 200
+    timeout: float = 30.0  # Seconds per symbol
+    stream: bool = False  # Stream NDJSON results as they finish
+
+class PortfolioBacktestRequest(BaseModel):
+    symbols: List[str]
+    strategy: Dict[str, Any] = {"name": "SMA_CROSS", "short_window": 50, "long_window": 200}
+    period: str = "5y"
+    initial_capital: float = 100000.0
+    commission: float = 0.001  # Fraction of notional per order
+    min_commission: float = 0.0
+    slippage: float = 0.0005  # Fraction of price, against the trade
+    lot_size: float = 1  # 0 allows fractional shares
+    rebalance: str = "signal"  # signal | daily | weekly | monthly
+    include_trades: bool = True
+
+class SignalScanRequest(BaseModel):
+    symbols: Optional[List[str]] = None  # Defaults to the whole symbol universe
+    strategies: List[Dict[str, Any]] = [{"name": "SMA_CROSS", "short_window": 50, "long_window": 200}]
+    period: str = "2y"
+    since: Optional[datetime] = None  # Only return events on or after this date
+
+class ScreenRequest(BaseModel):
+    filter: Optional[str] = None  # e.g. "RSI_14 < 30 and close > SMA_200"
+    sort: Optional[str] = None  # e.g. "ROC_20" (20-bar momentum)
+    descending: bool = True
+    limit: int = 50
+    fields: List[str] = []  # Extra fields to return per symbol
+    symbols: Optional[List[str]] = None  # Defaults to the whole symbol universe
+
+class OptimizeRequest(BaseModel):
+    symbols: Optional[List[str]] = None  # Defaults to the current holdings
+    method: str = "mean_variance"  # mean_variance | min_variance | risk_parity
+    period: str = "2y"
+    window: int = 252
+    shrinkage: Optional[str] = "ledoit_wolf"  # ledoit_wolf | none | a number in [0, 1]
+    risk_free_rate: float = 0.0
+    frontier_points: int = 20
+
+class Watchlist(BaseModel):
+    id: Optional[int] = None
+    name: str
+    symbols: List[str] = []
+
+class AlertRule(BaseModel):
+    id: Optional[int] = None
+    watchlist_id: Optional[int] = None
+    symbol: Optional[str] = None
+    indicator: str  # "close" or an indicator output, e.g. RSI_14
+    operator: str  # >, <, >=, <=, crosses_above, crosses_below
+    threshold: Optional[float] = None
+    compare_to: Optional[str] = None
+    enabled: bool = True
+
+class Alert(BaseModel):
+    id: int
+    rule_id: int
+    symbol: str
+    bar_date: datetime
+    value: float
+    message: str
+    created_at: datetime
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .db import Base
 
 class TradeSQL(Base):
     __tablename__ = "trades"
+    __table_args__ = (Index("ix_trades_symbol_date", "symbol", "date"),)
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime)
@@ -22,8 +23,67 @@ class HoldingSQL(Base):
 
 class PortfolioSnapshotSQL(Base):
     __tablename__ = "portfolio_snapshots"
+    __table_args__ = (Index("ix_portfolio_snapshots_date", "date"),)
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime, default=None)
     cash = Column(Float)
     total_value = Column(Float)
+
+class LotSQL(Base):
+    __tablename__ = "lots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String, index=True)
+    date = Column(DateTime)  # Date of the buy that opened the lot
+    price = Column(Float)  # Cost per share
+    quantity = Column(Integer)  # Still open
+
+class CashEntrySQL(Base):
+    __tablename__ = "cash_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(DateTime, index=True)
+    kind = Column(String)  # TRADE, DEPOSIT or WITHDRAWAL
+    amount = Column(Float)  # Signed: negative for buys and withdrawals
+    trade_id = Column(Integer, ForeignKey("trades.id"), nullable=True, index=True)
+    description = Column(String)
+
+class WatchlistSQL(Base):
+    __tablename__ = "watchlists"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+
+class WatchlistItemSQL(Base):
+    __tablename__ = "watchlist_items"
+    __table_args__ = (UniqueConstraint("watchlist_id", "symbol"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    watchlist_id = Column(Integer, ForeignKey("watchlists.id"), index=True)
+    symbol = Column(String, index=True)
+
+class AlertRuleSQL(Base):
+    __tablename__ = "alert_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    watchlist_id = Column(Integer, ForeignKey("watchlists.id"), nullable=True)  # Applies to every symbol in the watchlist
+    symbol = Column(String, nullable=True)  # ...or to a single symbol
+    indicator = Column(String)  # "close" or an indicator output, e.g. RSI_14, SMA_50, BB_20_2_upper
+    operator = Column(String)  # >, <, >=, <=, crosses_above, crosses_below
+    threshold = Column(Float, nullable=True)
+    compare_to = Column(String, nullable=True)  # Another indicator instead of a fixed threshold
+    enabled = Column(Boolean, default=True)
+
+class AlertSQL(Base):
+    __tablename__ = "alerts"
+    # One alert per rule, symbol and bar, however many ticks see the condition.
+    __table_args__ = (UniqueConstraint("rule_id", "symbol", "bar_date"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    rule_id = Column(Integer, ForeignKey("alert_rules.id"), index=True)
+    symbol = Column(String, index=True)
+    bar_date = Column(DateTime)
+    value = Column(Float)
+    message = Column(String)
+    created_at = Column(DateTime, index=True)
@@ -0,0 +1,287 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from ..models.sql_models import WatchlistSQL, WatchlistItemSQL, AlertRuleSQL, AlertSQL
+from ..models.schemas import Watchlist, AlertRule, Alert
+from ..models.bar_series import BarSeries
+from .data_service import DataService
+from .indicator_service import parse_spec
+from .streaming_indicators import STREAMING_INDICATORS, IndicatorState, save_states, load_states
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_STATE_PATH = os.getenv("INDICATOR_STATE_PATH", "./indicator_state.json")
+
+OPERATORS = (">", "<", ">=", "<=", "crosses_above", "crosses_below")
+_OUTPUT_SUFFIXES = ("_upper", "_lower", "_mid", "_signal", "_hist")
+
+
+def spec_for(feature: str) -> Optional[str]:
+    """Indicator spec that produces `feature` (BB_20_2_upper -> BB_20_2); None for close."""
+    if feature == "close":
+        return None
+    for suffix in _OUTPUT_SUFFIXES:
+        if feature.endswith(suffix):
+            return feature[:-len(suffix)]
+    return feature
+
+
+class AlertService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_watchlist(self, watchlist: Watchlist) -> Watchlist:
+        db_watchlist = WatchlistSQL(name=watchlist.name)
+        self.db.add(db_watchlist)
+        self.db.flush()
+        for symbol in dict.fromkeys(s.upper() for s in watchlist.symbols):
+            self.db.add(WatchlistItemSQL(watchlist_id=db_watchlist.id, symbol=symbol))
+        self.db.commit()
+        return self.get_watchlist(db_watchlist.id)
+
+    def get_watchlist(self, watchlist_id: int) -> Optional[Watchlist]:
+        db_watchlist = self.db.query(WatchlistSQL).filter(WatchlistSQL.id == watchlist_id).first()
+        if not db_watchlist:
+            return None
+        symbols = [s for (s,) in self.db.query(WatchlistItemSQL.symbol).filter(WatchlistItemSQL.watchlist_id == watchlist_id)]
+        return Watchlist(id=db_watchlist.id, name=db_watchlist.name, symbols=symbols)
+
+    def list_watchlists(self) -> List[Watchlist]:
+        members: Dict[int, List[str]] = {}
+        for watchlist_id, symbol in self.db.query(WatchlistItemSQL.watchlist_id, WatchlistItemSQL.symbol):
+            members.setdefault(watchlist_id, []).append(symbol)
+        return [Watchlist(id=w.id, name=w.name, symbols=members.get(w.id, [])) for w in self.db.query(WatchlistSQL).all()]
+
+    def add_symbol(self, watchlist_id: int, symbol: str) -> None:
+        symbol = symbol.upper()
+        exists = self.db.query(WatchlistItemSQL).filter(
+            WatchlistItemSQL.watchlist_id == watchlist_id, WatchlistItemSQL.symbol == symbol
+        ).first()
+        if not exists:
+            self.db.add(WatchlistItemSQL(watchlist_id=watchlist_id, symbol=symbol))
+            self.db.commit()
+
+    def remove_symbol(self, watchlist_id: int, symbol: str) -> None:
+        self.db.query(WatchlistItemSQL).filter(
+            WatchlistItemSQL.watchlist_id == watchlist_id, WatchlistItemSQL.symbol == symbol.upper()
+        ).delete()
+        self.db.commit()
+
+    def create_rule(self, rule: AlertRule) -> AlertRule:
+        if (rule.watchlist_id is None) == (rule.symbol is None):
+            raise ValueError("A rule needs exactly one of watchlist_id or symbol")
+        if rule.operator not in OPERATORS:
+            raise ValueError(f"Unknown operator: {rule.operator}")
+        if (rule.threshold is None) == (rule.compare_to is None):
+            raise ValueError("A rule needs exactly one of threshold or compare_to")
+        for feature in filter(None, (rule.indicator, rule.compare_to)):
+            spec = spec_for(feature)
+            if spec is not None and parse_spec(spec)[0] not in STREAMING_INDICATORS:
+                raise ValueError(f"Indicator not supported in alerts: {feature}")
+
+        db_rule = AlertRuleSQL(**rule.model_dump(exclude={"id"}))
+        if db_rule.symbol:
+            db_rule.symbol = db_rule.symbol.upper()
+        self.db.add(db_rule)
+        self.db.commit()
+        self.db.refresh(db_rule)
+        return AlertRule(id=db_rule.id, **rule.model_dump(exclude={"id", "symbol"}), symbol=db_rule.symbol)
+
+    def list_rules(self) -> List[AlertRule]:
+        return [
+            AlertRule(id=r.id, watchlist_id=r.watchlist_id, symbol=r.symbol, indicator=r.indicator, operator=r.operator,
+                      threshold=r.threshold, compare_to=r.compare_to, enabled=r.enabled)
+            for r in self.db.query(AlertRuleSQL).all()
+        ]
+
+    def delete_rule(self, rule_id: int) -> None:
+        self.db.query(AlertRuleSQL).filter(AlertRuleSQL.id == rule_id).delete()
+        self.db.commit()
+
+    def recent_alerts(self, limit: int = 50) -> List[Alert]:
+        rows = self.db.query(AlertSQL).order_by(AlertSQL.created_at.desc(), AlertSQL.id.desc()).limit(limit).all()
+        return [Alert(id=a.id, rule_id=a.rule_id, symbol=a.symbol, bar_date=a.bar_date, value=a.value,
+                      message=a.message, created_at=a.created_at) for a in rows]
+
+
+class AlertEngine:
+    """
+    Evaluates every enabled rule against every symbol it covers, once per tick.
+
+    Bars for all watched symbols are fetched in one batch; each symbol's indicator
+    state only advances over final bars it has not seen (warm-up replays history
+    once, then state is restored from INDICATOR_STATE_PATH after restarts), and
+    the latest bar is evaluated on top of it without being saved. All
+    (rule, symbol) pairs are then evaluated together as array operations, and
+    alerts already stored for the same rule, symbol and bar are not inserted again.
+    """
+
+    def __init__(self, state_path: str = INDICATOR_STATE_PATH, history_period: str = "1y"):
+        self.state_path = state_path
+        self.history_period = history_period
+        self.states: Optional[Dict[str, IndicatorState]] = None
+        self.current: Dict[str, Dict[str, float]] = {}
+        self.previous: Dict[str, Dict[str, float]] = {}
+        self.ticks = deque(maxlen=100)
+        # Called with the newly stored alert rows after each tick, in this process only:
+        # other workers see new alerts through the alerts table (see StreamHub).
+        self.listeners: List[Callable[[List[Dict]], None]] = []
+        self._lock = threading.Lock()
+
+    def tick(self, db: Session) -> Optional[Dict]:
+        if not self._lock.acquire(blocking=False):
+            logger.warning("Alert check skipped: previous tick still running")
+            return None
+        try:
+            return self._tick(db)
+        finally:
+            self._lock.release()
+
+    def _tick(self, db: Session) -> Dict:
+        started_at, started = datetime.now(), time.perf_counter()
+        if self.states is None:
+            self.states = load_states(self.state_path)
+
+        rules = db.query(AlertRuleSQL).filter(AlertRuleSQL.enabled == True).all()  # noqa: E712
+        members: Dict[int, List[str]] = {}
+        for watchlist_id, symbol in db.query(WatchlistItemSQL.watchlist_id, WatchlistItemSQL.symbol):
+            members.setdefault(watchlist_id, []).append(symbol)
+        rule_symbols = [[r.symbol] if r.symbol else members.get(r.watchlist_id, []) for r in rules]
+        symbols = sorted({s for syms in rule_symbols for s in syms})
+
+        features = sorted({f for r in rules for f in (r.indicator, r.compare_to) if f} | {"close"})
+        specs = sorted({spec_for(f) for f in features} - {None})
+
+        fetch_started = time.perf_counter()
+        series = DataService.fetch_many(symbols, period=self.history_period) if symbols else {}
+        fetch_time = time.perf_counter() - fetch_started
+
+        bar_dates = {}
+        for symbol in symbols:
+            bar_dates[symbol] = self._advance(symbol, series[symbol], specs)
+
+        fired = self._evaluate(rules, rule_symbols, symbols, features)
+        new_alerts = self._store(db, fired, bar_dates)
+        if new_alerts:
+            for listener in self.listeners:
+                try:
+                    listener(new_alerts)
+                except Exception:
+                    logger.exception("Alert listener failed")
+        if symbols:
+            save_states(self.state_path, self.states)
+
+        stats = {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "wall_time": time.perf_counter() - started,
+            "fetch_time": fetch_time,
+            "symbols": len(symbols),
+            "rules": len(rules),
+            "evaluations": sum(len(s) for s in rule_symbols),
+            "fired": len(fired),
+            "new_alerts": len(new_alerts),
+        }
+        self.ticks.append(stats)
+        logger.info(
+            f"Alert tick: {stats['evaluations']} rule evaluations over {stats['symbols']} symbols "
+            f"in {stats['wall_time']:.3f}s, {len(new_alerts)} new alerts"
+        )
+        return stats
+
+    def _advance(self, symbol: str, data: BarSeries, specs: List[str]) -> Optional[int]:
+        """
+        Bring the symbol's state up to the latest bar; return that bar's date.
+
+        The latest bar may still be forming (today's daily bar), so the saved state
+        only takes bars before it. The latest bar is evaluated on a copy every tick
+        and applied for good once a newer bar exists.
+        """
+        if len(data) == 0:
+            return None
+        last_date = int(data.date[-1])
+        state = self.states.get(symbol)
+        # A state already past the previous bar took in a bar that was not final.
+        stale = state is not None and state.last_date is not None and state.last_date >= last_date
+        if state is None or stale or sorted(state.indicators) != specs:
+            state = self.states[symbol] = IndicatorState(symbol, specs)
+
+        state.update_many(data[:-1])
+        prev_close = float(data.close[-2]) if len(data) > 1 else float("nan")
+        self.previous[symbol] = {**state.values(), "close": prev_close}
+        current = state.preview(last_date, float(data.close[-1]), float(data.high[-1]), float(data.low[-1]))
+        self.current[symbol] = {**current, "close": float(data.close[-1])}
+        return last_date
+
+    def _evaluate(self, rules: List[AlertRuleSQL], rule_symbols: List[List[str]], symbols: List[str], features: List[str]) -> List[tuple]:
+        if not rules or not symbols:
+            return []
+        sym_idx = {s: i for i, s in enumerate(symbols)}
+        feat_idx = {f: i for i, f in enumerate(features)}
+
+        # (symbols x features) matrices of latest and previous values.
+        current = np.full((len(symbols), len(features)), np.nan)
+        previous = np.full_like(current, np.nan)
+        for s, i in sym_idx.items():
+            for source, target in ((self.current, current), (self.previous, previous)):
+                values = source.get(s, {})
+                target[i] = [values.get(f, np.nan) for f in features]
+
+        # One entry per (rule, symbol) pair.
+        pair_rule = np.array([r for r, syms in enumerate(rule_symbols) for _ in syms], dtype=np.int64)
+        pair_sym = np.array([sym_idx[s] for syms in rule_symbols for s in syms], dtype=np.int64)
+        if len(pair_rule) == 0:
+            return []
+        lhs_feat = np.array([feat_idx[r.indicator] for r in rules])[pair_rule]
+        rhs_feat = np.array([feat_idx.get(r.compare_to, -1) for r in rules])[pair_rule]
+        threshold = np.array([np.nan if r.threshold is None else r.threshold for r in rules])[pair_rule]
+        op = np.array([OPERATORS.index(r.operator) for r in rules])[pair_rule]
+
+        lhs, lhs_prev = current[pair_sym, lhs_feat], previous[pair_sym, lhs_feat]
+        has_rhs = rhs_feat >= 0
+        rhs = np.where(has_rhs, current[pair_sym, np.maximum(rhs_feat, 0)], threshold)
+        rhs_prev = np.where(has_rhs, previous[pair_sym, np.maximum(rhs_feat, 0)], threshold)
+
+        with np.errstate(invalid="ignore"):
+            fired = np.select(
+                [op == 0, op == 1, op == 2, op == 3, op == 4, op == 5],
+                [lhs > rhs, lhs < rhs, lhs >= rhs, lhs <= rhs,
+                 (lhs_prev <= rhs_prev) & (lhs > rhs), (lhs_prev >= rhs_prev) & (lhs < rhs)],
+                default=False,
+            )
+        return [(rules[pair_rule[k]], symbols[pair_sym[k]], float(lhs[k]), float(rhs[k])) for k in np.flatnonzero(fired)]
+
+    def _store(self, db: Session, fired: List[tuple], bar_dates: Dict[str, Optional[int]]) -> List[Dict]:
+        """Insert alerts not already stored for (rule, symbol, bar); return the new rows."""
+        if not fired:
+            return []
+        candidates = {}
+        for rule, symbol, value, target in fired:
+            bar_date = np.datetime64(bar_dates[symbol], "ns").astype("datetime64[us]").item()
+            against = rule.compare_to or f"{target:g}"
+            candidates[(rule.id, symbol, bar_date)] = {
+                "rule_id": rule.id, "symbol": symbol, "bar_date": bar_date, "value": value,
+                "message": f"{symbol}: {rule.indicator} {rule.operator} {against} ({value:.4g})",
+            }
+
+        existing = {tuple(row) for row in db.query(AlertSQL.rule_id, AlertSQL.symbol, AlertSQL.bar_date).filter(
+            AlertSQL.rule_id.in_({k[0] for k in candidates}),
+            AlertSQL.bar_date.in_({k[2] for k in candidates}),
+        )}
+        now = datetime.now()
+        rows = [{**row, "created_at": now} for key, row in candidates.items() if key not in existing]
+        if rows:
+            db.bulk_insert_mappings(AlertSQL, rows)
+            db.commit()
+        return rows
+
+    def stats(self) -> Dict:
+        return {"last_tick": self.ticks[-1] if self.ticks else None, "recent_ticks": list(self.ticks)}
+
+
+alert_engine = AlertEngine()
@@ -0,0 +1,254 @@
+import importlib.util
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from ..models.bar_series import BarSeries
+from .backtest_service import BacktestService
+from .metrics import stage, timed
+from .resample_service import bucket_starts
+
+# Weight strategies: name -> func(market, **params) returning a (bars, assets) matrix
+# of target weights decided at each bar's close.
+WEIGHT_STRATEGIES: Dict[str, Callable[..., np.ndarray]] = {}
+
+REBALANCE_RULES = ("signal", "daily", "weekly", "monthly")
+
+
+def weight_strategy(name: str):
+    def register(func):
+        WEIGHT_STRATEGIES[name] = func
+        return func
+    return register
+
+
+class Market:
+    """
+    Symbols aligned on the union of their dates. `close` is forward-filled (NaN
+    before a symbol's first bar); `tradable` marks the bars a symbol actually has.
+    """
+
+    def __init__(self, series: Dict[str, BarSeries]):
+        self.symbols = [s for s, data in series.items() if len(data)]
+        if not self.symbols:
+            raise ValueError("No data for any symbol")
+        self.dates = np.unique(np.concatenate([series[s].date for s in self.symbols]))
+        shape = (len(self.dates), len(self.symbols))
+        self.open = np.full(shape, np.nan)
+        close = np.full(shape, np.nan)
+        for j, s in enumerate(self.symbols):
+            rows = np.searchsorted(self.dates, series[s].date)
+            self.open[rows, j] = series[s].open
+            close[rows, j] = series[s].close
+        self.tradable = ~np.isnan(self.open) & (self.open > 0)
+        self.close = _ffill(close)
+
+    def rolling_mean(self, window: int) -> np.ndarray:
+        """Trailing mean of close per symbol; NaN until `window` bars exist."""
+        valid = ~np.isnan(self.close)
+        sums = np.vstack([np.zeros((1, len(self.symbols))), np.cumsum(np.where(valid, self.close, 0.0), axis=0)])
+        counts = np.vstack([np.zeros((1, len(self.symbols))), np.cumsum(valid, axis=0)])
+        out = np.full(self.close.shape, np.nan)
+        if window <= len(self.dates):
+            window_sum = sums[window:] - sums[:-window]
+            full = (counts[window:] - counts[:-window]) == window
+            out[window - 1:] = np.where(full, window_sum / window, np.nan)
+        return out
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs down each column."""
+    idx = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return values[idx, np.arange(values.shape[1])]
+
+
+@weight_strategy("EQUAL_WEIGHT")
+def _equal_weight(market: Market) -> np.ndarray:
+    held = ~np.isnan(market.close)
+    counts = held.sum(axis=1, keepdims=True)
+    return np.where(held, 1.0 / np.maximum(counts, 1), 0.0)
+
+
+@weight_strategy("SMA_CROSS")
+def _sma_cross(market: Market, short_window: int = 50, long_window: int = 200) -> np.ndarray:
+    # Each symbol gets a fixed 1/N sleeve, invested while SMA_short > SMA_long.
+    with np.errstate(invalid="ignore"):
+        long = market.rolling_mean(short_window) > market.rolling_mean(long_window)
+    return long / len(market.symbols)
+
+
+@weight_strategy("MOMENTUM")
+def _momentum(market: Market, lookback: int = 126, top: int = 10) -> np.ndarray:
+    # Equal weight in the `top` symbols with the best positive trailing return.
+    past = np.vstack([np.full((lookback, len(market.symbols)), np.nan), market.close[:-lookback]])[:len(market.dates)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = market.close / past - 1
+    score = np.where(np.isfinite(score) & (score > 0), score, -np.inf)
+    k = min(top, len(market.symbols))
+    cutoff = -np.sort(-score, axis=1)[:, k - 1:k]
+    chosen = (score >= cutoff) & np.isfinite(score)
+    return chosen / np.maximum(chosen.sum(axis=1, keepdims=True), 1)
+
+
+def _simulate(price, close, tradable, weights, rebalance, initial_capital, commission, min_commission, slippage, lot_size):
+    """
+    Bar-by-bar execution. `rebalance` flags (bar, asset) pairs whose position
+    should move to its target weight; a flagged asset without a bar that day
+    trades at its next bar. Orders fill at `price` (the open) plus slippage
+    against the trade and pay max(min_commission, commission * notional).
+    Sells settle before buys, and buys are scaled down if cash would go negative.
+    """
+    n_bars, n_assets = close.shape
+    cash = initial_capital
+    holdings = np.zeros(n_assets)
+    pending = np.zeros(n_assets, dtype=np.bool_)
+    equity = np.empty(n_bars)
+    traded = np.zeros((n_bars, n_assets))
+    fees = np.zeros((n_bars, n_assets))
+    for t in range(n_bars):
+        pending = pending | rebalance[t]
+        active = pending & tradable[t]
+        if active.any():
+            pending = pending & ~active
+            px = price[t]
+            safe_px = np.where(px > 0, px, 1.0)
+            value = cash + np.sum(holdings * px)
+            target = np.where(active, weights[t] * value / safe_px, holdings)
+            if lot_size > 0:
+                target = np.where(active, np.floor(target / lot_size) * lot_size, holdings)
+            delta = target - holdings
+
+            sells = delta < 0
+            sell_notional = np.where(sells, -delta * px * (1 - slippage), 0.0)
+            sell_fee = np.where(sells, np.maximum(min_commission, commission * sell_notional), 0.0)
+            cash += np.sum(sell_notional - sell_fee)
+
+            buy = np.where(delta > 0, delta, 0.0)
+            buy_cost = buy * px * (1 + slippage)
+            buy_fee = np.where(buy > 0, np.maximum(min_commission, commission * buy_cost), 0.0)
+            need = np.sum(buy_cost + buy_fee)
+            if need > cash and need > 0:
+                buy = buy * max(cash, 0.0) / need
+                if lot_size > 0:
+                    buy = np.floor(buy / lot_size) * lot_size
+                buy_cost = buy * px * (1 + slippage)
+                buy_fee = np.where(buy > 0, np.maximum(min_commission, commission * buy_cost), 0.0)
+            cash -= np.sum(buy_cost + buy_fee)
+
+            delta = np.where(sells, delta, buy)
+            holdings = holdings + delta
+            traded[t] = delta
+            fees[t] = sell_fee + buy_fee
+        equity[t] = cash + np.sum(holdings * close[t])
+    return equity, traded, fees
+
+
+# Optional: without numba the kernel runs as plain NumPy. numba is only imported
+# (and the kernel compiled) on the first backtest, as it is slow to import.
+KERNEL = "numba" if importlib.util.find_spec("numba") is not None else "numpy"
+_compiled: Optional[Callable] = None
+
+
+def _kernel() -> Callable:
+    global _compiled
+    if _compiled is None:
+        if KERNEL == "numba":
+            from numba import njit
+            _compiled = njit(cache=True)(_simulate)
+        else:
+            _compiled = _simulate
+    return _compiled
+
+
+def _rebalance_mask(dates: np.ndarray, weights: np.ndarray, rule: str) -> np.ndarray:
+    """
+    (bars, assets) flags of positions to rebalance after each bar's close.
+    Calendar rules rebalance every asset on the last bar of each day/week/month;
+    "signal" only touches assets whose target weight changed.
+    """
+    mask = np.ones(weights.shape, dtype=bool)
+    if rule == "signal":
+        mask[1:] = weights[1:] != weights[:-1]
+    elif rule in ("weekly", "monthly"):
+        # Monday-anchored weeks and calendar months, the same buckets as resampling.
+        period = bucket_starts(dates, "1wk" if rule == "weekly" else "1mo")
+        # Last bar of each week/month, so the trade lands on the first bar of the next.
+        mask[:-1] = (period[1:] != period[:-1])[:, None]
+    return mask
+
+
+class BacktestEngine:
+    @staticmethod
+    @timed("backtest.engine")
+    def run(series: Dict[str, BarSeries], strategy: Dict[str, Any], initial_capital: float = 100000.0,
+            commission: float = 0.001, min_commission: float = 0.0, slippage: float = 0.0005,
+            lot_size: float = 1, rebalance: str = "signal", include_trades: bool = True) -> Dict:
+        """
+        Backtest a weight strategy ({"name": ..., **params}) over many symbols
+        sharing one aligned price matrix. Targets decided at a bar's close are
+        traded at the next bar's open. `lot_size` rounds share counts (0 allows
+        fractional shares). Returns metrics, the equity curve and the trade list.
+        """
+        name = strategy.get("name")
+        if name not in WEIGHT_STRATEGIES:
+            raise ValueError(f"Unknown strategy: {name}")
+        if rebalance not in REBALANCE_RULES:
+            raise ValueError(f"Unknown rebalance rule: {rebalance} (expected one of {', '.join(REBALANCE_RULES)})")
+        market = Market(series)
+        if len(market.dates) < 2:
+            raise ValueError("Not enough data for backtest")
+
+        params = {k: v for k, v in strategy.items() if k != "name"}
+        decided = np.nan_to_num(WEIGHT_STRATEGIES[name](market, **params).astype(np.float64))
+        trigger = _rebalance_mask(market.dates, decided, rebalance)
+
+        # Shift by one bar: decide at close t, trade at the open of t + 1.
+        weights = np.zeros_like(decided)
+        weights[1:] = decided[:-1]
+        do_rebalance = np.zeros_like(trigger)
+        do_rebalance[1:] = trigger[:-1]
+        prev_close = np.vstack([np.full((1, len(market.symbols)), np.nan), market.close[:-1]])
+        price = np.nan_to_num(np.where(market.tradable, market.open, prev_close))
+
+        with stage("backtest.simulate"):
+            equity, traded, fees = _kernel()(price, np.nan_to_num(market.close), market.tradable, weights, do_rebalance,
+                                           float(initial_capital), float(commission), float(min_commission),
+                                           float(slippage), float(lot_size))
+
+        returns = equity[1:] / equity[:-1] - 1
+        metrics = BacktestService._metrics_matrix(returns[None, :], len(equity))
+        notional = np.abs(traded) * price
+        result = {
+            "symbols": market.symbols,
+            "initial_capital": initial_capital,
+            "final_value": float(equity[-1]),
+            **{key: float(values[0]) for key, values in metrics.items()},
+            "total_commission": float(fees.sum()),
+            "turnover": float(notional.sum() / equity.mean()),
+            "trade_count": int(np.count_nonzero(traded)),
+            "kernel": KERNEL,
+            "equity_curve": {
+                "date": np.datetime_as_string(market.dates.view("datetime64[ns]"), unit="D").tolist(),
+                "equity": equity.tolist(),
+            },
+            "positions": {s: float(q) for s, q in zip(market.symbols, traded.sum(axis=0)) if q},
+        }
+        if include_trades:
+            result["trades"] = BacktestEngine._trades(market, traded, fees, price, slippage)
+        return result
+
+    @staticmethod
+    def _trades(market: Market, traded: np.ndarray, fees: np.ndarray, price: np.ndarray, slippage: float) -> List[Dict]:
+        bars, assets = np.nonzero(traded)
+        quantity = traded[bars, assets]
+        fill = price[bars, assets] * (1 + np.sign(quantity) * slippage)
+        dates = np.datetime_as_string(market.dates[bars].view("datetime64[ns]"), unit="D").tolist()
+        symbols = np.array(market.symbols, dtype=object)[assets].tolist()
+        return [
+            {"date": d, "symbol": s, "side": "BUY" if q > 0 else "SELL", "quantity": abs(q), "price": p, "commission": f}
+            for d, s, q, p, f in zip(dates, symbols, quantity.tolist(), fill.tolist(), fees[bars, assets].tolist())
+        ]
+
+    @staticmethod
+    def available() -> List[str]:
+        return sorted(WEIGHT_STRATEGIES)
+
@@ -1,12 +1,13 @@
-import pandas as pd
 import numpy as np
 from typing import List, Dict
-from ..models.schemas import OHLCV
+from ..models.bar_series import BarSeries
 from .indicator_service import IndicatorService
+from .metrics import timed
 
 class BacktestService:
     @staticmethod
-    def run_sma_cross_backtest(data: List[OHLCV], initial_capital: float = 10000.0, short_window: int = 50, long_window: int = 200) -> Dict:
+    @timed("backtest")
+    def run_sma_cross_backtest(data: BarSeries, initial_capital: float = 10000.0, short_window: int = 50, long_window: int = 200) -> Dict:
         if not data:
             return {"error": "No data provided"}
             
@@ -15,8 +16,9 @@ class BacktestService:
             return {"error": "Not enough data for backtest"}
 
         # Calculate Indicators
-        df['SMA_Short'] = df['close'].rolling(window=short_window).mean()
-        df['SMA_Long'] = df['close'].rolling(window=long_window).mean()
+        sma = IndicatorService.compute(data, [f"SMA_{short_window}", f"SMA_{long_window}"])
+        df['SMA_Short'] = sma[f"SMA_{short_window}"]
+        df['SMA_Long'] = sma[f"SMA_{long_window}"]
         
         # Generate Signals
         df['Signal'] = 0
@@ -62,3 +64,65 @@ class BacktestService:
             "max_drawdown": clean_float(max_drawdown),
             "equity_curve": {k.strftime('%Y-%m-%d'): clean_float(v) for k, v in cumulative_returns.to_dict().items()} 
         }
+
+    @staticmethod
+    @timed("backtest.sweep")
+    def run_sma_cross_sweep(data: BarSeries, short_windows: List[int], long_windows: List[int], initial_capital: float = 10000.0) -> List[Dict]:
+        """
+        Evaluate every (short, long) SMA cross pair with short < long over one series.
+
+        All rolling means come from one shared prefix sum, and for each short window
+        the long windows are evaluated together as one (len(long_windows), n) matrix.
+        Metrics follow run_sma_cross_backtest. Rows are sorted by Sharpe ratio.
+        """
+        n = len(data)
+        short_windows = sorted({w for w in short_windows if 0 < w <= n})
+        long_windows = sorted({w for w in long_windows if 0 < w <= n})
+        if n < 2 or not short_windows or not long_windows:
+            return []
+
+        sma = IndicatorService.compute(data, [f"SMA_{w}" for w in set(short_windows) | set(long_windows)])
+        long_matrix = np.vstack([sma[f"SMA_{w}"] for w in long_windows])  # (L, n)
+        long_arr = np.array(long_windows)
+        market_return = data.close[1:] / data.close[:-1] - 1  # (n - 1,)
+
+        rows = []
+        for short in short_windows:
+            valid = long_arr > short
+            if not valid.any():
+                continue
+            with np.errstate(invalid="ignore"):
+                # Long when SMA_short > SMA_long, acting on the next bar (NaN compares False -> cash).
+                position = sma[f"SMA_{short}"][None, :-1] > long_matrix[valid, :-1]
+            metrics = BacktestService._metrics_matrix(market_return[None, :] * position, n)
+            for i, long in enumerate(long_arr[valid].tolist()):
+                rows.append({
+                    "symbol": data.symbol,
+                    "short_window": short,
+                    "long_window": long,
+                    "final_value": float(initial_capital * (1 + metrics["total_return"][i])),
+                    **{name: float(values[i]) for name, values in metrics.items()},
+                })
+
+        rows.sort(key=lambda r: r["sharpe_ratio"], reverse=True)
+        return rows
+
+    @staticmethod
+    def _metrics_matrix(strategy_returns: np.ndarray, n_bars: int) -> Dict[str, np.ndarray]:
+        """Row-wise total/annualized return, Sharpe and max drawdown for a (P, n-1) return matrix."""
+        equity = np.cumprod(1 + strategy_returns, axis=1)
+        total_return = equity[:, -1] - 1
+        annualized_return = (1 + total_return) ** (252 / n_bars) - 1
+
+        std_dev = strategy_returns.std(axis=1, ddof=1) if strategy_returns.shape[1] > 1 else np.zeros(len(equity))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe_ratio = np.where(std_dev > 0, strategy_returns.mean(axis=1) / std_dev * np.sqrt(252), 0.0)
+        max_drawdown = (equity / np.maximum.accumulate(equity, axis=1) - 1).min(axis=1)
+
+        clean = lambda a: np.where(np.isfinite(a), a, 0.0)
+        return {
+            "total_return": clean(total_return),
+            "annualized_return": clean(annualized_return),
+            "sharpe_ratio": clean(sharpe_ratio),
+            "max_drawdown": clean(max_drawdown),
+        }
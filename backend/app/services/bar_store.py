@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so writers are only serialized within a process
+    fcntl = None
+
+BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", "./bar_store")
+
+# Column layout on disk: one .npy file per column, dates as int64 nanoseconds
+# since the epoch (exchange-local, tz stripped like the rest of the app).
+COLUMNS = {
+    "date": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.int64,
+}
+
+
+class BarStore:
+    """
+    Columnar on-disk OHLCV store keyed by (symbol, interval).
+
+    Each key is a directory holding one .npy file per column plus a meta.json.
+    Writes go to a new generation of files and meta.json is swapped atomically,
+    so readers holding a memory map of the previous generation stay valid.
+    Writers hold lock(), which also excludes other processes (uvicorn workers,
+    the batch pool) writing the same key. Generation files are uniquely named,
+    and a write only removes generations older than the one it replaced, so a
+    reader that has just read meta.json can still open the files it names.
+    """
+
+    def __init__(self, root: str = BAR_STORE_DIR):
+        self.root = root
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, quote(symbol, safe=""), quote(interval, safe=""))
+
+    @contextmanager
+    def lock(self, symbol: str, interval: str) -> Iterator[None]:
+        """
+        Exclusive access to a key, across threads and processes, so concurrent
+        requests for one symbol share a single fetch. Hold it around write/append/touch.
+        """
+        key = (symbol, interval)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            thread_lock = self._locks[key]
+        with thread_lock:
+            directory = self._dir(symbol, interval)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "lock"), "a") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                yield
+
+    def meta(self, symbol: str, interval: str) -> Optional[Dict]:
+        path = os.path.join(self._dir(symbol, interval), "meta.json")
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, symbol: str, interval: str) -> Optional[Dict[str, np.ndarray]]:
+        """Memory-map the stored columns. Returns None when nothing is stored."""
+        meta = self.meta(symbol, interval)
+        if not meta or not meta.get("rows"):
+            return None
+        directory = self._dir(symbol, interval)
+        for _ in range(3):
+            files = meta.get("files", str(meta["generation"]))
+            try:
+                return {col: np.load(os.path.join(directory, f"{files}.{col}.npy"), mmap_mode="r") for col in COLUMNS}
+            except (OSError, ValueError):
+                # Replaced twice since meta.json was read: read it again.
+                meta = self.meta(symbol, interval)
+                if not meta or not meta.get("rows") or meta.get("files", str(meta["generation"])) == files:
+                    return None
+        return None
+
+    def write(self, symbol: str, interval: str, columns: Dict[str, np.ndarray], **meta) -> None:
+        """
+        Replace the stored bars for a key with `columns` (already sorted by date).
+        Metadata not passed in `meta` is carried over from the previous generation.
+        """
+        directory = self._dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        previous = self.meta(symbol, interval) or {}
+        generation = previous.get("generation", 0) + 1
+        # Unique even if two writers bypass lock() and pick the same generation number.
+        files = f"{generation}-{uuid.uuid4().hex[:12]}"
+
+        for col, dtype in COLUMNS.items():
+            np.save(os.path.join(directory, f"{files}.{col}.npy"), np.ascontiguousarray(columns[col], dtype=dtype))
+
+        meta = {**previous, **meta, "generation": generation, "files": files, "rows": int(len(columns["date"]))}
+        self._write_meta(directory, meta)
+
+        # Generations before the one just replaced can go; open memory maps keep their pages.
+        for name in os.listdir(directory):
+            number = name.split(".", 1)[0].split("-", 1)[0]
+            if number.isdigit() and int(number) < generation - 1:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def touch(self, symbol: str, interval: str, **meta) -> None:
+        """Update metadata (e.g. the last refresh time) without rewriting any bars."""
+        previous = self.meta(symbol, interval)
+        if previous is None:
+            return
+        previous.update(meta)
+        self._write_meta(self._dir(symbol, interval), previous)
+
+    def _write_meta(self, directory: str, meta: Dict) -> None:
+        meta["updated_at"] = time.time()
+        tmp_path = os.path.join(directory, f"meta.json.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(directory, "meta.json"))
+
+    def append(self, symbol: str, interval: str, columns: Dict[str, np.ndarray], **meta) -> None:
+        """
+        Merge newer bars into the stored series. Stored bars at or after the first
+        new bar are replaced, so a re-fetched partial (still forming) bar is updated.
+        """
+        existing = self.load(symbol, interval)
+        if existing is None:
+            self.write(symbol, interval, columns, **meta)
+            return
+        if len(columns["date"]) == 0:
+            self.touch(symbol, interval, **meta)
+            return
+
+        cut = int(np.searchsorted(existing["date"], columns["date"][0], side="left"))
+        merged = {col: np.concatenate([existing[col][:cut], columns[col]]) for col in COLUMNS}
+        self.write(symbol, interval, merged, **meta)
+
+
+bar_store = BarStore()
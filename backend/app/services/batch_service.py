@@ -0,0 +1,221 @@
+import itertools
+import multiprocessing
+import os
+import signal
+import time
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from .data_service import DataService
+from .backtest_service import BacktestService
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", os.cpu_count() or 2))
+
+# Workers are spawned, not forked: the server already runs threads (scheduler,
+# request thread pool, stream hub), and a fork can copy a lock one of them holds
+# into the child, where nothing will ever release it.
+_mp_context = multiprocessing.get_context("spawn")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Tracked tasks that have started in a worker: task id -> (worker pid, time.monotonic() here).
+_started: Dict[int, Tuple[int, float]] = {}
+_task_ids = itertools.count()
+_start_queue = None  # In a worker: where it reports the tasks it starts
+
+
+def _init_worker(queue) -> None:
+    global _start_queue
+    _start_queue = queue
+
+
+def _run_tracked(task_id: int, func: Callable, args: tuple) -> Any:
+    _start_queue.put((task_id, os.getpid()))
+    return func(*args)
+
+
+def _record_starts(queue) -> None:
+    # One thread per pool; start notices are timed on arrival, in this process's clock.
+    while True:
+        notice = queue.get()
+        if notice is None:
+            return
+        task_id, pid = notice
+        _started[task_id] = (pid, time.monotonic())
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Process pool shared by all batch requests, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            queue = _mp_context.SimpleQueue()
+            _executor = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=_mp_context,
+                                            initializer=_init_worker, initargs=(queue,))
+            _executor.start_queue = queue
+            threading.Thread(target=_record_starts, args=(queue,), name="batch-starts", daemon=True).start()
+        return _executor
+
+
+def _discard(executor: ProcessPoolExecutor) -> None:
+    executor.shutdown(wait=False, cancel_futures=True)
+    executor.start_queue.put(None)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _discard(_executor)
+            _executor = None
+
+
+def recycle_executor(executor: ProcessPoolExecutor, pids: List[int]) -> None:
+    """
+    Kill workers of `executor` (running tasks that ran too long) and retire the
+    pool: a killed worker breaks it, so the next get_executor() starts a fresh one.
+    Other tasks still on the old pool fail with BrokenProcessPool.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    for pid in pids:
+        try:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError:
+            pass  # Already gone
+    _discard(executor)
+
+
+def run_tasks(tasks: List[Tuple[str, Callable, tuple]], timeout: float,
+              max_in_flight: Optional[int] = None) -> Iterator[Tuple[str, Any, Optional[str]]]:
+    """
+    Run (key, func, args) tasks in the pool and yield (key, result, error) as they
+    finish. At most `max_in_flight` are queued at once. Each task may run for
+    `timeout` seconds from the moment a worker starts it (time queued behind other
+    tasks does not count); then its worker is killed, the pool recycled and the
+    tasks that were still queued or running on it are resubmitted. A task whose
+    pool broke under it for another reason is retried once.
+    """
+    max_in_flight = max_in_flight or BATCH_WORKERS * 2
+    pending = list(reversed(tasks))
+    retried = set()
+    in_flight: Dict[Future, Tuple[Tuple[str, Callable, tuple], int]] = {}
+    executor = get_executor()
+
+    def requeue(futures) -> None:
+        for future in futures:
+            task, task_id = in_flight.pop(future)
+            _started.pop(task_id, None)
+            pending.append(task)
+
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < max_in_flight:
+                task = pending.pop()
+                task_id = next(_task_ids)
+                try:
+                    future = executor.submit(_run_tracked, task_id, task[1], task[2])
+                except (BrokenProcessPool, RuntimeError):
+                    # Broken, or retired by another request's timeout.
+                    recycle_executor(executor, [])
+                    pending.append(task)
+                    executor = get_executor()
+                    continue
+                in_flight[future] = (task, task_id)
+
+            now = time.monotonic()
+            # Tasks that have not started yet cannot expire before now + timeout.
+            next_deadline = min([_started[t][1] + timeout for _, t in in_flight.values() if t in _started] + [now + timeout])
+            done, _ = wait(in_flight, timeout=max(next_deadline - now, 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                task, task_id = in_flight.pop(future)
+                _started.pop(task_id, None)
+                try:
+                    yield task[0], future.result(), None
+                except BrokenProcessPool:
+                    if task[0] in retried:
+                        yield task[0], None, "Worker process died"
+                    else:
+                        retried.add(task[0])
+                        pending.append(task)
+                        recycle_executor(executor, [])
+                        executor = get_executor()
+                except Exception as e:
+                    yield task[0], None, str(e)
+
+            now = time.monotonic()
+            expired = [future for future, (_, task_id) in in_flight.items()
+                       if not future.done() and task_id in _started and now - _started[task_id][1] >= timeout]
+            if expired:
+                recycle_executor(executor, [_started[in_flight[future][1]][0] for future in expired])
+                timed_out = []
+                for future in expired:
+                    task, task_id = in_flight.pop(future)
+                    _started.pop(task_id, None)
+                    timed_out.append(task[0])
+                # Finished ones are collected by the next wait; the rest go to the new pool.
+                requeue([future for future in in_flight if not future.done()])
+                executor = get_executor()
+                for key in timed_out:
+                    yield key, None, f"Timed out after {timeout:g}s"
+    finally:
+        for _, task_id in in_flight.values():
+            _started.pop(task_id, None)
+
+
+def _backtest_symbol(symbol: str, period: str, initial_capital: float, short_window: int, long_window: int) -> Dict:
+    # Runs in a worker process: load bars (bar store is shared on disk) and backtest.
+    started = time.perf_counter()
+    data = DataService.fetch_history(symbol, period=period)
+    result = BacktestService.run_sma_cross_backtest(
+        data, initial_capital=initial_capital, short_window=short_window, long_window=long_window
+    )
+    result.pop("equity_curve", None)
+    result["symbol"] = symbol
+    result["bars"] = len(data)
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+
+class BatchBacktestService:
+    @staticmethod
+    def run(symbols: List[str], period: str = "2y", initial_capital: float = 10000.0,
+            short_window: int = 50, long_window: int = 200, max_in_flight: Optional[int] = None,
+            timeout: float = 30.0) -> Iterator[Dict]:
+        """
+        Backtest each symbol in the process pool and yield per-symbol results as they
+        finish. At most `max_in_flight` symbols are queued at once. A symbol still
+        running `timeout` seconds after its worker picked it up is reported as timed
+        out and its worker killed (see run_tasks).
+        """
+        tasks = [(symbol, _backtest_symbol, (symbol, period, initial_capital, short_window, long_window))
+                 for symbol in symbols]
+        for symbol, result, error in run_tasks(tasks, timeout, max_in_flight):
+            yield {"symbol": symbol, "error": error} if error is not None else result
+
+    @staticmethod
+    def aggregate(results: List[Dict]) -> Dict:
+        ok = [r for r in results if "error" not in r]
+        summary = {"symbols": len(results), "succeeded": len(ok), "failed": len(results) - len(ok)}
+        if not ok:
+            return summary
+
+        for metric in ("total_return", "annualized_return", "sharpe_ratio", "max_drawdown"):
+            values = np.array([r[metric] for r in ok])
+            summary[metric] = {
+                "mean": float(values.mean()),
+                "median": float(np.median(values)),
+                "min": float(values.min()),
+                "max": float(values.max()),
+            }
+        best = max(ok, key=lambda r: r["sharpe_ratio"])
+        worst = min(ok, key=lambda r: r["sharpe_ratio"])
+        summary["best"] = {"symbol": best["symbol"], "sharpe_ratio": best["sharpe_ratio"]}
+        summary["worst"] = {"symbol": worst["symbol"], "sharpe_ratio": worst["sharpe_ratio"]}
+        return summary
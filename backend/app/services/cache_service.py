@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set
+
+# Fresh lifetime (seconds) of a cached response, by bar interval. Daily bars change
+# at most a few times a day; intraday bars change every few seconds.
+TTL_BY_INTERVAL = {
+    '1m': 5, '2m': 10, '5m': 15, '15m': 30, '30m': 60, '60m': 120, '90m': 120, '1h': 120,
+    '1d': 3600, '5d': 3600, '1wk': 4 * 3600, '1mo': 4 * 3600, '3mo': 4 * 3600,
+}
+
+
+def ttl_for(interval: str) -> float:
+    return TTL_BY_INTERVAL.get(interval, 60)
+
+
+class ResponseCache:
+    """
+    In-process TTL + LRU cache for rendered API responses.
+
+    An entry is fresh for `ttl` seconds. For another `ttl * stale_factor` seconds it
+    is still served, but a background task recomputes it (stale-while-revalidate).
+    Concurrent misses for one key share a single computation. At most
+    `max_entries` entries are kept; the least recently used one is evicted first.
+    """
+
+    def __init__(self, max_entries: int = 512, stale_factor: float = 1.0):
+        self.max_entries = max_entries
+        self.stale_factor = stale_factor
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, stored_at, ttl)
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "refreshes": 0, "errors": 0}
+
+    async def get_or_compute(self, key: Hashable, ttl: float, compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at, _ = entry
+            age = time.monotonic() - stored_at
+            if age < ttl:
+                self.counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < ttl * (1 + self.stale_factor):
+                self.counters["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                if key not in self._in_flight:
+                    self._refresh_in_background(key, ttl, compute)
+                return value
+
+        self.counters["misses"] += 1
+        return await asyncio.shield(self._compute(key, ttl, compute))
+
+    def _compute(self, key: Hashable, ttl: float, compute: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute_and_store(key, ttl, compute))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return task
+
+    async def _compute_and_store(self, key: Hashable, ttl: float, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = await compute()
+        self.set(key, value, ttl)
+        return value
+
+    def _refresh_in_background(self, key: Hashable, ttl: float, compute: Callable[[], Awaitable[Any]]) -> None:
+        self.counters["refreshes"] += 1
+        task = self._compute(key, ttl, compute)
+        self._background.add(task)
+
+        def done(t: asyncio.Future) -> None:
+            self._background.discard(t)
+            if not t.cancelled() and t.exception() is not None:
+                # Keep serving the stale value; the next request retries.
+                self.counters["errors"] += 1
+
+        task.add_done_callback(done)
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._entries[key] = (value, time.monotonic(), ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": (self.counters["hits"] + self.counters["stale_hits"]) / lookups if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache(max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", 512)))
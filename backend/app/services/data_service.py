@@ -1,262 +1,344 @@
-import yfinance as yf
-import pandas as pd
+import os
+import time
+import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
-from ..models.schemas import OHLCV
+from typing import TYPE_CHECKING, List, Optional, Dict, Tuple
+from ..models.bar_series import BarSeries
+from .bar_store import bar_store, COLUMNS
+from .metrics import MOCK_FALLBACKS, PROVIDER_CALLS, stage, timed
+from .resample_service import DAY_NS, base_candidates, normalize_interval, resample_cache
+from .rate_limit import PROVIDER_LIMITS, with_retries
+from .symbol_catalog import symbol_catalog
+from .synthetic_market import synthetic_market
+
+# yfinance (and the pandas it pulls in) is imported on the first provider call:
+# it is the slowest import in the app and bar store hits never need it.
+if TYPE_CHECKING:
+    import pandas as pd
+
+# How far back each yfinance period reaches. None means "everything".
+PERIOD_DELTAS = {
+    '1d': timedelta(days=1), '5d': timedelta(days=5), '1mo': timedelta(days=31),
+    '3mo': timedelta(days=92), '6mo': timedelta(days=183), '1y': timedelta(days=366),
+    '2y': timedelta(days=731), '5y': timedelta(days=1827), '10y': timedelta(days=3653),
+    'max': None,
+}
+
+# Seconds a stored series is served without asking the provider for newer bars.
+REFRESH_AFTER = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800, '60m': 3600, '90m': 3600,
+    '1h': 3600, '1d': 4 * 3600, '5d': 12 * 3600, '1wk': 24 * 3600, '1mo': 24 * 3600, '3mo': 24 * 3600,
+}
+
+# Symbols per yf.download call in fetch_many.
+BATCH_CHUNK = 20
+
+# "yahoo", or "mock" to serve synthetic bars (see synthetic_market.py) with no network access.
+DATA_PROVIDER = os.getenv("DATA_PROVIDER", "yahoo")
 
 class DataService:
     @staticmethod
-    def fetch_history(symbol: str, period: str = "1y", interval: str = "1d") -> List[OHLCV]:
+    def fetch_history(symbol: str, period: str = "1y", interval: str = "1d") -> BarSeries:
         """
-        Fetch historical data from Yahoo Finance. Fallback to mock data on failure.
+        Fetch historical data, served from the local bar store and topped up from
+        Yahoo Finance. Only base intervals (see resample_service.BASE_INTERVALS) are
+        fetched; other intervals are resampled from the finest stored base that covers
+        the period. Fallback to mock data on failure.
         """
+        interval = normalize_interval(interval)
+        base = DataService._base_interval(symbol, period, interval)
         try:
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(period=period, interval=interval)
+            if base == interval:
+                series = DataService._load_bars(symbol, period, interval)
+            else:
+                series = DataService._load_resampled(symbol, period, interval, base)
             
-            if df.empty:
+            if not series:
                 raise Exception("Empty data")
-                
-            # Calculate Indicators
-            df['SMA_20'] = df['Close'].rolling(window=20).mean()
-            df['SMA_50'] = df['Close'].rolling(window=50).mean()
-            
-            # RSI Calculation
-            delta = df['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            df['RSI'] = 100 - (100 / (1 + rs))
-            
-            # Fill NaN values to avoid JSON serialization errors
-            df = df.fillna(0)
-
-            data = []
-            for index, row in df.iterrows():
-                dt = index.to_pydatetime()
-                if dt.tzinfo:
-                    dt = dt.replace(tzinfo=None)
-                    
-                data.append(OHLCV(
-                    date=dt,
-                    open=row['Open'],
-                    high=row['High'],
-                    low=row['Low'],
-                    close=row['Close'],
-                    volume=int(row['Volume']),
-                    SMA_20=float(row['SMA_20']) if row['SMA_20'] != 0 else None,
-                    SMA_50=float(row['SMA_50']) if row['SMA_50'] != 0 else None,
-                    RSI=float(row['RSI']) if row['RSI'] != 0 else None
-                ))
-            return data
+            return series
             
         except Exception as e:
             print(f"Error fetching data for {symbol}: {e}. Using Mock Data.")
-            return DataService._generate_mock_data(symbol, period)
+            MOCK_FALLBACKS.inc()
+            return DataService._generate_mock_data(symbol, period, interval)
+
+    @staticmethod
+    def check_interval(interval: str, period: str) -> str:
+        """The normalized interval; ValueError if it is unsupported or not served that far back."""
+        interval = normalize_interval(interval)
+        base_candidates(interval, DataService._period_days(period))
+        return interval
+
+    @staticmethod
+    def _base_interval(symbol: str, period: str, interval: str) -> str:
+        """The finest base already stored for the whole period, else the finest one to fetch."""
+        candidates = base_candidates(interval, DataService._period_days(period))
+        for base in candidates:
+            if DataService._store_state(symbol, period, base) != "missing":
+                return base
+        return candidates[0]
+
+    @staticmethod
+    def _period_days(period: str) -> Optional[float]:
+        start = DataService._period_start(period)
+        return None if start is None else (datetime.now() - start).total_seconds() / 86400
+
+    @staticmethod
+    def _period_start(period: str) -> Optional[datetime]:
+        if period == 'ytd':
+            return datetime(datetime.now().year, 1, 1)
+        delta = PERIOD_DELTAS.get(period, PERIOD_DELTAS['1y'])
+        return None if delta is None else datetime.now() - delta
+
+    @staticmethod
+    def _start_ns(period: str) -> int:
+        start = DataService._period_start(period)
+        return 0 if start is None else int(np.datetime64(start, "ns").astype(np.int64))
+
+    @staticmethod
+    def _store_state(symbol: str, period: str, interval: str) -> str:
+        """'missing' (not stored or too short for period), 'stale' (past REFRESH_AFTER) or 'fresh'."""
+        meta = bar_store.meta(symbol, interval)
+        if meta is None or not meta.get("rows") or meta["start"] > DataService._start_ns(period):
+            return "missing"
+        if time.time() - meta["fetched_at"] > REFRESH_AFTER.get(interval, 3600):
+            return "stale"
+        return "fresh"
+
+    @staticmethod
+    def _last_stored(symbol: str, interval: str) -> datetime:
+        stored = bar_store.load(symbol, interval)
+        return np.datetime64(int(stored["date"][-1]), "ns").astype("datetime64[us]").item()
+
+    @staticmethod
+    def _sync_bars(symbol: str, period: str, interval: str) -> None:
+        """
+        Sync the bar store with the provider when it is missing, too short for the
+        period, or older than REFRESH_AFTER. Only bars after the last stored one are
+        requested on a top-up.
+        """
+        start_ns = DataService._start_ns(period)
+
+        with bar_store.lock(symbol, interval):
+            state = DataService._store_state(symbol, period, interval)
+            if state == "missing":
+                columns = DataService._download(symbol, interval, period=period)
+                if len(columns["date"]) == 0:
+                    return
+                bar_store.write(symbol, interval, columns, start=start_ns, fetched_at=time.time())
+            elif state == "stale":
+                try:
+                    columns = DataService._download(symbol, interval, start=DataService._last_stored(symbol, interval))
+                    bar_store.append(symbol, interval, columns, fetched_at=time.time())
+                except Exception as e:
+                    # Serve the stored bars; the next request past REFRESH_AFTER retries.
+                    print(f"Error refreshing bars for {symbol}: {e}. Serving stored data.")
+
+    @staticmethod
+    def _load_bars(symbol: str, period: str, interval: str) -> BarSeries:
+        """Return bars for `period` from the bar store, syncing it with the provider first."""
+        DataService._sync_bars(symbol, period, interval)
+        with stage("data.bar_store"):
+            bars = bar_store.load(symbol, interval)
+        if bars is None:
+            return BarSeries.empty(symbol, interval)
+        return DataService._slice_period(BarSeries.from_columns(bars, symbol=symbol, interval=interval), period)
+
+    @staticmethod
+    def _load_resampled(symbol: str, period: str, interval: str, base: str) -> BarSeries:
+        """Sync the base series, then serve `interval` bars resampled from it (cached per interval)."""
+        DataService._sync_bars(symbol, period, base)
+        series = resample_cache.get(symbol, base, interval)
+        if not series:
+            return series
+        return DataService._slice_period(series, period)
+
+    @staticmethod
+    def _slice_period(series: BarSeries, period: str) -> BarSeries:
+        # Always keep the last bar, e.g. period="1d" requested over a weekend.
+        first = min(int(np.searchsorted(series.date, DataService._start_ns(period), side="left")), len(series) - 1)
+        return series[first:]
 
     @staticmethod
-    def _generate_mock_data(symbol: str, period: str) -> List[OHLCV]:
-        import numpy as np
-        
-        # Determine days based on period
-        days_map = {'1d': 1, '5d': 5, '1mo': 30, '6mo': 180, '1y': 365, '2y': 730, 'max': 1000}
-        days = days_map.get(period, 365)
-        
-        # Generate dates
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        date_range = pd.date_range(start=start_date, end=end_date, freq='B') # Business days
-        
-        # Generate random price walk
-        np.random.seed(sum(ord(c) for c in symbol)) # Seed with symbol for consistency
-        n = len(date_range)
-        start_price = 100.0 + np.random.rand() * 1000 # Random start price
-        returns = np.random.normal(0.0005, 0.02, n) # Mean 0.05%, Std 2%
-        price_path = start_price * (1 + returns).cumprod()
-        
-        # Calculate Mock Indicators (Simple approximation for visual consistency)
+    def fetch_many(symbols: List[str], period: str = "1y", interval: str = "1d") -> Dict[str, BarSeries]:
+        """
+        Fetch history for many symbols. Fresh ones come from the bar store; the rest are
+        pulled with batched yf.download calls (one for missing symbols, one for top-ups
+        per base interval) instead of one Ticker.history call per symbol.
+        """
+        interval = normalize_interval(interval)
+        groups: Dict[str, List[str]] = {}
+        for symbol in symbols:
+            groups.setdefault(DataService._base_interval(symbol, period, interval), []).append(symbol)
+
+        for base, group in groups.items():
+            states = {symbol: DataService._store_state(symbol, period, base) for symbol in group}
+            missing = [s for s, state in states.items() if state == "missing"]
+            stale = [s for s, state in states.items() if state == "stale"]
+
+            try:
+                start_ns = DataService._start_ns(period)
+                for symbol, columns in DataService._download_many(missing, base, period=period).items():
+                    if len(columns["date"]):
+                        with bar_store.lock(symbol, base):
+                            bar_store.write(symbol, base, columns, start=start_ns, fetched_at=time.time())
+
+                if stale:
+                    since = min(DataService._last_stored(symbol, base) for symbol in stale)
+                    for symbol, columns in DataService._download_many(stale, base, start=since).items():
+                        with bar_store.lock(symbol, base):
+                            bar_store.append(symbol, base, columns, fetched_at=time.time())
+            except Exception as e:
+                # Anything not synced here falls back to per-symbol fetches below.
+                print(f"Error in batch fetch for {len(missing) + len(stale)} symbols: {e}")
+
+        return {symbol: DataService.fetch_history(symbol, period, interval) for symbol in symbols}
+
+    @staticmethod
+    def _provider_call(call: str, func):
+        """Run one provider request, timed as the data.provider stage and counted by outcome."""
+        with stage("data.provider"):
+            try:
+                result = func()
+            except Exception:
+                PROVIDER_CALLS.inc(provider=DATA_PROVIDER, call=call, outcome="error")
+                raise
+        PROVIDER_CALLS.inc(provider=DATA_PROVIDER, call=call, outcome="ok")
+        return result
+
+    @staticmethod
+    def _download(symbol: str, interval: str, period: Optional[str] = None, start: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """Fetch bars from Yahoo Finance as store columns (tz stripped, sorted, de-duplicated)."""
+        if DATA_PROVIDER == "mock":
+            return DataService._provider_call("history", lambda: synthetic_market.columns(
+                [symbol], interval, start or DataService._period_start(period))[symbol])
+        import yfinance as yf
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            df = DataService._provider_call("history", lambda: with_retries(
+                lambda: ticker.history(start=start, interval=interval, raise_errors=True), limiter=PROVIDER_LIMITS["yahoo"]))
+        else:
+            df = DataService._provider_call("history", lambda: with_retries(
+                lambda: ticker.history(period=period, interval=interval, raise_errors=True), limiter=PROVIDER_LIMITS["yahoo"]))
+        return DataService._to_columns(df, start)
+
+    @staticmethod
+    def _download_many(symbols: List[str], interval: str, period: Optional[str] = None, start: Optional[datetime] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """Batched download, BATCH_CHUNK symbols per yf.download call."""
+        if DATA_PROVIDER == "mock":
+            return DataService._provider_call("download", lambda: synthetic_market.columns(
+                list(symbols), interval, start or DataService._period_start(period)))
         import pandas as pd
-        df = pd.DataFrame({'Close': price_path})
-        df['SMA_20'] = df['Close'].rolling(window=20).mean().fillna(0)
-        df['SMA_50'] = df['Close'].rolling(window=50).mean().fillna(0)
-        
-        # Mock RSI
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        df = df.fillna(50) # Default RSI to 50
-
-        data = []
-        for i, date in enumerate(date_range):
-            close = float(price_path[i])
-            open_p = close * (1 + np.random.normal(0, 0.005))
-            high = max(open_p, close) * (1 + abs(np.random.normal(0, 0.01)))
-            low = min(open_p, close) * (1 - abs(np.random.normal(0, 0.01)))
-            volume = int(np.random.randint(10000, 1000000))
-            
-            data.append(OHLCV(
-                date=date.to_pydatetime(),
-                open=open_p,
-                high=high,
-                low=low,
-                close=close,
-                volume=volume,
-                SMA_20=float(df.iloc[i]['SMA_20']) if df.iloc[i]['SMA_20'] != 0 else None,
-                SMA_50=float(df.iloc[i]['SMA_50']) if df.iloc[i]['SMA_50'] != 0 else None,
-                RSI=float(df.iloc[i]['RSI'])
-            ))
-        return data
+        import yfinance as yf
+        results = {}
+        for i in range(0, len(symbols), BATCH_CHUNK):
+            chunk = symbols[i:i + BATCH_CHUNK]
+            kwargs = {"start": start} if start is not None else {"period": period}
+            df = DataService._provider_call("download", lambda: with_retries(lambda: yf.download(
+                chunk, interval=interval, group_by="ticker", auto_adjust=True,
+                progress=False, threads=True, **kwargs
+            ), limiter=PROVIDER_LIMITS["yahoo"], tokens=len(chunk)))
+            for symbol in chunk:
+                if isinstance(df.columns, pd.MultiIndex):
+                    if symbol not in df.columns.get_level_values(0):
+                        continue
+                    frame = df[symbol]
+                else:
+                    frame = df
+                results[symbol] = DataService._to_columns(frame.dropna(subset=['Close']), start)
+        return results
+
+    @staticmethod
+    @timed("data.convert")
+    def _to_columns(df: "pd.DataFrame", start: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        import pandas as pd
+        if df.empty:
+            return {col: np.empty(0, dtype=dtype) for col, dtype in COLUMNS.items()}
+
+        if df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        if start is not None:
+            # yfinance rounds `start` down to the day; only keep bars from the last stored one on.
+            df = df[df.index >= pd.Timestamp(start)]
+
+        return {
+            "date": df.index.values.astype("datetime64[ns]").astype(np.int64),
+            "open": df['Open'].to_numpy(dtype=np.float64),
+            "high": df['High'].to_numpy(dtype=np.float64),
+            "low": df['Low'].to_numpy(dtype=np.float64),
+            "close": df['Close'].to_numpy(dtype=np.float64),
+            "volume": df['Volume'].fillna(0).to_numpy().astype(np.int64),
+        }
+
+    @staticmethod
+    def _generate_mock_data(symbol: str, period: str, interval: str = "1d") -> BarSeries:
+        """Synthetic bars for the period; the same symbol always gets the same path."""
+        columns = synthetic_market.columns([symbol], interval, DataService._period_start(period))[symbol]
+        return BarSeries.from_columns(columns, symbol=symbol, interval=interval)
 
     @staticmethod
     def get_current_price(symbol: str) -> float:
         """
         Get real-time (delayed) price.
         """
+        if DATA_PROVIDER == "mock":
+            return DataService._provider_call("quote", lambda: float(
+                synthetic_market.daily([symbol], datetime.now() - timedelta(days=7))[symbol]["close"][-1]))
+        import yfinance as yf
         ticker = yf.Ticker(symbol)
         # fast_info is faster than history for current price
-        return ticker.fast_info.last_price
+        return DataService._provider_call("quote", lambda: with_retries(
+            lambda: ticker.fast_info.last_price, limiter=PROVIDER_LIMITS["yahoo"]))
 
     @staticmethod
-    def search_symbols(query: str) -> List[Dict[str, str]]:
+    def get_current_quote(symbol: str) -> Tuple[int, float]:
         """
-        Search for symbols using Yahoo Finance.
-        This is a basic implementation. For better results, we might need a dedicated search API 
-        or a pre-populated list of Indian stocks.
+        Latest price with the trading session it belongs to: (session date as int64 ns
+        at midnight, exchange time; price). Outside trading hours this is the last
+        session's close, so callers can tell a new session from the quote alone.
+        """
+        if DATA_PROVIDER == "mock":
+            columns = DataService._provider_call("quote", lambda: synthetic_market.daily(
+                [symbol], datetime.now() - timedelta(days=7))[symbol])
+            return int(columns["date"][-1]), float(columns["close"][-1])
+        import yfinance as yf
+        ticker = yf.Ticker(symbol)
+        # The last minute bar dates the price; over a weekend it is Friday's close.
+        df = DataService._provider_call("quote", lambda: with_retries(
+            lambda: ticker.history(period="1d", interval="1m", raise_errors=True), limiter=PROVIDER_LIMITS["yahoo"]))
+        columns = DataService._to_columns(df)
+        if not len(columns["date"]):
+            raise ValueError(f"No quote for {symbol}")
+        return int(columns["date"][-1]) // DAY_NS * DAY_NS, float(columns["close"][-1])
+
+    @staticmethod
+    def get_current_prices(symbols: List[str]) -> Dict[str, float]:
+        """
+        Latest close for many symbols in batched downloads (one provider call per
+        BATCH_CHUNK symbols). Symbols the provider has no bars for are left out.
         """
         try:
-            # yfinance doesn't have a direct search method exposed easily without private APIs or scraping.
-            # However, we can use the Ticker object to check if valid, but that's not search.
-            # A common workaround is to use a public API or a static list.
-            # For this demo, let's mock a search for common Indian stocks if the query matches,
-            # or use a simple heuristic.
-            
-            # BETTER APPROACH: Use a static list of popular Indian/US stocks for the demo.
-            # In a real app, we'd use an API like AlphaVantage Search or Yahoo Finance Autocomplete API (undocumented).
-            
-            results = []
-            
-            # Mock Data for Demo purposes (since we don't have a paid search API)
-            common_stocks = [
-                # --- Nifty 50 & Next 50 (Top 100 NSE Stocks) ---
-                {"symbol": "RELIANCE.NS", "name": "Reliance Industries Ltd."},
-                {"symbol": "TCS.NS", "name": "Tata Consultancy Services Ltd."},
-                {"symbol": "HDFCBANK.NS", "name": "HDFC Bank Ltd."},
-                {"symbol": "ICICIBANK.NS", "name": "ICICI Bank Ltd."},
-                {"symbol": "INFY.NS", "name": "Infosys Ltd."},
-                {"symbol": "HINDUNILVR.NS", "name": "Hindustan Unilever Ltd."},
-                {"symbol": "ITC.NS", "name": "ITC Ltd."},
-                {"symbol": "SBIN.NS", "name": "State Bank of India"},
-                {"symbol": "BHARTIARTL.NS", "name": "Bharti Airtel Ltd."},
-                {"symbol": "LICI.NS", "name": "Life Insurance Corporation of India"},
-                {"symbol": "KOTAKBANK.NS", "name": "Kotak Mahindra Bank Ltd."},
-                {"symbol": "LT.NS", "name": "Larsen & Toubro Ltd."},
-                {"symbol": "HCLTECH.NS", "name": "HCL Technologies Ltd."},
-                {"symbol": "AXISBANK.NS", "name": "Axis Bank Ltd."},
-                {"symbol": "ASIANPAINT.NS", "name": "Asian Paints Ltd."},
-                {"symbol": "MARUTI.NS", "name": "Maruti Suzuki India Ltd."},
-                {"symbol": "SUNPHARMA.NS", "name": "Sun Pharmaceutical Industries Ltd."},
-                {"symbol": "TITAN.NS", "name": "Titan Company Ltd."},
-                {"symbol": "BAJFINANCE.NS", "name": "Bajaj Finance Ltd."},
-                {"symbol": "ULTRACEMCO.NS", "name": "UltraTech Cement Ltd."},
-                {"symbol": "NTPC.NS", "name": "NTPC Ltd."},
-                {"symbol": "ONGC.NS", "name": "Oil & Natural Gas Corporation Ltd."},
-                {"symbol": "TATAMOTORS.NS", "name": "Tata Motors Ltd."},
-                {"symbol": "POWERGRID.NS", "name": "Power Grid Corporation of India Ltd."},
-                {"symbol": "ADANIENT.NS", "name": "Adani Enterprises Ltd."},
-                {"symbol": "TATASTEEL.NS", "name": "Tata Steel Ltd."},
-                {"symbol": "COALINDIA.NS", "name": "Coal India Ltd."},
-                {"symbol": "WIPRO.NS", "name": "Wipro Ltd."},
-                {"symbol": "M&M.NS", "name": "Mahindra & Mahindra Ltd."},
-                {"symbol": "ADANIPORTS.NS", "name": "Adani Ports and Special Economic Zone Ltd."},
-                {"symbol": "JSWSTEEL.NS", "name": "JSW Steel Ltd."},
-                {"symbol": "BAJAJFINSV.NS", "name": "Bajaj Finserv Ltd."},
-                {"symbol": "HDFCLIFE.NS", "name": "HDFC Life Insurance Company Ltd."},
-                {"symbol": "GRASIM.NS", "name": "Grasim Industries Ltd."},
-                {"symbol": "TECHM.NS", "name": "Tech Mahindra Ltd."},
-                {"symbol": "SBILIFE.NS", "name": "SBI Life Insurance Company Ltd."},
-                {"symbol": "BRITANNIA.NS", "name": "Britannia Industries Ltd."},
-                {"symbol": "INDUSINDBK.NS", "name": "IndusInd Bank Ltd."},
-                {"symbol": "CIPLA.NS", "name": "Cipla Ltd."},
-                {"symbol": "DRREDDY.NS", "name": "Dr. Reddy's Laboratories Ltd."},
-                {"symbol": "EICHERMOT.NS", "name": "Eicher Motors Ltd."},
-                {"symbol": "NESTLEIND.NS", "name": "Nestle India Ltd."},
-                {"symbol": "TATACONSUM.NS", "name": "Tata Consumer Products Ltd."},
-                {"symbol": "DIVISLAB.NS", "name": "Divi's Laboratories Ltd."},
-                {"symbol": "HINDALCO.NS", "name": "Hindalco Industries Ltd."},
-                {"symbol": "APOLLOHOSP.NS", "name": "Apollo Hospitals Enterprise Ltd."},
-                {"symbol": "BAJAJ-AUTO.NS", "name": "Bajaj Auto Ltd."},
-                {"symbol": "HEROMOTOCO.NS", "name": "Hero MotoCorp Ltd."},
-                {"symbol": "UPL.NS", "name": "UPL Ltd."},
-                {"symbol": "BPCL.NS", "name": "Bharat Petroleum Corporation Ltd."},
-                {"symbol": "ZOMATO.NS", "name": "Zomato Ltd."},
-                {"symbol": "PAYTM.NS", "name": "One 97 Communications Ltd. (Paytm)"},
-                {"symbol": "HAL.NS", "name": "Hindustan Aeronautics Ltd."},
-                {"symbol": "DLF.NS", "name": "DLF Ltd."},
-                {"symbol": "VBL.NS", "name": "Varun Beverages Ltd."},
-                {"symbol": "JIOFIN.NS", "name": "Jio Financial Services Ltd."},
-                {"symbol": "SIEMENS.NS", "name": "Siemens Ltd."},
-                {"symbol": "PIDILITIND.NS", "name": "Pidilite Industries Ltd."},
-                {"symbol": "BEL.NS", "name": "Bharat Electronics Ltd."},
-                {"symbol": "IOC.NS", "name": "Indian Oil Corporation Ltd."},
-                {"symbol": "TRENT.NS", "name": "Trent Ltd."},
-                {"symbol": "RECLTD.NS", "name": "REC Ltd."},
-                {"symbol": "PFC.NS", "name": "Power Finance Corporation Ltd."},
-                {"symbol": "GAIL.NS", "name": "GAIL (India) Ltd."},
-                {"symbol": "CHOLAFIN.NS", "name": "Cholamandalam Investment and Finance Company Ltd."},
-                {"symbol": "BANKBARODA.NS", "name": "Bank of Baroda"},
-                {"symbol": "ADANIPOWER.NS", "name": "Adani Power Ltd."},
-                {"symbol": "ADANIGREEN.NS", "name": "Adani Green Energy Ltd."},
-                {"symbol": "ABB.NS", "name": "ABB India Ltd."},
-                {"symbol": "GODREJCP.NS", "name": "Godrej Consumer Products Ltd."},
-                {"symbol": "HAVELLS.NS", "name": "Havells India Ltd."},
-                {"symbol": "SHREECEM.NS", "name": "Shree Cement Ltd."},
-                {"symbol": "TVSMOTOR.NS", "name": "TVS Motor Company Ltd."},
-                {"symbol": "DABUR.NS", "name": "Dabur India Ltd."},
-                {"symbol": "VEDL.NS", "name": "Vedanta Ltd."},
-                {"symbol": "AMBUJACEM.NS", "name": "Ambuja Cements Ltd."},
-                {"symbol": "INDIGO.NS", "name": "InterGlobe Aviation Ltd."},
-                {"symbol": "NAUKRI.NS", "name": "Info Edge (India) Ltd."},
-                {"symbol": "ICICIGI.NS", "name": "ICICI Lombard General Insurance Company Ltd."},
-                {"symbol": "PNB.NS", "name": "Punjab National Bank"},
-                {"symbol": "SBICARD.NS", "name": "SBI Cards and Payment Services Ltd."},
-                {"symbol": "BOSCHLTD.NS", "name": "Bosch Ltd."},
-                {"symbol": "LODHA.NS", "name": "Macrotech Developers Ltd."},
-                {"symbol": "CANBK.NS", "name": "Canara Bank"},
-                {"symbol": "IRCTC.NS", "name": "Indian Railway Catering and Tourism Corporation Ltd."},
-                {"symbol": "MOTHERSON.NS", "name": "Samvardhana Motherson International Ltd."},
-                {"symbol": "SRF.NS", "name": "SRF Ltd."},
-                {"symbol": "MUTHOOTFIN.NS", "name": "Muthoot Finance Ltd."},
-                {"symbol": "BERGEPAINT.NS", "name": "Berger Paints India Ltd."},
-                {"symbol": "ICICIPRULI.NS", "name": "ICICI Prudential Life Insurance Company Ltd."},
-                {"symbol": "MARICO.NS", "name": "Marico Ltd."},
-                {"symbol": "PIIND.NS", "name": "PI Industries Ltd."},
-                {"symbol": "TATAELXSI.NS", "name": "Tata Elxsi Ltd."},
-                {"symbol": "POLYCAB.NS", "name": "Polycab India Ltd."},
-                {"symbol": "ASTRAL.NS", "name": "Astral Ltd."},
-                {"symbol": "ALKEM.NS", "name": "Alkem Laboratories Ltd."},
-                {"symbol": "JSWENERGY.NS", "name": "JSW Energy Ltd."},
-                {"symbol": "TORNTPHARM.NS", "name": "Torrent Pharmaceuticals Ltd."},
-                {"symbol": "MANKIND.NS", "name": "Mankind Pharma Ltd."},
-
-                # --- US Tech Giants ---
-                {"symbol": "AAPL", "name": "Apple Inc."},
-                {"symbol": "MSFT", "name": "Microsoft Corp."},
-                {"symbol": "GOOGL", "name": "Alphabet Inc."},
-                {"symbol": "AMZN", "name": "Amazon.com Inc."},
-                {"symbol": "NVDA", "name": "NVIDIA Corp."},
-                {"symbol": "TSLA", "name": "Tesla Inc."},
-                {"symbol": "META", "name": "Meta Platforms"},
-                {"symbol": "NFLX", "name": "Netflix Inc."},
-            ]
-            
-            q = query.upper()
-            for stock in common_stocks:
-                if q in stock["symbol"] or q in stock["name"].upper():
-                    results.append(stock)
-            
-            return results
+            columns = DataService._download_many(list(symbols), interval="1d", period="5d")
+        except Exception as e:
+            print(f"Error fetching quotes for {len(symbols)} symbols: {e}")
+            return {}
+        return {symbol: float(cols["close"][-1]) for symbol, cols in columns.items() if len(cols["close"])}
+
+    @staticmethod
+    def list_symbols() -> List[str]:
+        """Every symbol in the catalog."""
+        return symbol_catalog.symbols()
+
+    @staticmethod
+    def search_symbols(query: str, limit: int = 20) -> List[Dict[str, str]]:
+        """
+        Search the local symbol catalog (app/data/symbols.csv, or SYMBOL_CATALOG_PATH
+        for a full exchange listing). yfinance has no search API, so listings are
+        kept locally and indexed once; see SymbolCatalog for ranking.
+        """
+        try:
+            return symbol_catalog.search(query, limit=limit)
         except Exception as e:
             print(f"Search error: {e}")
             return []
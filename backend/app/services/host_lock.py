@@ -0,0 +1,49 @@
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+from ..models.db import SQLALCHEMY_DATABASE_URL
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so locks always succeed (one dev server per host)
+    fcntl = None
+
+LOCK_DIR = os.getenv("LOCK_DIR", tempfile.gettempdir())
+
+
+def lock_path(name: str) -> str:
+    """
+    Lock file for `name`, per database: app processes sharing a database share
+    the lock, separate deployments on one host do not.
+    """
+    url = SQLALCHEMY_DATABASE_URL
+    if url.startswith("sqlite:///"):
+        url = os.path.abspath(url[len("sqlite:///"):])
+    return os.path.join(LOCK_DIR, f"stock-analyzer-{name}-{zlib.crc32(url.encode()):08x}.lock")
+
+
+def try_lock(name: str) -> Optional[IO]:
+    """
+    Take the host-wide lock `name` without waiting. Returns the open lock file,
+    which holds the lock until it is closed (or the process exits), or None when
+    another process holds it.
+    """
+    handle = open(lock_path(name), "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    return handle
+
+
+@contextmanager
+def hold_lock(name: str) -> Iterator[None]:
+    """Hold the host-wide lock `name`, waiting for other processes to release it first."""
+    with open(lock_path(name), "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
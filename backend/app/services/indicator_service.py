@@ -1,33 +1,258 @@
-import pandas as pd
-from typing import List
-from ..models.schemas import OHLCV
+import numpy as np
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Tuple
+from ..models.bar_series import BarSeries
+from .metrics import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Indicator registry: name -> function(ctx, *params) returning {output_suffix: array}.
+# Requested as "NAME" or "NAME_p1_p2", e.g. "SMA_20", "MACD_12_26_9", "BB_20_2".
+INDICATORS: Dict[str, Callable[..., Dict[str, np.ndarray]]] = {}
+DEFAULT_PARAMS: Dict[str, Tuple] = {}
+
+
+def indicator(name: str, *defaults):
+    def register(func):
+        INDICATORS[name] = func
+        DEFAULT_PARAMS[name] = defaults
+        return func
+    return register
+
+
+def parse_spec(spec: str) -> Tuple[str, Tuple]:
+    name, *raw = spec.upper().split("_")
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {spec}")
+    params = tuple(float(p) if "." in p else int(p) for p in raw) or DEFAULT_PARAMS[name]
+    return name, params
+
+
+class IndicatorContext:
+    """
+    Memoized intermediates for one pass over a series. Indicators ask the context
+    for diffs, cumulative sums and smoothed series instead of recomputing them,
+    so e.g. SMA_20 and BB_20_2 share one rolling mean and RSI_14/RSI_7 share the
+    gain/loss split.
+    """
+
+    def __init__(self, data: BarSeries):
+        self.data = data
+        self.n = len(data)
+        self._cache: Dict[tuple, np.ndarray] = {}
+
+    def _memo(self, key: tuple, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def column(self, name: str) -> np.ndarray:
+        if name == "typical":
+            return self._memo(("typical",), lambda: (self.data.high + self.data.low + self.data.close) / 3.0)
+        if name == "close_sq":
+            return self._memo(("close_sq",), lambda: self.data.close * self.data.close)
+        if name == "pv":
+            return self._memo(("pv",), lambda: self.column("typical") * self.column("volume"))
+        return getattr(self.data, name).astype(np.float64, copy=False)
+
+    def diff(self) -> np.ndarray:
+        def compute():
+            out = np.empty(self.n)
+            out[:1] = np.nan
+            out[1:] = np.diff(self.data.close)
+            return out
+        return self._memo(("diff",), compute)
+
+    def gains(self) -> np.ndarray:
+        return self._memo(("gains",), lambda: np.where(self.diff() > 0, self.diff(), 0.0))
+
+    def losses(self) -> np.ndarray:
+        return self._memo(("losses",), lambda: np.where(self.diff() < 0, -self.diff(), 0.0))
+
+    def cumsum(self, name: str) -> np.ndarray:
+        """Prefix sums with a leading zero, shared by every rolling window over `name`."""
+        def compute():
+            out = np.zeros(self.n + 1)
+            np.cumsum(self.column(name), out=out[1:])
+            return out
+        return self._memo(("cumsum", name), compute)
+
+    def rolling_sum(self, name: str, window: int) -> np.ndarray:
+        def compute():
+            out = np.full(self.n, np.nan)
+            if 0 < window <= self.n:
+                c = self.cumsum(name)
+                out[window - 1:] = c[window:] - c[:-window]
+            return out
+        return self._memo(("rolling_sum", name, window), compute)
+
+    def rolling_mean(self, name: str, window: int) -> np.ndarray:
+        return self._memo(("rolling_mean", name, window), lambda: self.rolling_sum(name, window) / window)
+
+    def rolling_std(self, window: int) -> np.ndarray:
+        """Population std of close from shared rolling sums of x and x^2."""
+        def compute():
+            mean = self.rolling_mean("close", window)
+            var = self.rolling_mean("close_sq", window) - mean * mean
+            return np.sqrt(np.maximum(var, 0.0))
+        return self._memo(("rolling_std", window), compute)
+
+    def ema(self, name: str, span: int) -> np.ndarray:
+        return self._memo(("ema", name, span), lambda: ewm(self.column(name), 2.0 / (span + 1)))
+
+    def wilder(self, key: str, window: int) -> np.ndarray:
+        """Wilder smoothing seeded with the simple mean of the first `window` values."""
+        def compute():
+            values = {"gains": self.gains, "losses": self.losses, "true_range": self.true_range}[key]()
+            out = np.full(self.n, np.nan)
+            # gains/losses/true range start at index 1 (index 0 has no previous close).
+            start = 1 if key != "true_range" else 0
+            if self.n - start < window:
+                return out
+            seed_at = start + window - 1
+            seeded = values[seed_at:].copy()
+            seeded[0] = values[start:seed_at + 1].mean()
+            out[seed_at:] = ewm(seeded, 1.0 / window)
+            return out
+        return self._memo(("wilder", key, window), compute)
+
+    def true_range(self) -> np.ndarray:
+        def compute():
+            high, low, close = self.data.high, self.data.low, self.data.close
+            prev_close = np.empty(self.n)
+            prev_close[:1] = close[:1]
+            prev_close[1:] = close[:-1]
+            return np.maximum(high, prev_close) - np.minimum(low, prev_close)
+        return self._memo(("true_range",), compute)
+
+
+def ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    # pandas' ewm runs the recursion in C; adjust=False gives the textbook recursive EMA.
+    if values.ndim == 1:
+        import pandas as pd
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    # 2-D (see screener_service.CrossSectionContext): smooth down each column, one
+    # vectorized step per row. Each column starts at its first non-NaN value.
+    out = np.empty_like(values)
+    prev = np.full(values.shape[1], np.nan)
+    for t, row in enumerate(values):
+        prev = np.where(np.isnan(prev), row, prev + alpha * (row - prev))
+        out[t] = prev
+    return out
+
+
+@indicator("SMA", 20)
+def _sma(ctx: IndicatorContext, window: int):
+    return {"": ctx.rolling_mean("close", window)}
+
+
+@indicator("EMA", 20)
+def _ema(ctx: IndicatorContext, span: int):
+    return {"": ctx.ema("close", span)}
+
+
+@indicator("RSI", 14)
+def _rsi(ctx: IndicatorContext, window: int):
+    avg_gain = ctx.wilder("gains", window)
+    avg_loss = ctx.wilder("losses", window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where((avg_loss == 0) & ~np.isnan(avg_gain), 100.0, rsi)
+    return {"": rsi}
+
+
+@indicator("MACD", 12, 26, 9)
+def _macd(ctx: IndicatorContext, fast: int, slow: int, signal: int):
+    macd = ctx.ema("close", fast) - ctx.ema("close", slow)
+    signal_line = ewm(macd, 2.0 / (signal + 1))
+    return {"": macd, "_signal": signal_line, "_hist": macd - signal_line}
+
+
+@indicator("BB", 20, 2)
+def _bollinger(ctx: IndicatorContext, window: int, num_std: float):
+    mid = ctx.rolling_mean("close", window)
+    band = num_std * ctx.rolling_std(window)
+    return {"_mid": mid, "_upper": mid + band, "_lower": mid - band}
+
+
+@indicator("STD", 20)
+def _std(ctx: IndicatorContext, window: int):
+    return {"": ctx.rolling_std(window)}
+
+
+@indicator("ATR", 14)
+def _atr(ctx: IndicatorContext, window: int):
+    return {"": ctx.wilder("true_range", window)}
+
+
+@indicator("VWAP")
+def _vwap(ctx: IndicatorContext, window: int = 0):
+    # Cumulative VWAP over the series, or rolling over `window` bars ("VWAP_20").
+    if window:
+        pv_sum, vol_sum = ctx.rolling_sum("pv", window), ctx.rolling_sum("volume", window)
+    else:
+        pv_sum, vol_sum = ctx.cumsum("pv")[1:], ctx.cumsum("volume")[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {"": np.where(vol_sum > 0, pv_sum / vol_sum, np.nan)}
+
+
+@indicator("OBV")
+def _obv(ctx: IndicatorContext):
+    direction = np.sign(np.nan_to_num(ctx.diff()))
+    return {"": np.cumsum(direction * ctx.column("volume"), axis=0)}
+
+
+@indicator("ROC", 20)
+def _roc(ctx: IndicatorContext, window: int):
+    close = ctx.data.close
+    out = np.full(close.shape, np.nan)
+    if window < ctx.n:
+        out[window:] = close[window:] / close[:-window] - 1.0
+    return {"": out}
+
 
 class IndicatorService:
     @staticmethod
-    def to_dataframe(data: List[OHLCV]) -> pd.DataFrame:
-        df = pd.DataFrame([d.dict() for d in data])
-        if not df.empty:
-            df.set_index('date', inplace=True)
-            df.sort_index(inplace=True)
-        return df
+    @timed("indicators")
+    def compute(data: BarSeries, indicators: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Compute a set of indicators in one pass over the series' arrays.
+        Returns {spec + output suffix: array aligned with the bars}, e.g.
+        ["SMA_20", "BB_20_2"] -> SMA_20, BB_20_2_mid, BB_20_2_upper, BB_20_2_lower.
+        """
+        ctx = IndicatorContext(data)
+        results: Dict[str, np.ndarray] = {}
+        for spec in indicators:
+            name, params = parse_spec(spec)
+            for suffix, values in INDICATORS[name](ctx, *params).items():
+                results[spec + suffix] = values
+        return results
+
+    @staticmethod
+    def available() -> List[str]:
+        return sorted(INDICATORS)
+
+    @staticmethod
+    def to_dataframe(data: BarSeries) -> "pd.DataFrame":
+        return data.to_dataframe()
+
+    @staticmethod
+    def _series(data: BarSeries, values: np.ndarray) -> "pd.Series":
+        import pandas as pd
+        return pd.Series(values, index=pd.DatetimeIndex(data.datetimes, name='date'))
 
     @staticmethod
-    def calculate_sma(data: List[OHLCV], window: int = 20) -> pd.Series:
-        df = IndicatorService.to_dataframe(data)
-        if df.empty:
+    def calculate_sma(data: BarSeries, window: int = 20) -> "pd.Series":
+        if not data:
+            import pandas as pd
             return pd.Series()
-        return df['close'].rolling(window=window).mean()
+        spec = f"SMA_{window}"
+        return IndicatorService._series(data, IndicatorService.compute(data, [spec])[spec])
 
     @staticmethod
-    def calculate_rsi(data: List[OHLCV], window: int = 14) -> pd.Series:
-        df = IndicatorService.to_dataframe(data)
-        if df.empty:
+    def calculate_rsi(data: BarSeries, window: int = 14) -> "pd.Series":
+        if not data:
+            import pandas as pd
             return pd.Series()
-        
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        spec = f"RSI_{window}"
+        return IndicatorService._series(data, IndicatorService.compute(data, [spec])[spec])
@@ -0,0 +1,254 @@
+import io
+import os
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Set
+from sqlalchemy import func, insert, text
+from sqlalchemy.orm import Session
+from ..models.sql_models import TradeSQL, HoldingSQL, LotSQL, CashEntrySQL
+from ..models.schemas import Trade
+
+LEDGER_METHOD = os.getenv("LEDGER_METHOD", "fifo")  # fifo or average
+INITIAL_CASH = 100000.0
+LEDGER_LOCK_KEY = 7301  # Postgres advisory lock id held by ledger writers
+
+# Accepted CSV headers for each Trade field (case-insensitive).
+CSV_COLUMNS = {
+    "date": ("date", "datetime", "time", "trade_date"),
+    "symbol": ("symbol", "ticker"),
+    "trade_type": ("trade_type", "type", "side", "action"),
+    "price": ("price",),
+    "quantity": ("quantity", "qty", "shares"),
+}
+
+
+class LotBook:
+    """
+    Open lots per symbol, applied trade by trade. FIFO sells close the oldest lots
+    first; with the "average" method a symbol has one lot at its average cost.
+    Selling more than is held raises ValueError.
+    """
+
+    def __init__(self, method: str = LEDGER_METHOD):
+        if method not in ("fifo", "average"):
+            raise ValueError(f"Unknown lot method: {method}")
+        self.method = method
+        self.lots: Dict[str, Deque[list]] = {}  # symbol -> [date, price, quantity] oldest first
+        self.held: Dict[str, int] = {}
+
+    def load(self, rows: Iterable[tuple]) -> None:
+        """Open lots as (symbol, date, price, quantity), oldest first."""
+        for symbol, date, price, quantity in rows:
+            self.lots.setdefault(symbol, deque()).append([date, price, quantity])
+            self.held[symbol] = self.held.get(symbol, 0) + quantity
+
+    def apply(self, symbol: str, trade_type: str, date: datetime, price: float, quantity: int) -> float:
+        """Apply one trade; return its realized P&L (always 0 for buys)."""
+        lots = self.lots.setdefault(symbol, deque())
+        held = self.held.get(symbol, 0)
+        if trade_type == "BUY":
+            if self.method == "average" and lots:
+                _, avg, _ = lots[0]
+                lots[0] = [lots[0][0], (avg * held + price * quantity) / (held + quantity), held + quantity]
+            else:
+                lots.append([date, price, quantity])
+            self.held[symbol] = held + quantity
+            return 0.0
+        if trade_type != "SELL":
+            raise ValueError(f"Unknown trade type: {trade_type}")
+        if quantity > held:
+            raise ValueError(f"Cannot sell {quantity} {symbol} on {date:%Y-%m-%d}: only {held} held")
+
+        pnl, left = 0.0, quantity
+        while left:
+            lot = lots[0]
+            take = min(left, lot[2])
+            pnl += (price - lot[1]) * take
+            lot[2] -= take
+            left -= take
+            if lot[2] == 0:
+                lots.popleft()
+        self.held[symbol] = held - quantity
+        return pnl
+
+
+class LedgerService:
+    """
+    Trades, open lots, holdings and cash kept consistent in one place.
+
+    Every write path applies trades through a LotBook (filling in `pnl`), records
+    their cash movements, and rewrites lots and holdings of the touched symbols
+    with batched statements, all in one transaction. Cash is INITIAL_CASH plus the
+    sum of the cash ledger.
+    """
+
+    def __init__(self, db: Session, method: str = LEDGER_METHOD):
+        self.db = db
+        self.method = method
+
+    def cash(self) -> float:
+        return INITIAL_CASH + float(self.db.query(func.coalesce(func.sum(CashEntrySQL.amount), 0.0)).scalar())
+
+    def cost_basis(self, symbols: Optional[List[str]] = None) -> Dict[str, float]:
+        """Total cost of the open lots of each symbol."""
+        query = self.db.query(LotSQL.symbol, func.sum(LotSQL.price * LotSQL.quantity)).group_by(LotSQL.symbol)
+        if symbols is not None:
+            query = query.filter(LotSQL.symbol.in_(symbols))
+        return {symbol: float(cost) for symbol, cost in query}
+
+    def realized_pnl(self) -> float:
+        return float(self.db.query(func.coalesce(func.sum(TradeSQL.pnl), 0.0)).scalar())
+
+    def record(self, trades: List[Trade]) -> List[Trade]:
+        """
+        Apply and store trades in one transaction; nothing is stored if any of them
+        is invalid. Trades dated before the latest stored one change the P&L of
+        later trades of the same symbols, so those symbols are replayed. Returns the
+        stored trades with ids and pnl.
+        """
+        if not trades:
+            return []
+        rows = sorted((self._trade_row(t) for t in trades), key=lambda r: r["date"])
+        try:
+            self._lock()
+            symbols = {r["symbol"] for r in rows}
+            last = self.db.query(func.max(TradeSQL.date)).filter(TradeSQL.symbol.in_(symbols)).scalar()
+            if last is not None and rows[0]["date"] < last:
+                ids = self._insert_trades(rows)
+                self._replay(symbols)
+                pnl = dict(self.db.query(TradeSQL.id, TradeSQL.pnl).filter(TradeSQL.id.between(min(ids), max(ids))))
+                for trade_id, row in zip(ids, rows):
+                    row["pnl"] = pnl[trade_id]
+            else:
+                book = LotBook(self.method)
+                book.load(self.db.query(LotSQL.symbol, LotSQL.date, LotSQL.price, LotSQL.quantity)
+                          .filter(LotSQL.symbol.in_(symbols)).order_by(LotSQL.date, LotSQL.id))
+                for row in rows:
+                    row["pnl"] = book.apply(row["symbol"], row["trade_type"], row["date"], row["price"], row["quantity"])
+                ids = self._insert_trades(rows)
+                self._write_positions(book, symbols)
+            self.db.bulk_insert_mappings(CashEntrySQL, [self._cash_entry({**r, "id": i}) for i, r in zip(ids, rows)])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return [Trade(id=i, **row) for i, row in zip(ids, rows)]
+
+    def _insert_trades(self, rows: List[Dict]) -> List[int]:
+        """One batched INSERT ... RETURNING; ids come back in row order."""
+        return list(self.db.scalars(insert(TradeSQL).returning(TradeSQL.id, sort_by_parameter_order=True), rows))
+
+    def import_csv(self, text: str) -> Dict:
+        """Record every trade of a CSV (date, symbol, trade_type, price, quantity) in one transaction."""
+        import pandas as pd
+        df = pd.read_csv(io.StringIO(text))
+        headers = {c.strip().lower(): c for c in df.columns}
+        columns = {}
+        for field, aliases in CSV_COLUMNS.items():
+            found = next((headers[a] for a in aliases if a in headers), None)
+            if found is None:
+                raise ValueError(f"CSV has no {field} column (accepted: {', '.join(aliases)})")
+            columns[field] = df[found]
+
+        dates = pd.to_datetime(columns["date"]).dt.tz_localize(None).dt.to_pydatetime()
+        trades = [
+            Trade(date=d, symbol=s, trade_type=t, price=p, quantity=q)
+            for d, s, t, p, q in zip(dates, columns["symbol"].astype(str).str.strip().str.upper(),
+                                     columns["trade_type"].astype(str).str.strip().str.upper(),
+                                     columns["price"].astype(float), columns["quantity"].astype(int))
+        ]
+        stored = self.record(trades)
+        return {"imported": len(stored), "realized_pnl": sum(t.pnl for t in stored), "cash": self.cash()}
+
+    def deposit(self, amount: float, date: Optional[datetime] = None) -> float:
+        """Add (or with a negative amount, withdraw) cash; returns the new balance."""
+        self.db.add(CashEntrySQL(date=date or datetime.now(), kind="DEPOSIT" if amount >= 0 else "WITHDRAWAL",
+                                 amount=amount, description="Deposit" if amount >= 0 else "Withdrawal"))
+        self.db.commit()
+        return self.cash()
+
+    def rebuild(self) -> Dict:
+        """Recompute pnl, lots, holdings and trade cash entries from the trade history."""
+        try:
+            self._lock()
+            summary = self._replay()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return summary
+
+    def _lock(self) -> None:
+        """
+        Serialize ledger writers for the rest of the transaction: each one reads
+        the open lots and then rewrites them, so two at once would lose updates.
+        """
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LEDGER_LOCK_KEY})
+        elif dialect == "sqlite":
+            # A write that matches no rows takes SQLite's write lock up front;
+            # other writers wait here (busy_timeout) rather than read stale lots.
+            self.db.execute(text("UPDATE holdings SET quantity = quantity WHERE 0"))
+
+    def _replay(self, symbols: Optional[Set[str]] = None) -> Dict:
+        """
+        Re-apply the trade history of `symbols` (all symbols if None) to fresh lots.
+        Realized P&L only depends on a symbol's own trades, and cash entries do
+        not depend on order, so a full replay is only needed for rebuild().
+        """
+        query = self.db.query(TradeSQL.id, TradeSQL.symbol, TradeSQL.trade_type, TradeSQL.date,
+                              TradeSQL.price, TradeSQL.quantity, TradeSQL.pnl)
+        if symbols is not None:
+            query = query.filter(TradeSQL.symbol.in_(symbols))
+        rows = query.order_by(TradeSQL.date, TradeSQL.id).all()
+        book = LotBook(self.method)
+        pnl_updates, realized = [], 0.0
+        for row in rows:
+            pnl = book.apply(row.symbol, row.trade_type, row.date, row.price, row.quantity)
+            realized += pnl
+            if row.pnl != pnl:
+                pnl_updates.append({"id": row.id, "pnl": pnl})
+        self.db.bulk_update_mappings(TradeSQL, pnl_updates)
+
+        if symbols is None:
+            self.db.query(CashEntrySQL).filter(CashEntrySQL.kind == "TRADE").delete(synchronize_session=False)
+            self.db.bulk_insert_mappings(CashEntrySQL, [self._cash_entry(row._mapping) for row in rows])
+            self.db.query(LotSQL).delete(synchronize_session=False)
+            self.db.query(HoldingSQL).delete(synchronize_session=False)
+            symbols = set(book.lots)
+        self._write_positions(book, symbols)
+        return {"trades": len(rows), "symbols": len(symbols), "realized_pnl": realized}
+
+    def _write_positions(self, book: LotBook, symbols: Iterable[str]) -> None:
+        """Replace the stored lots and holdings of `symbols` with the book's."""
+        symbols = list(symbols)
+        self.db.query(LotSQL).filter(LotSQL.symbol.in_(symbols)).delete(synchronize_session=False)
+        self.db.bulk_insert_mappings(LotSQL, [
+            {"symbol": s, "date": date, "price": price, "quantity": quantity}
+            for s in symbols for date, price, quantity in book.lots.get(s, ())
+        ])
+        existing = dict(self.db.query(HoldingSQL.symbol, HoldingSQL.id).filter(HoldingSQL.symbol.in_(symbols)))
+        self.db.bulk_update_mappings(HoldingSQL, [
+            {"id": existing[s], "quantity": book.held.get(s, 0)} for s in symbols if s in existing
+        ])
+        self.db.bulk_insert_mappings(HoldingSQL, [
+            {"symbol": s, "quantity": book.held.get(s, 0)} for s in symbols if s not in existing
+        ])
+
+    @staticmethod
+    def _trade_row(trade: Trade) -> Dict:
+        if trade.quantity <= 0 or trade.price <= 0:
+            raise ValueError(f"Trade quantity and price must be positive: {trade.symbol} {trade.quantity} @ {trade.price}")
+        return {"date": trade.date, "symbol": trade.symbol.upper(), "trade_type": trade.trade_type.upper(),
+                "price": trade.price, "quantity": trade.quantity, "pnl": 0.0}
+
+    @staticmethod
+    def _cash_entry(trade) -> Dict:
+        """Cash movement of a stored trade (any mapping with the TradeSQL columns)."""
+        sign = -1 if trade["trade_type"] == "BUY" else 1
+        return {
+            "date": trade["date"], "kind": "TRADE", "amount": sign * trade["price"] * trade["quantity"],
+            "trade_id": trade["id"],
+            "description": f"{trade['trade_type']} {trade['quantity']} {trade['symbol']} @ {trade['price']:g}",
+        }
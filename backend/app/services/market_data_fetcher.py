@@ -0,0 +1,52 @@
+import asyncio
+import os
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+from ..models.bar_series import BarSeries
+from .data_service import DataService
+
+
+class MarketDataFetcher:
+    """
+    Async front end for DataService used by the API handlers.
+
+    yfinance is blocking, so provider work still runs on threads, but:
+    - at most `max_concurrency` fetches run at once, so a slow provider cannot
+      exhaust the thread pool; waiting requests hold no thread;
+    - concurrent requests for the same key share one in-flight fetch;
+    - rate limiting and retries with backoff happen in DataService's provider
+      calls (see rate_limit.py), so they also cover the sync code paths.
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def _run(self, func: Callable, *args) -> Any:
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    async def _coalesced(self, key: Hashable, func: Callable, *args) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(func, *args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield: one cancelled client must not cancel the fetch others are awaiting.
+        return await asyncio.shield(task)
+
+    async def fetch_history(self, symbol: str, period: str = "1y", interval: str = "1d") -> BarSeries:
+        return await self._coalesced(("history", symbol, period, interval), DataService.fetch_history, symbol, period, interval)
+
+    async def fetch_many(self, symbols: List[str], period: str = "1y", interval: str = "1d") -> Dict[str, BarSeries]:
+        """Batched fetch (one provider call per chunk of symbols)."""
+        key = ("many", tuple(sorted(set(symbols))), period, interval)
+        return await self._coalesced(key, DataService.fetch_many, list(symbols), period, interval)
+
+    async def get_current_price(self, symbol: str) -> float:
+        return await self._coalesced(("price", symbol), DataService.get_current_price, symbol)
+
+    async def get_current_quote(self, symbol: str) -> Tuple[int, float]:
+        return await self._coalesced(("quote", symbol), DataService.get_current_quote, symbol)
+
+
+market_data = MarketDataFetcher(max_concurrency=int(os.getenv("FETCH_CONCURRENCY", 8)))
@@ -0,0 +1,243 @@
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Opt-in: with PROFILING=1, ?profile=1 (or an X-Profile: 1 header) returns a folded-stack profile of the request.
+PROFILING_ENABLED = os.getenv("PROFILING", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"] + [
+            f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in values
+        ]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names, self.buckets = name, help, labels, buckets
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {values[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {values[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics in the Prometheus text format. Collectors are callbacks
+    run at scrape time for values that live elsewhere (e.g. cache statistics); each
+    returns (name, type, help, {label: value}, value) samples.
+    """
+
+    def __init__(self):
+        self.metrics: list = []
+        self.collectors: List[Callable[[], List[tuple]]] = []
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, func: Callable[[], List[tuple]]) -> Callable[[], List[tuple]]:
+        self.collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        lines = [line for metric in self.metrics for line in metric.render()]
+        described = set()
+        for collect in self.collectors:
+            try:
+                samples = collect()
+            except Exception:
+                logger.exception(f"Metrics collector {getattr(collect, '__name__', collect)} failed")
+                continue
+            for name, kind, help, labels, value in samples:
+                if name not in described:
+                    described.add(name)
+                    lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Time to the response start by route template", ("method", "route", "status"))
+STAGE_DURATION = registry.histogram(
+    "stage_duration_seconds", "Time spent in named pipeline stages (stages may nest)", ("stage",))
+PROVIDER_CALLS = registry.counter(
+    "provider_calls_total", "Market data provider calls", ("provider", "call", "outcome"))
+MOCK_FALLBACKS = registry.counter(
+    "mock_data_fallbacks_total", "Requests served synthetic data because the provider failed")
+SCHEDULER_JOB_DURATION = registry.histogram(
+    "scheduler_job_duration_seconds", "Scheduler job run time", ("job",))
+SCHEDULER_JOB_FAILURES = registry.counter(
+    "scheduler_job_failures_total", "Scheduler job runs that raised", ("job",))
+
+# Stage totals of the request being handled, for its Server-Timing header.
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block into stage_duration_seconds and the current request's stage totals."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage=name)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + elapsed
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of stage()."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def track_request() -> Tuple[Dict[str, float], object]:
+    """
+    Start collecting stage totals for the current request. Worker threads started
+    from it (run_in_threadpool, asyncio.to_thread) copy the context, so their stages
+    land in the same dict. Pass the token to end_request().
+    """
+    stages: Dict[str, float] = {}
+    return stages, _request_stages.set(stages)
+
+
+def end_request(token: object) -> None:
+    _request_stages.reset(token)
+
+
+def server_timing(stages: Dict[str, float], total: float) -> str:
+    """Server-Timing header value (milliseconds), shown per request in browser dev tools."""
+    parts = [f"{name.replace('.', '-')};dur={seconds * 1000:.2f}" for name, seconds in stages.items()]
+    return ", ".join(parts + [f"total;dur={total * 1000:.2f}"])
+
+
+class StackSampler:
+    """
+    Sampling profiler for one request: every `interval` seconds it records the
+    Python stack of every busy thread and counts identical stacks. `stop()` returns
+    them as folded stacks ("outer;inner;leaf count" per line), the input format of
+    flamegraph.pl, speedscope and inferno. Threads parked in the event loop's select
+    or waiting for work are skipped. All threads are sampled, so concurrent requests
+    show up too: profile on an otherwise idle server.
+    """
+
+    IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+    IDLE_FUNCTIONS = {("thread.py", "_worker"), ("_asyncio.py", "run")}
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples: Tally = Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or self._idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def _idle(self, frame) -> bool:
+        filename = os.path.basename(frame.f_code.co_filename)
+        return filename in self.IDLE_FILES or (filename, frame.f_code.co_name) in self.IDLE_FUNCTIONS
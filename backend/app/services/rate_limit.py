@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+from .host_lock import LOCK_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so each process keeps its own bucket
+    fcntl = None
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Callers reserve tokens up front (the balance may go
+    negative) and then wait out the deficit, so waiters are served in arrival order
+    and the long-run rate never exceeds `rate` tokens per second.
+
+    With a `path`, the balance lives in that file under an exclusive flock instead
+    of in memory, so every process on the host (uvicorn workers, batch pool
+    workers) draws from the same bucket.
+    """
+
+    def __init__(self, rate: float, capacity: float, path: Optional[str] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.path = path if fcntl is not None else None
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            if self.path is not None:
+                return self._reserve_shared(tokens)
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(tokens, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def _reserve_shared(self, tokens: float) -> float:
+        # Wall-clock time: monotonic clocks are not comparable across processes everywhere.
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                state = json.loads(f.read())
+                balance, updated = float(state["tokens"]), float(state["updated"])
+            except (ValueError, KeyError, TypeError):
+                balance, updated = self.capacity, time.time()
+            now = time.time()
+            balance = min(self.capacity, balance + max(now - updated, 0.0) * self.rate) - min(tokens, self.capacity)
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({"tokens": balance, "updated": now}))
+        return 0.0 if balance >= 0 else -balance / self.rate
+
+    def acquire(self, tokens: float = 1) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# One bucket per upstream provider, shared by every process on the host (see
+# TokenBucket). Hosts do not share it: N hosts make up to N times the rate.
+PROVIDER_LIMITS = {
+    "yahoo": TokenBucket(
+        rate=float(os.getenv("YAHOO_RATE_LIMIT", 5)),
+        capacity=float(os.getenv("YAHOO_RATE_BURST", 20)),
+        path=os.path.join(LOCK_DIR, "stock-analyzer-yahoo.rate"),
+    ),
+}
+
+# Errors worth retrying, matched by class name anywhere in the exception's MRO so
+# neither yfinance nor its HTTP client (requests or curl_cffi) is imported here.
+# Anything else, e.g. an unknown or delisted symbol, fails on the first attempt.
+TRANSIENT_ERRORS = {
+    "ConnectionError", "TimeoutError", "Timeout", "ReadTimeout", "ConnectTimeout",
+    "ChunkedEncodingError", "IncompleteRead", "gaierror", "YFRateLimitError",
+}
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
+def is_transient(error: BaseException) -> bool:
+    """Network failures, timeouts, rate limiting (429) and 5xx responses."""
+    if any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in TRANSIENT_STATUS
+
+
+def with_retries(func: Callable[[], T], retries: int = 3, backoff: float = 0.5,
+                 retry_if: Callable[[BaseException], bool] = is_transient,
+                 limiter: Optional[TokenBucket] = None, tokens: float = 1) -> T:
+    """
+    Call `func`, retrying with exponential backoff plus jitter on errors `retry_if`
+    accepts. Every attempt, retries included, first takes `tokens` from `limiter`.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire(tokens)
+        try:
+            return func()
+        except Exception as e:
+            if attempt == retries or not retry_if(e):
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random() * 0.25))
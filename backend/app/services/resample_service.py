@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+from ..models.bar_series import BarSeries
+from .bar_store import bar_store
+from .metrics import stage
+
+MINUTE_NS = 60 * 1_000_000_000
+DAY_NS = 24 * 60 * MINUTE_NS
+
+# Intervals the API serves. Intraday ones are in minutes; the rest are calendar buckets.
+INTRADAY_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "30m": 30, "1h": 60}
+CALENDAR_INTERVALS = ("1d", "1wk", "1mo", "3mo")
+INTERVALS = tuple(INTRADAY_MINUTES) + CALENDAR_INTERVALS
+ALIASES = {"60m": "1h", "1w": "1wk", "1M": "1mo"}
+
+# Intervals fetched from the provider and kept in the bar store, finest first,
+# with how far back the provider serves them (days; None = everything).
+# Every other interval is resampled from one of these.
+BASE_INTERVALS = {"1m": 7, "5m": 60, "1h": 730, "1d": None}
+
+RESAMPLE_CACHE_SIZE = int(os.getenv("RESAMPLE_CACHE_SIZE", 256))
+
+
+def normalize_interval(interval: str) -> str:
+    interval = ALIASES.get(interval, interval)
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval} (expected one of {', '.join(INTERVALS)})")
+    return interval
+
+
+def base_candidates(interval: str, period_days: Optional[float]) -> Tuple[str, ...]:
+    """
+    Base intervals `interval` can be resampled from over a period, finest first.
+    Calendar intervals come from daily bars; intraday ones from any finer base that
+    divides them and that the provider serves that far back.
+    """
+    if interval in CALENDAR_INTERVALS:
+        return ("1d",)
+    minutes = INTRADAY_MINUTES[interval]
+    candidates = tuple(
+        base for base, reach in BASE_INTERVALS.items()
+        if base in INTRADAY_MINUTES and minutes % INTRADAY_MINUTES[base] == 0
+        and period_days is not None and period_days <= reach
+    )
+    if not candidates:
+        raise ValueError(f"{interval} bars are not available that far back")
+    return candidates
+
+
+def bucket_starts(date: np.ndarray, interval: str) -> np.ndarray:
+    """Start of the bucket each bar falls in (int64 ns), non-decreasing for sorted dates."""
+    if interval in INTRADAY_MINUTES:
+        step = INTRADAY_MINUTES[interval] * MINUTE_NS
+        # Anchor each day's buckets on its first bar floored to the half hour, so hourly
+        # bars line up with a 9:30 session open like the provider's own.
+        day = date // DAY_NS
+        first = np.flatnonzero(np.diff(day, prepend=day[0] - 1))
+        anchor = np.repeat(date[first] // (30 * MINUTE_NS) * (30 * MINUTE_NS), np.diff(np.append(first, len(date))))
+        return anchor + (date - anchor) // step * step
+    days = date // DAY_NS
+    if interval == "1d":
+        return days * DAY_NS
+    if interval == "1wk":
+        # Weeks start on Monday (1970-01-05 was the first Monday after the epoch).
+        return ((days - 4) // 7 * 7 + 4) * DAY_NS
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if interval == "3mo":
+        months = months // 3 * 3
+    return months.astype("datetime64[M]").astype("datetime64[ns]").astype(np.int64)
+
+
+def resample(series: BarSeries, interval: str) -> BarSeries:
+    """
+    Aggregate sorted bars into `interval` buckets: first open, max high, min low,
+    last close, summed volume. Each bucket is labelled with its start. The last
+    bucket may still be forming.
+    """
+    if not len(series) or series.interval == interval:
+        return series
+    buckets = bucket_starts(series.date, interval)
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    ends = np.append(starts[1:], len(buckets)) - 1
+    return BarSeries(
+        buckets[starts],
+        series.open[starts],
+        np.maximum.reduceat(series.high, starts),
+        np.minimum.reduceat(series.low, starts),
+        series.close[ends],
+        np.add.reduceat(series.volume, starts),
+        symbol=series.symbol, interval=interval,
+    )
+
+
+class ResampleCache:
+    """
+    LRU cache of resampled series keyed by (symbol, base, interval). Entries are
+    tied to the base's bar store generation, so any write to the base (a top-up
+    or a refetch) invalidates the series derived from it.
+    """
+
+    def __init__(self, max_entries: int = RESAMPLE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[object, BarSeries]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str, base: str, interval: str) -> BarSeries:
+        """The full stored `base` series for a symbol, resampled to `interval`."""
+        key = (symbol, base, interval)
+        meta = bar_store.meta(symbol, base) or {}
+        generation = meta.get("files", meta.get("generation", 0))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        with stage("data.resample"):
+            columns = bar_store.load(symbol, base)
+            if columns is None:
+                return BarSeries.empty(symbol, interval)
+            series = resample(BarSeries.from_columns(columns, symbol=symbol, interval=base), interval)
+        with self._lock:
+            self._entries[key] = (generation, series)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return series
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+resample_cache = ResampleCache()
@@ -0,0 +1,400 @@
+import os
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from sqlalchemy.orm import Session
+from ..models.bar_series import BarSeries
+from .backtest_engine import Market
+from .data_service import DataService
+from .metrics import timed
+from .valuation_service import ValuationService
+
+TRADING_DAYS = 252
+
+# Index betas are measured against (Yahoo symbol).
+RISK_BENCHMARK = os.getenv("RISK_BENCHMARK", "^NSEI")
+MC_SIMULATIONS = int(os.getenv("MC_SIMULATIONS", 20000))
+# Random draws held in memory at once by the Monte Carlo loop (paths per chunk x assets).
+MC_CHUNK_ELEMENTS = int(os.getenv("MC_CHUNK_ELEMENTS", 2_000_000))
+# Windows evaluated per batch by rolling_risk (windows x assets x bars).
+ROLLING_CHUNK_ELEMENTS = 4_000_000
+
+OPTIMIZERS = ("mean_variance", "min_variance", "risk_parity")
+
+
+def aligned_returns(series: Dict[str, BarSeries], window: int) -> Tuple[np.ndarray, List[str], np.ndarray, List[str]]:
+    """
+    Daily simple returns of every symbol with a full `window` of them, aligned on
+    the union of dates (prices forward-filled over days a symbol did not trade).
+    Returns (dates, symbols, returns[bars, symbols], excluded symbols). Bars run
+    back to the first date all kept symbols have, so rolling measures see more
+    than the estimation window.
+    """
+    market = Market(series)
+    close = market.close
+    if len(close) < window + 1:
+        raise ValueError(f"Need {window + 1} bars of history, have {len(close)}")
+    keep = ~np.isnan(close[-(window + 1):]).any(axis=0)
+    if not keep.any():
+        raise ValueError(f"No symbol has {window + 1} bars of history")
+    close = close[:, keep]
+    first = int(np.isnan(close).any(axis=1).nonzero()[0].max() + 1) if np.isnan(close).any() else 0
+    close = close[first:]
+    symbols = [s for s, k in zip(market.symbols, keep) if k]
+    excluded = [s for s in series if s not in symbols]
+    return market.dates[first + 1:], symbols, close[1:] / close[:-1] - 1.0, excluded
+
+
+def covariance(returns: np.ndarray, shrinkage: Union[str, float, None] = None) -> Tuple[np.ndarray, float]:
+    """
+    Covariance of the columns of `returns`, optionally shrunk toward
+    mean-variance x identity: "ledoit_wolf" picks the intensity that minimizes
+    expected error (Ledoit & Wolf, 2004), a number in [0, 1] fixes it. Shrinking
+    keeps the matrix well conditioned when there are many assets for few bars.
+    Returns (covariance, intensity).
+    """
+    t, n = returns.shape
+    if t < 2:
+        raise ValueError("Need at least two bars of returns")
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / t
+    target = np.trace(sample) / n
+    if shrinkage is None or shrinkage == "none":
+        intensity = 0.0
+    elif shrinkage == "ledoit_wolf":
+        # ||S - target I||^2, and the variance of S's entries estimated from the bars.
+        distance = np.sum(sample ** 2) - n * target ** 2
+        spread = (np.sum(np.einsum("ij,ij->i", x, x) ** 2) - t * np.sum(sample ** 2)) / t ** 2
+        intensity = float(min(spread, distance) / distance) if distance > 0 else 1.0
+    else:
+        intensity = float(shrinkage)
+        if not 0.0 <= intensity <= 1.0:
+            raise ValueError("shrinkage must be 'ledoit_wolf', 'none' or a number in [0, 1]")
+    cov = (1.0 - intensity) * sample
+    cov[np.diag_indices(n)] += intensity * target
+    return cov * t / (t - 1), intensity
+
+
+def correlation(cov: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nan_to_num(cov / np.outer(std, std))
+
+
+def _matrix_root(cov: np.ndarray) -> np.ndarray:
+    """L with L @ L.T == cov: Cholesky, or an eigendecomposition if cov is only semi-definite."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0.0, None))
+
+
+def _tail_loss(pnl: np.ndarray, confidence: float) -> Dict[str, float]:
+    """VaR and CVaR (expected shortfall) of a P&L sample, as positive losses."""
+    var = -float(np.quantile(pnl, 1.0 - confidence))
+    tail = pnl[pnl <= -var]
+    return {"var": var, "cvar": -float(tail.mean()) if tail.size else var}
+
+
+def historical_var(returns: np.ndarray, exposure: np.ndarray, confidence: float = 0.95, horizon: int = 1) -> Dict[str, float]:
+    """VaR/CVaR of the positions' P&L over every (overlapping) `horizon`-bar stretch of history."""
+    if horizon > 1:
+        growth = np.vstack([np.zeros((1, returns.shape[1])), np.cumsum(np.log1p(returns), axis=0)])
+        returns = np.expm1(growth[horizon:] - growth[:-horizon])
+    if len(returns) == 0:
+        raise ValueError("horizon is longer than the history")
+    return _tail_loss(returns @ exposure, confidence)
+
+
+def monte_carlo_var(returns: np.ndarray, exposure: np.ndarray, confidence: float = 0.95, horizon: int = 1,
+                    simulations: int = MC_SIMULATIONS, shrinkage: Union[str, float, None] = None,
+                    seed: Optional[int] = None) -> Dict[str, float]:
+    """
+    VaR/CVaR from `simulations` draws of `horizon`-bar log returns, multivariate
+    normal with the history's mean and (optionally shrunk) covariance. Paths are
+    drawn MC_CHUNK_ELEMENTS at a time, so memory stays bounded for any count.
+    """
+    log_returns = np.log1p(returns)
+    mean = log_returns.mean(axis=0) * horizon
+    cov, _ = covariance(log_returns, shrinkage)
+    root = _matrix_root(cov * horizon).T
+    rng = np.random.default_rng(seed)
+    pnl = np.empty(simulations)
+    chunk = max(1, MC_CHUNK_ELEMENTS // len(exposure))
+    for start in range(0, simulations, chunk):
+        draws = rng.standard_normal((min(chunk, simulations - start), len(exposure))) @ root
+        pnl[start:start + len(draws)] = np.expm1(draws + mean) @ exposure
+    return _tail_loss(pnl, confidence)
+
+
+def beta(returns: np.ndarray, benchmark: np.ndarray) -> np.ndarray:
+    """Beta of each column of `returns` against one benchmark return series."""
+    market = benchmark - benchmark.mean()
+    variance = market @ market
+    if variance == 0:
+        return np.full(returns.shape[1], np.nan)
+    return (returns - returns.mean(axis=0)).T @ market / variance
+
+
+def rolling_risk(returns: np.ndarray, weights: np.ndarray, window: int, step: int = 1) -> Dict[str, np.ndarray]:
+    """
+    Annualized portfolio volatility and average pairwise correlation over trailing
+    `window`-bar windows ending every `step` bars. Windows are strided views
+    evaluated in batches, and the average correlation comes from the standardized
+    returns' row sums (sum of all correlations = ||Z 1||^2 / (window - 1)), so no
+    per-window correlation matrix is formed.
+    """
+    t, n = returns.shape
+    if t < window or window < 2:
+        return {"end": np.empty(0, dtype=np.int64), "volatility": np.empty(0), "average_correlation": np.empty(0)}
+    ends = np.arange(window - 1, t, step)
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window, axis=0)  # (bars, n, window), a view
+    volatility = np.empty(len(ends))
+    average = np.empty(len(ends))
+    chunk = max(1, ROLLING_CHUNK_ELEMENTS // (n * window))
+    for start in range(0, len(ends), chunk):
+        block = windows[ends[start:start + chunk] - window + 1]
+        portfolio = np.einsum("i,kit->kt", weights, block)
+        volatility[start:start + len(block)] = portfolio.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+        centered = block - block.mean(axis=2, keepdims=True)
+        std = centered.std(axis=2, ddof=1, keepdims=True)
+        live = (std > 0)[:, :, 0]
+        z = np.where(std > 0, centered / np.where(std > 0, std, 1.0), 0.0)
+        total = (z.sum(axis=1) ** 2).sum(axis=1) / (window - 1)
+        count = live.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            average[start:start + len(block)] = np.where(count > 1, (total - count) / (count * (count - 1)), np.nan)
+    return {"end": ends, "volatility": volatility, "average_correlation": average}
+
+
+def risk_contributions(weights: np.ndarray, cov: np.ndarray) -> np.ndarray:
+    """Each asset's share of portfolio variance (sums to 1)."""
+    marginal = cov @ weights
+    variance = weights @ marginal
+    return weights * marginal / variance if variance > 0 else np.full(len(weights), np.nan)
+
+
+def _project_simplex(v: np.ndarray) -> np.ndarray:
+    """Euclidean projection of each column onto {w >= 0, sum(w) = 1} (sort-based)."""
+    n = v.shape[0]
+    u = -np.sort(-v, axis=0)
+    excess = np.cumsum(u, axis=0) - 1.0
+    positive = u - excess / np.arange(1, n + 1)[:, None] > 0
+    rho = n - 1 - np.argmax(positive[::-1], axis=0)
+    theta = excess[rho, np.arange(v.shape[1])] / (rho + 1)
+    return np.maximum(v - theta, 0.0)
+
+
+def efficient_frontier(mean: np.ndarray, cov: np.ndarray, points: int = 20,
+                       iterations: int = 500, tol: float = 1e-7) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Long-only, fully invested mean-variance portfolios: maximize
+    mean.w - aversion/2 w'cov w for a log-spaced range of risk aversions, plus the
+    minimum-variance portfolio, solved together as the columns of one matrix with
+    accelerated projected gradient steps. Returns (weights[assets, points + 1],
+    aversions), minimum variance first.
+    """
+    n = len(mean)
+    lipschitz = float(np.linalg.eigvalsh(cov)[-1])
+    scale = max(float(np.ptp(mean)), 1e-12) / max(float(np.mean(np.diag(cov))), 1e-12)
+    aversion = np.concatenate([[np.inf], scale * np.logspace(2, -2, points)])
+    # Minimum variance: drop the return term (a unit aversion on variance alone).
+    gain = np.where(np.isinf(aversion), 0.0, 1.0)
+    curvature = np.where(np.isinf(aversion), 1.0, aversion)
+    step = 1.0 / (curvature * lipschitz)
+    weights = np.full((n, len(aversion)), 1.0 / n)
+    momentum, t = weights, 1.0
+    for _ in range(iterations):
+        gradient = (cov @ momentum) * curvature - mean[:, None] * gain
+        updated = _project_simplex(momentum - gradient * step)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = updated + (t - 1) / t_next * (updated - weights)
+        change = np.abs(updated - weights).max()
+        weights, t = updated, t_next
+        if change < tol:
+            break
+    return weights, aversion
+
+
+def risk_parity(cov: np.ndarray, budget: Optional[np.ndarray] = None, iterations: int = 100, tol: float = 1e-10) -> np.ndarray:
+    """
+    Long-only weights whose risk contributions match `budget` (equal by default):
+    Newton's method on the convex problem min 1/2 y'cov y - budget.log(y), then
+    w = y / sum(y) (Spinu, 2013). Every asset needs positive variance: one that
+    never moves can take no share of the risk, so no weighting exists.
+    """
+    n = len(cov)
+    variance = np.diag(cov)
+    if (variance <= 0).any():
+        raise ValueError(f"Risk parity needs every asset to have positive variance (assets {np.flatnonzero(variance <= 0).tolist()} have none)")
+    budget = np.full(n, 1.0 / n) if budget is None else budget / budget.sum()
+    y = 1.0 / np.sqrt(variance)
+    y *= np.sqrt(budget.sum() / (y @ cov @ y))
+
+    def objective(v):
+        return 0.5 * v @ cov @ v - budget @ np.log(v)
+
+    for _ in range(iterations):
+        gradient = cov @ y - budget / y
+        if np.abs(gradient).max() < tol:
+            break
+        direction = np.linalg.solve(cov + np.diag(budget / (y * y)), gradient)
+        size, current = 1.0, objective(y)
+        # Backtrack to stay positive and decrease the objective.
+        while size > 1e-10:
+            candidate = y - size * direction
+            if (candidate > 0).all() and objective(candidate) <= current:
+                y = candidate
+                break
+            size /= 2
+        else:
+            break
+    return y / y.sum()
+
+
+def _by_symbol(symbols: List[str], values: np.ndarray) -> Dict[str, Optional[float]]:
+    return {s: None if np.isnan(v) else float(v) for s, v in zip(symbols, values)}
+
+
+def _iso(dates: np.ndarray) -> List[str]:
+    return np.datetime_as_string(dates.view("datetime64[ns]"), unit="D").tolist()
+
+
+class RiskService:
+    """Risk measures and optimized weights for the portfolio's holdings (or any set of symbols)."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def exposures(self) -> Tuple[Dict[str, float], float]:
+        """Market value per priced holding, and the portfolio's total value."""
+        portfolio = ValuationService(self.db).value()
+        exposure = {p.symbol: p.market_value for p in portfolio.positions if p.market_value}
+        return exposure, portfolio.total_value
+
+    def portfolio_risk(self, period: str = "2y", **options) -> Dict:
+        exposure, total_value = self.exposures()
+        if not exposure:
+            raise ValueError("The portfolio has no priced holdings")
+        benchmark = options.pop("benchmark", RISK_BENCHMARK)
+        symbols = list(exposure) + ([benchmark] if benchmark and benchmark not in exposure else [])
+        series = DataService.fetch_many(symbols, period=period)
+        result = RiskService.measure(exposure, {s: series[s] for s in exposure},
+                                     series.get(benchmark) if benchmark else None, **options)
+        result["total_value"] = total_value
+        result["benchmark"] = benchmark or None
+        return result
+
+    def optimize(self, symbols: Optional[List[str]] = None, period: str = "2y", **options) -> Dict:
+        if not symbols:
+            symbols = list(self.exposures()[0])
+        if not symbols:
+            raise ValueError("No symbols given and the portfolio has no priced holdings")
+        return RiskService.optimal_weights(DataService.fetch_many(symbols, period=period), **options)
+
+    @staticmethod
+    @timed("risk.measure")
+    def measure(exposure: Dict[str, float], series: Dict[str, BarSeries], benchmark: Optional[BarSeries] = None,
+                window: int = TRADING_DAYS, confidence: float = 0.95, horizon: int = 1,
+                shrinkage: Union[str, float, None] = "ledoit_wolf", simulations: int = MC_SIMULATIONS,
+                rolling_window: int = 63, rolling_step: int = 5, include_matrix: bool = False,
+                seed: Optional[int] = None) -> Dict:
+        """
+        Risk of positions held at `exposure` (currency per symbol) over the last
+        `window` bars: volatility, historical and Monte Carlo VaR/CVaR at
+        `confidence` over `horizon` bars (as currency losses), per-asset beta and
+        risk contributions, and rolling volatility/correlation.
+        """
+        if not 0.5 <= confidence < 1.0:
+            raise ValueError("confidence must be in [0.5, 1)")
+        if horizon < 1 or simulations < 1:
+            raise ValueError("horizon and simulations must be positive")
+        if benchmark is not None and len(benchmark):
+            series = {**series, "__benchmark__": benchmark}
+        dates, symbols, returns, excluded = aligned_returns(series, window)
+        bench = None
+        if "__benchmark__" in symbols:
+            bench = returns[:, symbols.index("__benchmark__")]
+            returns = np.delete(returns, symbols.index("__benchmark__"), axis=1)
+            symbols.remove("__benchmark__")
+        excluded = [s for s in excluded if s != "__benchmark__"]
+        if not symbols:
+            raise ValueError("No holding has enough history")
+
+        position = np.array([exposure[s] for s in symbols], dtype=np.float64)
+        invested = float(np.abs(position).sum())
+        weights = position / invested
+        recent = returns[-window:]
+        cov, intensity = covariance(recent, shrinkage)
+        volatility = float(np.sqrt(max(weights @ cov @ weights, 0.0) * TRADING_DAYS))
+        rolling = rolling_risk(returns, weights, rolling_window, rolling_step)
+
+        result = {
+            "as_of": _iso(dates[-1:])[0],
+            "symbols": symbols,
+            "excluded": excluded,
+            "observations": len(recent),
+            "invested": invested,
+            "weights": _by_symbol(symbols, weights),
+            "volatility": volatility,
+            "shrinkage": intensity,
+            "confidence": confidence,
+            "horizon": horizon,
+            "historical": historical_var(recent, position, confidence, horizon),
+            "monte_carlo": monte_carlo_var(recent, position, confidence, horizon, simulations, shrinkage, seed),
+            "risk_contribution": _by_symbol(symbols, risk_contributions(weights, cov)),
+            "rolling": {
+                "date": _iso(dates[rolling["end"]]),
+                "volatility": rolling["volatility"].tolist(),
+                "average_correlation": [None if np.isnan(v) else float(v) for v in rolling["average_correlation"]],
+            },
+        }
+        if bench is not None:
+            betas = beta(recent, bench[-window:])
+            result["beta"] = {"portfolio": float(weights @ betas), "assets": _by_symbol(symbols, betas)}
+        if include_matrix:
+            result["correlation"] = correlation(cov).tolist()
+        return result
+
+    @staticmethod
+    @timed("risk.optimize")
+    def optimal_weights(series: Dict[str, BarSeries], method: str = "mean_variance", window: int = TRADING_DAYS,
+                        shrinkage: Union[str, float, None] = "ledoit_wolf", risk_free_rate: float = 0.0,
+                        frontier_points: int = 20) -> Dict:
+        """
+        Long-only weights over the symbols' last `window` bars: the maximum-Sharpe
+        point of the efficient frontier ("mean_variance"), the minimum-variance
+        portfolio, or equal risk contributions ("risk_parity"). Expected returns are
+        historical means; annualized figures use TRADING_DAYS.
+        """
+        if method not in OPTIMIZERS:
+            raise ValueError(f"Unknown method: {method} (expected one of {', '.join(OPTIMIZERS)})")
+        dates, symbols, returns, excluded = aligned_returns(series, window)
+        recent = returns[-window:]
+        cov, intensity = covariance(recent, shrinkage)
+        mean = recent.mean(axis=0)
+
+        def summary(w: np.ndarray) -> Dict[str, float]:
+            annual_return = float(mean @ w * TRADING_DAYS)
+            annual_vol = float(np.sqrt(max(w @ cov @ w, 0.0) * TRADING_DAYS))
+            sharpe = (annual_return - risk_free_rate) / annual_vol if annual_vol > 0 else None
+            return {"expected_return": annual_return, "volatility": annual_vol, "sharpe_ratio": sharpe}
+
+        result = {"as_of": _iso(dates[-1:])[0], "method": method, "symbols": symbols, "excluded": excluded,
+                  "observations": len(recent), "shrinkage": intensity}
+        if method == "risk_parity":
+            flat = [s for s, v in zip(symbols, np.diag(cov)) if v <= 0]
+            if flat:
+                raise ValueError(f"Risk parity needs price movement in every symbol; flat over the window: {', '.join(flat)}")
+            weights = risk_parity(cov)
+        else:
+            frontier, _ = efficient_frontier(mean, cov, frontier_points)
+            points = [summary(frontier[:, k]) for k in range(frontier.shape[1])]
+            best = 0 if method == "min_variance" else int(np.argmax(
+                [p["sharpe_ratio"] if p["sharpe_ratio"] is not None else -np.inf for p in points]))
+            weights = frontier[:, best]
+            result["frontier"] = sorted(points, key=lambda p: p["volatility"])
+        result["weights"] = _by_symbol(symbols, weights)
+        result["risk_contribution"] = _by_symbol(symbols, risk_contributions(weights, cov))
+        result.update(summary(weights))
+        return result
@@ -1,35 +1,113 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
 import logging
+import os
+from functools import wraps
+from typing import IO, Optional
+from ..models.db import SessionLocal
+from .alert_service import alert_engine
+from .metrics import SCHEDULER_JOB_DURATION, SCHEDULER_JOB_FAILURES
+from .valuation_service import ValuationService
+from .screener_service import SCREENER_REFRESH, screener
+from .host_lock import try_lock
 
 logger = logging.getLogger(__name__)
 
+# Which app processes run the jobs: "auto" (the first process on the host to take
+# the scheduler lock, so uvicorn workers don't each run them), "on" or "off".
+# The other workers still see the results: streaming clients get alerts from the
+# alerts table and screens load the snapshot the screener refresh saves.
+# With several hosts sharing a database, set "off" on all but one.
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "auto")
+
+def _instrumented(func):
+    """Time each run of a job into scheduler_job_duration_seconds and count escaping errors."""
+    @wraps(func)
+    def run():
+        with SCHEDULER_JOB_DURATION.time(job=func.__name__):
+            try:
+                func()
+            except Exception:
+                SCHEDULER_JOB_FAILURES.inc(job=func.__name__)
+                raise
+    return run
+
 class SchedulerService:
     def __init__(self):
+        from apscheduler.schedulers.background import BackgroundScheduler
         self.scheduler = BackgroundScheduler()
         self.scheduler.start()
 
     def add_job(self, func, seconds=60):
+        from apscheduler.triggers.interval import IntervalTrigger
         self.scheduler.add_job(
-            func,
+            _instrumented(func),
             trigger=IntervalTrigger(seconds=seconds),
             id=func.__name__,
-            replace_existing=True
+            replace_existing=True,
+            max_instances=1,  # A slow run delays the next one instead of overlapping it
+            coalesce=True
         )
         logger.info(f"Added job {func.__name__} every {seconds} seconds")
 
     def shutdown(self):
         self.scheduler.shutdown()
 
-scheduler_service = SchedulerService()
+# Created by start_scheduler() in the designated process only.
+scheduler_service: Optional[SchedulerService] = None
+_scheduler_lock: Optional[IO] = None
 
 def check_alerts():
-    # Placeholder logic
     logger.info("Checking alerts...")
-    # 1. Fetch latest data for watchlist
-    # 2. Check signals
-    # 3. Log or send alert if signal found
-    pass
+    db = SessionLocal()
+    try:
+        alert_engine.tick(db)
+    except Exception:
+        logger.exception("Alert check failed")
+        SCHEDULER_JOB_FAILURES.inc(job="check_alerts")
+    finally:
+        db.close()
+
+def snapshot_portfolio():
+    db = SessionLocal()
+    try:
+        portfolio = ValuationService(db).snapshot()
+        logger.info(f"Portfolio snapshot: total_value={portfolio.total_value:.2f}, {len(portfolio.positions)} positions")
+    except Exception:
+        logger.exception("Portfolio snapshot failed")
+        SCHEDULER_JOB_FAILURES.inc(job="snapshot_portfolio")
+    finally:
+        db.close()
 
-def start_scheduler():
+def refresh_screener():
+    try:
+        screener.refresh(screener.current())
+    except Exception:
+        logger.exception("Screener refresh failed")
+        SCHEDULER_JOB_FAILURES.inc(job="refresh_screener")
+
+def start_scheduler() -> bool:
+    """Start the scheduler and its jobs if this is the designated process (see SCHEDULER_MODE)."""
+    global scheduler_service, _scheduler_lock
+    if scheduler_service is not None:
+        return True
+    if SCHEDULER_MODE == "off":
+        return False
+    if SCHEDULER_MODE != "on":
+        _scheduler_lock = try_lock("scheduler")
+        if _scheduler_lock is None:
+            logger.info("Scheduler is running in another process; not starting it here")
+            return False
+    scheduler_service = SchedulerService()
     scheduler_service.add_job(check_alerts, seconds=300) # Every 5 mins
+    scheduler_service.add_job(snapshot_portfolio, seconds=int(os.getenv("PORTFOLIO_SNAPSHOT_INTERVAL", 900)))
+    scheduler_service.add_job(refresh_screener, seconds=SCREENER_REFRESH)
+    return True
+
+def stop_scheduler():
+    """Stop the scheduler (waiting for running jobs) and release the scheduler lock."""
+    global scheduler_service, _scheduler_lock
+    if scheduler_service is not None:
+        scheduler_service.shutdown()
+        scheduler_service = None
+    if _scheduler_lock is not None:
+        _scheduler_lock.close()
+        _scheduler_lock = None
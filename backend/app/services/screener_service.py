@@ -0,0 +1,388 @@
+import ast
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import numpy as np
+from ..models.bar_series import BarSeries
+from .bar_store import BAR_STORE_DIR
+from .data_service import DataService, REFRESH_AFTER
+from .host_lock import hold_lock
+from .indicator_service import INDICATORS, IndicatorContext, ewm, parse_spec
+from .metrics import stage
+
+# Bars per symbol kept in the matrix: enough for SMA_200 and for Wilder/EMA
+# smoothing to forget its seed.
+SCREENER_LOOKBACK = int(os.getenv("SCREENER_LOOKBACK", 300))
+# Seconds before the matrix is rebuilt from the bar store (topping it up from the provider).
+SCREENER_REFRESH = int(os.getenv("SCREENER_REFRESH", REFRESH_AFTER["1d"]))
+# Fields computed as part of each rebuild, so the first screens using them are fast too.
+SCREENER_WARM_FIELDS = [f for f in os.getenv("SCREENER_WARM_FIELDS", "RSI_14,SMA_50,SMA_200,ROC_20").split(",") if f]
+# Where a rebuilt snapshot is saved for the other app processes on the host to load.
+SCREENER_SNAPSHOT_PATH = os.getenv("SCREENER_SNAPSHOT_PATH", os.path.join(BAR_STORE_DIR, "screener.npz"))
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+_COMPARE = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+            ast.Eq: np.equal, ast.NotEq: np.not_equal}
+_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide,
+               ast.Pow: np.power}
+
+
+class CrossSectionContext(IndicatorContext):
+    """
+    IndicatorContext over a (bars, symbols) matrix instead of one series, so every
+    registered indicator runs once for the whole cross-section. Prices are NaN
+    until a symbol's first bar; rolling windows are NaN until they hold `window` of
+    its bars and Wilder smoothing is seeded per symbol, matching what
+    IndicatorService computes on each series alone.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.data = SimpleNamespace(**columns)
+        self.n = len(columns["close"])
+        self._cache: Dict[tuple, np.ndarray] = {}
+        valid = ~np.isnan(columns["close"])
+        self.first = np.where(valid.any(axis=0), valid.argmax(axis=0), self.n)
+
+    def diff(self) -> np.ndarray:
+        def compute():
+            out = np.full(self.data.close.shape, np.nan)
+            out[1:] = np.diff(self.data.close, axis=0)
+            return out
+        return self._memo(("diff",), compute)
+
+    def cumsum(self, name: str) -> np.ndarray:
+        def compute():
+            values = self.column(name)
+            out = np.zeros((self.n + 1, values.shape[1]))
+            np.cumsum(np.nan_to_num(values), axis=0, out=out[1:])
+            return out
+        return self._memo(("cumsum", name), compute)
+
+    def rolling_sum(self, name: str, window: int) -> np.ndarray:
+        def compute():
+            out = np.full(self.data.close.shape, np.nan)
+            if 0 < window <= self.n:
+                c = self.cumsum(name)
+                # Full once the window starts at or after the symbol's first bar.
+                full = np.arange(self.n - window + 1)[:, None] >= self.first
+                out[window - 1:] = np.where(full, c[window:] - c[:-window], np.nan)
+            return out
+        return self._memo(("rolling_sum", name, window), compute)
+
+    def wilder(self, key: str, window: int) -> np.ndarray:
+        def compute():
+            values = {"gains": self.gains, "losses": self.losses, "true_range": self.true_range}[key]()
+            start = self.first + (1 if key != "true_range" else 0)
+            seed_at = start + window - 1
+            cols = np.flatnonzero(seed_at < self.n)
+            sums = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(np.nan_to_num(values), axis=0)])
+            seeded = np.where(np.arange(self.n)[:, None] > seed_at, values, np.nan)
+            seeded[seed_at[cols], cols] = (sums[seed_at[cols] + 1, cols] - sums[start[cols], cols]) / window
+            return ewm(seeded, 1.0 / window)
+        return self._memo(("wilder", key, window), compute)
+
+    def true_range(self) -> np.ndarray:
+        def compute():
+            high, low, close = self.data.high, self.data.low, self.data.close
+            prev_close = np.vstack([close[:1], close[:-1]])
+            prev_close = np.where(np.isnan(prev_close), close, prev_close)
+            return np.maximum(high, prev_close) - np.minimum(low, prev_close)
+        return self._memo(("true_range",), compute)
+
+
+class Universe:
+    """
+    The last SCREENER_LOOKBACK daily bars of every symbol as (bars, symbols)
+    matrices, each symbol right-aligned on its own bars: the last row holds every
+    symbol's latest bar, the one above its previous bar, and so on. Symbols are not
+    aligned on dates, so an exchange holiday or a halt never inserts a filler bar
+    into another symbol's windows; symbols with fewer bars are NaN at the top.
+    Field values at each symbol's latest bar are computed on first use and kept
+    for the life of the snapshot.
+    """
+
+    def __init__(self, series: Dict[str, BarSeries], lookback: int = SCREENER_LOOKBACK):
+        tails = {s: data[-lookback:] for s, data in series.items() if len(data)}
+        if not tails:
+            raise ValueError("No data for any symbol")
+        # Symbols with no bar among the last `lookback` dates any symbol traded
+        # (e.g. delisted) are left out.
+        cutoff = np.unique(np.concatenate([t.date for t in tails.values()]))[-lookback:][0]
+        self.symbols = [s for s, t in tails.items() if t.date[-1] >= cutoff]
+        shape = (lookback, len(self.symbols))
+        self.columns = {field: np.full(shape, np.nan) for field in PRICE_FIELDS}
+        self.columns["volume"][:] = 0.0
+        self.last_date = np.empty(len(self.symbols), dtype=np.int64)
+        for j, symbol in enumerate(self.symbols):
+            tail = tails[symbol]
+            for field in PRICE_FIELDS:
+                self.columns[field][lookback - len(tail):, j] = getattr(tail, field)
+            self.last_date[j] = tail.date[-1]
+        self.as_of = int(self.last_date.max())
+        self.built_at = time.time()
+        self._latest: Dict[str, np.ndarray] = {}
+        self._init_index()
+
+    def _init_index(self) -> None:
+        self.index = {s: j for j, s in enumerate(self.symbols)}
+        self._lock = threading.Lock()
+
+    def save(self, path: str) -> None:
+        """Write the snapshot, with the field values computed so far, to an .npz file (atomically replaced)."""
+        with self._lock:
+            latest = dict(self._latest)
+        arrays = {"symbols": np.array(self.symbols), "as_of": np.int64(self.as_of), "last_date": self.last_date,
+                  "built_at": np.float64(self.built_at)}
+        arrays.update({f"column:{name}": values for name, values in self.columns.items()})
+        arrays.update({f"latest:{name}": values for name, values in latest.items()})
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Universe":
+        universe = cls.__new__(cls)
+        with np.load(path) as arrays:
+            universe.symbols = arrays["symbols"].tolist()
+            universe.as_of, universe.last_date = int(arrays["as_of"]), arrays["last_date"]
+            universe.built_at = float(arrays["built_at"])
+            universe.columns = {k.split(":", 1)[1]: arrays[k] for k in arrays.files if k.startswith("column:")}
+            universe._latest = {k.split(":", 1)[1]: arrays[k] for k in arrays.files if k.startswith("latest:")}
+        universe._init_index()
+        return universe
+
+    def field(self, name: str) -> np.ndarray:
+        """Latest value of a price field or indicator output (e.g. "close", "RSI_14", "BB_20_2_upper") per symbol."""
+        key = _field_key(name)
+        with self._lock:
+            if key not in self._latest:
+                self._latest[key] = self._compute(key)
+            return self._latest[key]
+
+    def _compute(self, key: str) -> np.ndarray:
+        if key in PRICE_FIELDS:
+            return self.columns[key][-1]
+        spec, output = _resolve(key)
+        name, params = parse_spec(spec)
+        outputs = INDICATORS[name](CrossSectionContext(self.columns), *params)
+        for suffix, values in outputs.items():
+            self._latest[spec + suffix] = values[-1]
+        if output not in self._latest:
+            raise ValueError(f"Unknown field: {key} (outputs: {', '.join(spec + s for s in outputs)})")
+        return self._latest[output]
+
+
+def _field_key(name: str) -> str:
+    if name.lower() in PRICE_FIELDS:
+        return name.lower()
+    spec, _, suffix = name.rpartition("_")
+    if spec and suffix.isalpha() and suffix.upper() not in INDICATORS:
+        return f"{spec.upper()}_{suffix.lower()}"
+    return name.upper()
+
+
+def _resolve(key: str):
+    """(indicator spec, output key) for a field key, e.g. BB_20_2_upper -> (BB_20_2, BB_20_2_upper)."""
+    spec, _, suffix = key.rpartition("_")
+    if spec and suffix.islower():
+        parse_spec(spec)
+        return spec, key
+    parse_spec(key)
+    return key, key
+
+
+def _supported(node: ast.AST) -> bool:
+    if isinstance(node, ast.Compare):
+        return all(type(op) in _COMPARE for op in node.ops)
+    if isinstance(node, ast.BinOp):
+        return type(node.op) in _ARITHMETIC
+    if isinstance(node, ast.UnaryOp):
+        return isinstance(node.op, (ast.Not, ast.USub, ast.UAdd))
+    return isinstance(node, ast.BoolOp)
+
+
+class Expression:
+    """
+    A filter or ranking expression over field names, e.g.
+    "RSI_14 < 30 and close > SMA_200" or "close / SMA_50 - 1". Supports and/or/not,
+    (chained) comparisons, + - * / ** and numbers, evaluated as whole arrays
+    over the cross-section. Anything else (calls, attributes, ...) is rejected.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        try:
+            self.tree = ast.parse(source, mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression {source!r}: {e.msg}")
+        self.fields: List[str] = []
+        self._check(self.tree)
+
+    def _check(self, node: ast.AST) -> None:
+        if isinstance(node, ast.Name):
+            if node.id not in self.fields:
+                self.fields.append(node.id)
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)) or isinstance(node.value, bool):
+                raise ValueError(f"Invalid expression {self.source!r}: only numbers are allowed as constants")
+        elif _supported(node):
+            for child in ast.iter_child_nodes(node):
+                if not isinstance(child, (ast.operator, ast.unaryop, ast.boolop, ast.cmpop)):
+                    self._check(child)
+        else:
+            raise ValueError(f"Invalid expression {self.source!r}: {type(node).__name__} is not supported")
+
+    def evaluate(self, universe: Universe) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return np.asarray(self._eval(self.tree, universe))
+
+    def _eval(self, node: ast.AST, universe: Universe):
+        if isinstance(node, ast.Name):
+            return universe.field(node.id)
+        if isinstance(node, ast.Constant):
+            return float(node.value)
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            result = self._truth(self._eval(node.values[0], universe))
+            for value in node.values[1:]:
+                result = combine(result, self._truth(self._eval(value, universe)))
+            return result
+        if isinstance(node, ast.Compare):
+            left = self._eval(node.left, universe)
+            result = True
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self._eval(comparator, universe)
+                result = np.logical_and(result, _COMPARE[type(op)](left, right))
+                left = right
+            return result
+        if isinstance(node, ast.BinOp):
+            return _ARITHMETIC[type(node.op)](self._eval(node.left, universe), self._eval(node.right, universe))
+        operand = self._eval(node.operand, universe)
+        if isinstance(node.op, ast.Not):
+            return ~self._truth(operand)
+        return -operand if isinstance(node.op, ast.USub) else operand
+
+    @staticmethod
+    def _truth(value) -> np.ndarray:
+        # A bare number is true when nonzero; NaN (no value yet) is false.
+        value = np.asarray(value)
+        return value if value.dtype == bool else np.nan_to_num(value) != 0
+
+
+class Screener:
+    """
+    Holds the current Universe snapshot for the symbol catalog. Rebuilds swap in a
+    new snapshot, so screens in flight keep reading a consistent one.
+
+    Each rebuild is saved to `snapshot_path` and the other app processes load it
+    instead of building their own: normally only the scheduler's process builds
+    (see refresh_screener), and a build started elsewhere waits for one in progress.
+    """
+
+    def __init__(self, snapshot_path: str = SCREENER_SNAPSHOT_PATH):
+        self.snapshot_path = snapshot_path
+        self._universe: Optional[Universe] = None
+        self._snapshot_mtime: Optional[float] = None
+        self._build_lock = threading.Lock()
+
+    def current(self) -> Optional[Universe]:
+        return self._universe
+
+    def universe(self) -> Universe:
+        universe = self._load_snapshot() or self._universe
+        if universe is None or time.time() - universe.built_at > SCREENER_REFRESH:
+            universe = self.refresh(universe)
+        return universe
+
+    def _load_snapshot(self) -> Optional[Universe]:
+        """The saved snapshot, when it changed since this process last read or wrote it and is newer than ours."""
+        try:
+            mtime = os.stat(self.snapshot_path).st_mtime
+        except OSError:
+            return None
+        if mtime == self._snapshot_mtime:
+            return None
+        try:
+            universe = Universe.load(self.snapshot_path)
+        except Exception as e:
+            print(f"Error loading screener snapshot {self.snapshot_path}: {e}")
+            return None
+        self._snapshot_mtime = mtime
+        if self._universe is not None and universe.built_at <= self._universe.built_at:
+            return None
+        self._universe = universe
+        return universe
+
+    def refresh(self, seen: Optional[Universe] = None) -> Universe:
+        """
+        Rebuild the snapshot; concurrent callers, in this process or another, wait
+        for one build instead of starting their own.
+        """
+        with self._build_lock:
+            if self._universe is not seen and self._universe is not None:
+                return self._universe
+            with hold_lock("screener"):
+                shared = self._load_snapshot()
+                if shared is not None and time.time() - shared.built_at <= SCREENER_REFRESH:
+                    return shared
+                with stage("screener.build"):
+                    universe = Universe(DataService.fetch_many(DataService.list_symbols(), period="2y"))
+                    for name in SCREENER_WARM_FIELDS:
+                        universe.field(name)
+                self._universe = universe
+                try:
+                    universe.save(self.snapshot_path)
+                    self._snapshot_mtime = os.stat(self.snapshot_path).st_mtime
+                except OSError as e:
+                    print(f"Error saving screener snapshot {self.snapshot_path}: {e}")
+            return universe
+
+    def screen(self, filter: Optional[str] = None, sort: Optional[str] = None, descending: bool = True,
+               limit: int = 50, fields: Optional[List[str]] = None, symbols: Optional[List[str]] = None) -> Dict:
+        """
+        Symbols whose latest bars pass `filter`, ranked by `sort` (NaN last), with
+        close, the date of the latest bar and every field the expressions use.
+        """
+        where = Expression(filter) if filter else None
+        rank = Expression(sort) if sort else None
+        universe = self.universe()
+        with stage("screener.evaluate"):
+            mask = np.ones(len(universe.symbols), dtype=bool)
+            if symbols is not None:
+                mask[:] = False
+                mask[[universe.index[s] for s in symbols if s in universe.index]] = True
+            if where is not None:
+                # A bare field or arithmetic filter ("close", "rsi_14 - 50") keeps nonzero values.
+                mask &= np.broadcast_to(Expression._truth(where.evaluate(universe)), mask.shape)
+            matched = np.flatnonzero(mask)
+            if rank is not None:
+                key = np.broadcast_to(rank.evaluate(universe), mask.shape).astype(np.float64)[matched]
+                order = np.argsort(np.where(np.isnan(key), np.inf, -key if descending else key), kind="stable")
+                matched = matched[order]
+            rows = matched[:limit]
+
+            columns = ["close"]
+            for name in (where.fields if where else []) + (rank.fields if rank else []) + list(fields or []):
+                if name not in columns:
+                    columns.append(name)
+            table = {"symbol": [universe.symbols[j] for j in rows],
+                     "date": np.datetime_as_string(universe.last_date[rows].view("datetime64[ns]"), unit="D").tolist()}
+            for name in columns:
+                values = universe.field(name)[rows]
+                table[name] = [None if np.isnan(v) else float(v) for v in values]
+            if rank is not None:
+                table["score"] = [None if np.isnan(v) else float(v) for v in key[order][:limit]]
+        return {
+            "as_of": str(np.datetime_as_string(np.datetime64(universe.as_of, "ns"), unit="D")),
+            "universe": int(mask.size),
+            "matched": int(len(matched)),
+            **table,
+        }
+
+
+screener = Screener()
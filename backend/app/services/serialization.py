@@ -0,0 +1,108 @@
+import importlib.util
+import json
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .metrics import timed
+
+# Response formats by name, with the media type each is served as.
+FORMATS = {
+    "json": "application/json",
+    "columnar": "application/vnd.columnar+json",
+    "msgpack": "application/x-msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+_ALIASES = {"application/msgpack": "msgpack", "application/vnd.msgpack": "msgpack", "*/*": "json", "application/*": "json"}
+_MEDIA_TYPES = {**{media: name for name, media in FORMATS.items()}, **_ALIASES}
+# Binary formats need optional packages; they are imported on first use.
+_REQUIRES = {"msgpack": "msgpack", "arrow": "pyarrow"}
+
+
+def available(fmt: str) -> bool:
+    module = _REQUIRES.get(fmt)
+    return fmt in FORMATS and (module is None or importlib.util.find_spec(module) is not None)
+
+
+def negotiate(accept: Optional[str], fmt: Optional[str] = None) -> str:
+    """
+    Pick a format from an explicit `fmt` name or else the Accept header
+    (highest q first, ties in header order). Defaults to json; raises
+    ValueError when nothing requested can be produced.
+    """
+    if fmt:
+        if not available(fmt):
+            raise ValueError(f"Unsupported format: {fmt}")
+        return fmt
+    if not accept:
+        return "json"
+    offers = []
+    for position, part in enumerate(accept.split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        offers.append((-q, position, media.lower()))
+    for neg_q, _, media in sorted(offers):
+        name = _MEDIA_TYPES.get(media)
+        if neg_q < 0 and name is not None and available(name):
+            return name
+    raise ValueError(f"None of the accepted media types can be produced: {accept}")
+
+
+def _nullable(values: np.ndarray) -> List:
+    """Float column as a list with NaN -> None (JSON has no NaN)."""
+    if values.dtype.kind != "f":
+        return values.tolist()
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    out = values.astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+def _iso_dates(dates: np.ndarray) -> List[str]:
+    return np.datetime_as_string(dates.view("datetime64[ns]"), unit="s").tolist()
+
+
+def encode_rows(columns: Dict[str, np.ndarray]) -> bytes:
+    """One JSON object per row; the layout `List[OHLCV]` responses have always had."""
+    names = list(columns)
+    values = [_iso_dates(col) if name == "date" else _nullable(col) for name, col in columns.items()]
+    return json.dumps([dict(zip(names, row)) for row in zip(*values)]).encode()
+
+
+@timed("encode")
+def encode_table(columns: Dict[str, np.ndarray], fmt: str, meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Serialize parallel arrays (a "date" column of int64 ns plus numeric columns)
+    straight from NumPy, with optional scalar `meta` alongside:
+
+    - columnar: {**meta, "date": [iso, ...], "close": [...], ...}, NaN as null;
+    - msgpack: the same map, dates as epoch milliseconds and NaN kept;
+    - arrow: one IPC stream record batch (timestamp[ns] dates, NaN as null),
+      meta as JSON under the schema metadata key "meta".
+    """
+    meta = meta or {}
+    if fmt == "json":
+        return encode_rows(columns)
+    if fmt == "columnar":
+        body = {**meta, **{name: _iso_dates(col) if name == "date" else _nullable(col) for name, col in columns.items()}}
+        return json.dumps(body).encode()
+    if fmt == "msgpack":
+        import msgpack
+        body = {**meta, **{name: (col // 1_000_000).tolist() if name == "date" else col.tolist() for name, col in columns.items()}}
+        return msgpack.packb(body)
+    if fmt == "arrow":
+        import pyarrow as pa
+        arrays = {name: pa.array(col.view("datetime64[ns]")) if name == "date" else pa.array(col, from_pandas=True)
+                  for name, col in columns.items()}
+        batch = pa.record_batch(list(arrays.values()), names=list(arrays), metadata={"meta": json.dumps(meta)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f"Unsupported format: {fmt}")
@@ -1,52 +1,116 @@
-from typing import List
-import pandas as pd
-from ..models.schemas import OHLCV, Signal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from ..models.schemas import Signal
+from ..models.bar_series import BarSeries
 from .indicator_service import IndicatorService
+from .metrics import timed
+
+# Strategy registry: name -> (indicator specs needed for params, rule returning (buy_idx, sell_idx)).
+STRATEGIES: Dict[str, Tuple[Callable[..., List[str]], Callable[..., Tuple[np.ndarray, np.ndarray]]]] = {}
+
+EVENT_COLUMNS = ("date", "symbol", "signal_type", "price", "strategy")
+
+
+def strategy(name: str, requires: Callable[..., List[str]]):
+    def register(func):
+        STRATEGIES[name] = (requires, func)
+        return func
+    return register
+
+
+def _crossings(fast: np.ndarray, slow: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bar indices where `fast` crosses above / below `slow`. The state is +1/-1 for
+    above/below (0 while either side is NaN) and a cross is a direct -1 <-> +1 flip.
+    """
+    with np.errstate(invalid="ignore"):
+        state = np.nan_to_num(np.sign(fast - slow))
+    change = np.diff(state)
+    return np.flatnonzero(change == 2) + 1, np.flatnonzero(change == -2) + 1
+
+
+@strategy("SMA_CROSS", lambda short_window=50, long_window=200: [f"SMA_{short_window}", f"SMA_{long_window}"])
+def _sma_cross(ind: Dict[str, np.ndarray], short_window: int = 50, long_window: int = 200):
+    return _crossings(ind[f"SMA_{short_window}"], ind[f"SMA_{long_window}"])
+
+
+@strategy("RSI", lambda window=14, lower=30, upper=70: [f"RSI_{window}"])
+def _rsi_threshold(ind: Dict[str, np.ndarray], window: int = 14, lower: float = 30, upper: float = 70):
+    # BUY when RSI recovers up through `lower`, SELL when it falls back through `upper`.
+    rsi = ind[f"RSI_{window}"]
+    prev, cur = rsi[:-1], rsi[1:]
+    with np.errstate(invalid="ignore"):
+        buys = np.flatnonzero((prev < lower) & (cur >= lower)) + 1
+        sells = np.flatnonzero((prev > upper) & (cur <= upper)) + 1
+    return buys, sells
+
+
+@strategy("MACD", lambda fast=12, slow=26, signal=9: [f"MACD_{fast}_{slow}_{signal}"])
+def _macd_cross(ind: Dict[str, np.ndarray], fast: int = 12, slow: int = 26, signal: int = 9):
+    spec = f"MACD_{fast}_{slow}_{signal}"
+    return _crossings(ind[spec], ind[spec + "_signal"])
+
 
 class SignalService:
     @staticmethod
-    def generate_sma_cross_signals(data: List[OHLCV], short_window: int = 50, long_window: int = 200) -> List[Signal]:
-        if not data:
-            return []
-            
-        df = IndicatorService.to_dataframe(data)
-        if len(df) < long_window:
-            return []
+    @timed("signals")
+    def scan(series: Iterable[BarSeries], strategies: List[Dict], since: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Run several strategies over several symbols and return one columnar event
+        table (date as int64 ns, symbol, signal_type, price, strategy), sorted by date.
+        Each strategy is {"name": "SMA_CROSS", **params}. Indicators for all strategies
+        on a series are computed in one IndicatorService.compute pass, and only the
+        crossing bars are materialized.
+        """
+        resolved = []
+        for spec in strategies:
+            params = {k: v for k, v in spec.items() if k != "name"}
+            if spec["name"] not in STRATEGIES:
+                raise ValueError(f"Unknown strategy: {spec['name']}")
+            requires, rule = STRATEGIES[spec["name"]]
+            resolved.append((spec["name"], params, requires(**params), rule))
+        needed = list(dict.fromkeys(s for _, _, specs, _ in resolved for s in specs))
+
+        parts = {col: [] for col in EVENT_COLUMNS}
+        for data in series:
+            if len(data) < 2:
+                continue
+            indicators = IndicatorService.compute(data, needed)
+            for name, params, _, rule in resolved:
+                buys, sells = rule(indicators, **params)
+                idx = np.concatenate([buys, sells])
+                if since is not None:
+                    keep = data.date[idx] >= since
+                    idx, n_buys = idx[keep], int(keep[:len(buys)].sum())
+                else:
+                    n_buys = len(buys)
+                types = np.empty(len(idx), dtype=object)
+                types[:n_buys], types[n_buys:] = "BUY", "SELL"
+                parts["date"].append(data.date[idx])
+                parts["price"].append(data.close[idx])
+                parts["signal_type"].append(types)
+                parts["symbol"].append(np.full(len(idx), data.symbol or "UNKNOWN", dtype=object))
+                parts["strategy"].append(np.full(len(idx), name, dtype=object))
 
-        df['SMA_Short'] = df['close'].rolling(window=short_window).mean()
-        df['SMA_Long'] = df['close'].rolling(window=long_window).mean()
-        
-        signals = []
-        # Simple logic: Crossover
-        # We need to iterate to find crossovers. Vectorized approach is better for backtesting, 
-        # but for signal generation list, we can iterate or use shift.
-        
-        df['Signal'] = 0
-        df.loc[df['SMA_Short'] > df['SMA_Long'], 'Signal'] = 1 # Bullish
-        df.loc[df['SMA_Short'] < df['SMA_Long'], 'Signal'] = -1 # Bearish
-        
-        # Crossover happens when Signal changes
-        df['Position'] = df['Signal'].diff()
-        
-        # Position = 2 ( -1 to 1) -> Buy
-        # Position = -2 ( 1 to -1) -> Sell
-        
-        for date, row in df.iterrows():
-            if row['Position'] == 2:
-                signals.append(Signal(
-                    date=date,
-                    symbol="UNKNOWN", # Need to pass symbol or have it in OHLCV
-                    signal_type="BUY",
-                    price=row['close'],
-                    strategy="SMA_CROSS"
-                ))
-            elif row['Position'] == -2:
-                signals.append(Signal(
-                    date=date,
-                    symbol="UNKNOWN",
-                    signal_type="SELL",
-                    price=row['close'],
-                    strategy="SMA_CROSS"
-                ))
-                
-        return signals
+        if not parts["date"]:
+            return {col: np.empty(0, dtype=np.int64 if col == "date" else np.float64 if col == "price" else object)
+                    for col in EVENT_COLUMNS}
+        table = {col: np.concatenate(chunks) for col, chunks in parts.items()}
+        order = np.argsort(table["date"], kind="stable")
+        return {col: values[order] for col, values in table.items()}
+
+    @staticmethod
+    def to_signals(table: Dict[str, np.ndarray]) -> List[Signal]:
+        dates = table["date"].view("datetime64[ns]").astype("datetime64[us]").tolist()
+        return [
+            Signal(date=d, symbol=sym, signal_type=t, price=p, strategy=strat)
+            for d, sym, t, p, strat in zip(dates, table["symbol"].tolist(), table["signal_type"].tolist(),
+                                           table["price"].tolist(), table["strategy"].tolist())
+        ]
+
+    @staticmethod
+    def generate_sma_cross_signals(data: BarSeries, short_window: int = 50, long_window: int = 200) -> List[Signal]:
+        if not data or len(data) < long_window:
+            return []
+        table = SignalService.scan([data], [{"name": "SMA_CROSS", "short_window": short_window, "long_window": long_window}])
+        return SignalService.to_signals(table)
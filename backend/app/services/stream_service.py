@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import func
+from ..models.bar_series import BarSeries
+from ..models.db import SessionLocal
+from ..models.sql_models import AlertSQL
+from .data_service import DataService
+from .market_data_fetcher import market_data
+
+logger = logging.getLogger(__name__)
+
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", 5))
+STREAM_MAX_PENDING = int(os.getenv("STREAM_MAX_PENDING", 256))
+STREAM_SNAPSHOT_PERIOD = os.getenv("STREAM_SNAPSHOT_PERIOD", "1mo")
+
+
+def _iso(date_ns: int) -> str:
+    return np.datetime64(int(date_ns), "ns").astype("datetime64[s]").item().isoformat()
+
+
+def _bar(data: BarSeries, i: int) -> Dict:
+    return {"date": int(data.date[i]), "open": float(data.open[i]), "high": float(data.high[i]),
+            "low": float(data.low[i]), "close": float(data.close[i]), "volume": int(data.volume[i])}
+
+
+class YahooPriceFeed:
+    """History and quotes from the provider, through the coalescing fetcher."""
+
+    async def history(self, symbol: str, period: str) -> BarSeries:
+        return await market_data.fetch_history(symbol, period=period)
+
+    async def quote(self, symbol: str) -> Tuple[int, float]:
+        """(session date, int64 ns; last price), see DataService.get_current_quote."""
+        return await market_data.get_current_quote(symbol)
+
+
+class FakePriceFeed:
+    """
+    Offline feed for tests and local development: mock history, then a seeded
+    random walk from its last close. Every quote() moves the price one step.
+    Quotes belong to the last history session until next_session() opens a new one.
+    """
+
+    def __init__(self, seed: int = 0, volatility: float = 0.002):
+        self.seed = seed
+        self.volatility = volatility
+        self.session: Optional[int] = None
+        self._prices: Dict[str, float] = {}
+        self._sessions: Dict[str, int] = {}
+        self._rngs: Dict[str, np.random.Generator] = {}
+
+    async def history(self, symbol: str, period: str) -> BarSeries:
+        data = DataService._generate_mock_data(symbol, period)
+        if len(data):
+            self._prices.setdefault(symbol, float(data.close[-1]))
+            self._sessions.setdefault(symbol, int(data.date[-1]))
+        return data
+
+    async def quote(self, symbol: str) -> Tuple[int, float]:
+        rng = self._rngs.get(symbol)
+        if rng is None:
+            rng = self._rngs[symbol] = np.random.default_rng([self.seed, sum(map(ord, symbol))])
+        price = self._prices.get(symbol, 100.0) * float(np.exp(rng.normal(0, self.volatility)))
+        self._prices[symbol] = price
+        session = self.session if self.session is not None else self._sessions.get(symbol)
+        if session is None:
+            session = _session_ns(np.busday_offset(np.datetime64(date.today(), "D"), 0, roll="backward"))
+        return session, price
+
+    def next_session(self) -> int:
+        """Open the trading day after the latest one seen; later quotes of every symbol belong to it."""
+        latest = max([self.session or 0, *self._sessions.values()])
+        day = np.datetime64(latest, "ns").astype("datetime64[D]") if latest else np.datetime64(date.today(), "D")
+        self.session = _session_ns(np.busday_offset(day, 1, roll="forward"))
+        return self.session
+
+
+def _session_ns(day: np.datetime64) -> int:
+    return int(day.astype("datetime64[ns]").astype(np.int64))
+
+
+class Subscriber:
+    """
+    Outgoing queue of one client.
+
+    Pending messages are keyed: a newer update of the same bar replaces the
+    unsent one (a slow client skips intermediate ticks rather than falling
+    behind). If more than `max_pending` distinct messages pile up anyway, the
+    subscriber is closed as lagging; the client reconnects and gets a fresh snapshot.
+    """
+
+    def __init__(self, max_pending: int = STREAM_MAX_PENDING):
+        self.max_pending = max_pending
+        self.symbols: Set[str] = set()
+        self.conflated = 0
+        self.closed = False
+        self._pending: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def offer(self, key: Hashable, message: Dict) -> None:
+        if self.closed:
+            return
+        if key in self._pending:
+            self.conflated += 1
+        elif len(self._pending) >= self.max_pending:
+            self.close()
+            return
+        self._pending[key] = message
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Every pending message, oldest first; [] on timeout or once closed."""
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class StreamHub:
+    """
+    Fans live bar and alert updates out to streaming clients.
+
+    A client gets one snapshot per symbol (recent bars as parallel arrays), then
+    only deltas: the current bar whenever its price changes, and new alerts for
+    its symbols. A single poll loop quotes each subscribed symbol once per
+    interval however many clients watch it, and stops when the last one leaves.
+
+    Alerts are read from the alerts table on each poll rather than handed over
+    in memory: the alert engine runs in whichever process holds the scheduler,
+    and clients may be connected to any worker.
+    """
+
+    def __init__(self, feed=None, poll_interval: float = STREAM_POLL_INTERVAL, snapshot_period: str = STREAM_SNAPSHOT_PERIOD):
+        self.feed = feed or (FakePriceFeed() if os.getenv("PRICE_FEED") == "fake" else YahooPriceFeed())
+        self.poll_interval = poll_interval
+        self.snapshot_period = snapshot_period
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.history: Dict[str, BarSeries] = {}
+        self.bars: Dict[str, Dict] = {}
+        self.polls = 0
+        self._alert_cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self, subscriber: Subscriber, symbols: Iterable[str]) -> None:
+        for symbol in dict.fromkeys(s.upper() for s in symbols):
+            if symbol in subscriber.symbols:
+                continue
+            if symbol not in self.history:
+                data = await self.feed.history(symbol, self.snapshot_period)
+                self.history[symbol] = data
+                if len(data):
+                    self.bars.setdefault(symbol, _bar(data, -1))
+            subscriber.symbols.add(symbol)
+            self.subscribers.setdefault(symbol, set()).add(subscriber)
+            subscriber.offer(("snapshot", symbol), self._snapshot(symbol))
+        if self._task is None or self._task.done():
+            # Deliver alerts stored from now on, not the backlog.
+            self._alert_cursor = await asyncio.to_thread(_latest_alert_id)
+            self._task = asyncio.ensure_future(self._poll_loop())
+
+    def unsubscribe(self, subscriber: Subscriber, symbols: Optional[Iterable[str]] = None) -> None:
+        for symbol in [s.upper() for s in symbols] if symbols is not None else list(subscriber.symbols):
+            subscriber.symbols.discard(symbol)
+            watchers = self.subscribers.get(symbol)
+            if watchers is not None:
+                watchers.discard(subscriber)
+                if not watchers:
+                    del self.subscribers[symbol]
+                    self.history.pop(symbol, None)
+                    self.bars.pop(symbol, None)
+
+    def _snapshot(self, symbol: str) -> Dict:
+        data = self.history[symbol]
+        bars = {col: values.tolist() for col, values in data.columns().items()}
+        bars["date"] = [_iso(d) for d in data.date]
+        if symbol in self.bars and len(data):
+            # The live bar may have moved since the history was fetched.
+            live = self.bars[symbol]
+            if live["date"] == int(data.date[-1]):
+                for col in ("open", "high", "low", "close", "volume"):
+                    bars[col][-1] = live[col]
+            else:
+                for col in ("open", "high", "low", "close", "volume"):
+                    bars[col].append(live[col])
+                bars["date"].append(_iso(live["date"]))
+        return {"type": "snapshot", "symbol": symbol, "bars": bars}
+
+    async def _poll_loop(self) -> None:
+        while self.subscribers:
+            symbols = list(self.subscribers)
+            quotes = await asyncio.gather(*(self.feed.quote(s) for s in symbols), return_exceptions=True)
+            self.polls += 1
+            for symbol, quote in zip(symbols, quotes):
+                if isinstance(quote, Exception):
+                    logger.warning(f"Error polling {symbol}: {quote}")
+                    continue
+                session, price = quote
+                if symbol in self.subscribers and price is not None and np.isfinite(price):
+                    self._on_price(symbol, int(session), float(price))
+            try:
+                self._publish_alerts(await asyncio.to_thread(self._new_alerts))
+            except Exception:
+                logger.exception("Error polling alerts")
+            await asyncio.sleep(self.poll_interval)
+
+    def _on_price(self, symbol: str, session: int, price: float) -> None:
+        """
+        Fold a quote into the symbol's current daily bar and publish it if it changed.
+        A quote from a later session than the bar's starts a new bar; the session comes
+        from the quote, so weekends, holidays and pre-open polls don't start one.
+        """
+        bar = self.bars.get(symbol)
+        if bar is not None and session < bar["date"]:
+            return
+        if bar is None or session > bar["date"]:
+            bar = {"date": session, "open": price, "high": price, "low": price, "close": price, "volume": 0}
+        elif bar["close"] == price:
+            return
+        else:
+            bar = {**bar, "high": max(bar["high"], price), "low": min(bar["low"], price), "close": price}
+        self.bars[symbol] = bar
+        message = {"type": "bar", "symbol": symbol, "bar": {**bar, "date": _iso(bar["date"])}}
+        for subscriber in list(self.subscribers.get(symbol, ())):
+            subscriber.offer(("bar", symbol, bar["date"]), message)
+
+    def _new_alerts(self) -> List[Dict]:
+        """Alerts stored since the last poll, by any process."""
+        with SessionLocal() as db:
+            rows = db.query(AlertSQL).filter(AlertSQL.id > self._alert_cursor).order_by(AlertSQL.id).all()
+        if rows:
+            self._alert_cursor = rows[-1].id
+        return [{"rule_id": a.rule_id, "symbol": a.symbol, "bar_date": a.bar_date, "value": a.value,
+                 "message": a.message, "created_at": a.created_at} for a in rows]
+
+    def _publish_alerts(self, alerts: List[Dict]) -> None:
+        for alert in alerts:
+            message = {"type": "alert", **alert,
+                       "bar_date": alert["bar_date"].isoformat(), "created_at": alert["created_at"].isoformat()}
+            for subscriber in list(self.subscribers.get(alert["symbol"], ())):
+                subscriber.offer(("alert", alert["rule_id"], alert["symbol"], message["bar_date"]), message)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict:
+        clients = {id(s) for watchers in self.subscribers.values() for s in watchers}
+        return {"symbols": len(self.subscribers), "clients": len(clients), "polls": self.polls}
+
+
+def _latest_alert_id() -> int:
+    with SessionLocal() as db:
+        return db.query(func.max(AlertSQL.id)).scalar() or 0
+
+
+stream_hub = StreamHub()
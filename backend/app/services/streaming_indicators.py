@@ -0,0 +1,299 @@
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+from ..models.bar_series import BarSeries
+from .indicator_service import parse_spec
+
+NAN = float("nan")
+
+
+class StreamingSMA:
+    """Ring-buffer simple moving average. O(1) per bar."""
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self.buffer: List[float] = [0.0] * window
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        slot = self.count % self.window
+        if self.count >= self.window:
+            self.total -= self.buffer[slot]
+        self.buffer[slot] = close
+        self.total += close
+        self.count += 1
+        if slot == self.window - 1:
+            # Re-sum once per lap so floating point drift can't accumulate.
+            self.total = math.fsum(self.buffer)
+        return self.values()
+
+    def mean(self) -> float:
+        return self.total / self.window if self.count >= self.window else NAN
+
+    def values(self) -> Dict[str, float]:
+        return {"": self.mean()}
+
+    def snapshot(self) -> Dict:
+        return {"window": self.window, "buffer": list(self.buffer), "count": self.count, "total": self.total}
+
+    def restore(self, state: Dict) -> None:
+        self.window, self.buffer, self.count, self.total = state["window"], list(state["buffer"]), state["count"], state["total"]
+
+
+class StreamingBollinger(StreamingSMA):
+    """Bollinger bands from running sums of x and x^2 over the ring buffer."""
+
+    def __init__(self, window: int = 20, num_std: float = 2):
+        super().__init__(window)
+        self.num_std = num_std
+        self.total_sq = 0.0
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        slot = self.count % self.window
+        if self.count >= self.window:
+            self.total_sq -= self.buffer[slot] ** 2
+        self.total_sq += close * close
+        if slot == self.window - 1:
+            self.total_sq = math.fsum(x * x for x in self.buffer[:slot] + [close])
+        return super().update(close)
+
+    def values(self) -> Dict[str, float]:
+        mid = self.mean()
+        if math.isnan(mid):
+            return {"_mid": NAN, "_upper": NAN, "_lower": NAN}
+        band = self.num_std * math.sqrt(max(self.total_sq / self.window - mid * mid, 0.0))
+        return {"_mid": mid, "_upper": mid + band, "_lower": mid - band}
+
+    def snapshot(self) -> Dict:
+        return {**super().snapshot(), "num_std": self.num_std, "total_sq": self.total_sq}
+
+    def restore(self, state: Dict) -> None:
+        super().restore(state)
+        self.num_std, self.total_sq = state["num_std"], state["total_sq"]
+
+
+class StreamingEMA:
+    """Recursive EMA seeded with the first value (same as the batch engine's adjust=False)."""
+
+    def __init__(self, span: int = 20, alpha: Optional[float] = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1)
+        self.value = NAN
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        self.value = close if math.isnan(self.value) else self.value + self.alpha * (close - self.value)
+        return self.values()
+
+    def values(self) -> Dict[str, float]:
+        return {"": self.value}
+
+    def snapshot(self) -> Dict:
+        return {"alpha": self.alpha, "value": self.value}
+
+    def restore(self, state: Dict) -> None:
+        self.alpha, self.value = state["alpha"], state["value"]
+
+
+class StreamingMACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast, self.slow, self.signal = StreamingEMA(fast), StreamingEMA(slow), StreamingEMA(signal)
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        self.fast.update(close)
+        self.slow.update(close)
+        self.signal.update(self.fast.value - self.slow.value)
+        return self.values()
+
+    def values(self) -> Dict[str, float]:
+        macd = self.fast.value - self.slow.value
+        return {"": macd, "_signal": self.signal.value, "_hist": macd - self.signal.value}
+
+    def snapshot(self) -> Dict:
+        return {"fast": self.fast.snapshot(), "slow": self.slow.snapshot(), "signal": self.signal.snapshot()}
+
+    def restore(self, state: Dict) -> None:
+        self.fast.restore(state["fast"])
+        self.slow.restore(state["slow"])
+        self.signal.restore(state["signal"])
+
+
+class _Wilder:
+    """Wilder smoothing: simple mean of the first `window` inputs, then recursive."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, x: float) -> float:
+        self.count += 1
+        if self.count <= self.window:
+            self.value += (x - self.value) / self.count  # running mean during warm-up
+        else:
+            self.value += (x - self.value) / self.window
+        return self.value if self.count >= self.window else NAN
+
+    def snapshot(self) -> Dict:
+        return {"window": self.window, "count": self.count, "value": self.value}
+
+    def restore(self, state: Dict) -> None:
+        self.window, self.count, self.value = state["window"], state["count"], state["value"]
+
+
+class StreamingRSI:
+    def __init__(self, window: int = 14):
+        self.gain, self.loss = _Wilder(window), _Wilder(window)
+        self.prev_close = NAN
+        self.rsi = NAN
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        if not math.isnan(self.prev_close):
+            change = close - self.prev_close
+            avg_gain = self.gain.update(max(change, 0.0))
+            avg_loss = self.loss.update(max(-change, 0.0))
+            if math.isnan(avg_gain):
+                self.rsi = NAN
+            elif avg_loss == 0:
+                self.rsi = 100.0
+            else:
+                self.rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        self.prev_close = close
+        return self.values()
+
+    def values(self) -> Dict[str, float]:
+        return {"": self.rsi}
+
+    def snapshot(self) -> Dict:
+        return {"gain": self.gain.snapshot(), "loss": self.loss.snapshot(), "prev_close": self.prev_close, "rsi": self.rsi}
+
+    def restore(self, state: Dict) -> None:
+        self.gain.restore(state["gain"])
+        self.loss.restore(state["loss"])
+        self.prev_close, self.rsi = state["prev_close"], state["rsi"]
+
+
+class StreamingATR:
+    def __init__(self, window: int = 14):
+        self.smooth = _Wilder(window)
+        self.prev_close = NAN
+        self.atr = NAN
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        high = close if math.isnan(high) else high
+        low = close if math.isnan(low) else low
+        prev = close if math.isnan(self.prev_close) else self.prev_close
+        self.atr = self.smooth.update(max(high, prev) - min(low, prev))
+        self.prev_close = close
+        return self.values()
+
+    def values(self) -> Dict[str, float]:
+        return {"": self.atr}
+
+    def snapshot(self) -> Dict:
+        return {"smooth": self.smooth.snapshot(), "prev_close": self.prev_close, "atr": self.atr}
+
+    def restore(self, state: Dict) -> None:
+        self.smooth.restore(state["smooth"])
+        self.prev_close, self.atr = state["prev_close"], state["atr"]
+
+
+# Streaming counterparts of the batch registry in indicator_service, same spec names.
+STREAMING_INDICATORS = {
+    "SMA": StreamingSMA,
+    "EMA": StreamingEMA,
+    "RSI": StreamingRSI,
+    "MACD": StreamingMACD,
+    "BB": StreamingBollinger,
+    "ATR": StreamingATR,
+}
+
+
+class IndicatorState:
+    """
+    Incremental indicator values for one symbol. `update` applies one new bar in
+    O(1); bars at or before the last applied timestamp are ignored, so re-polling
+    the same latest bar is harmless. Only apply final bars: a bar still forming
+    goes through `preview`. `snapshot`/`restore` round-trip through JSON.
+    """
+
+    def __init__(self, symbol: str, indicators: Iterable[str]):
+        self.symbol = symbol
+        self.last_date: Optional[int] = None
+        self.indicators = {}
+        for spec in indicators:
+            name, params = parse_spec(spec)
+            if name not in STREAMING_INDICATORS:
+                raise ValueError(f"No streaming version of indicator: {spec}")
+            self.indicators[spec] = STREAMING_INDICATORS[name](*params)
+
+    @classmethod
+    def from_series(cls, data: BarSeries, indicators: Iterable[str]) -> "IndicatorState":
+        """Warm up by replaying history once; afterwards only new bars are applied."""
+        state = cls(data.symbol, indicators)
+        state.update_many(data)
+        return state
+
+    def update(self, date: int, close: float, high: float = NAN, low: float = NAN) -> bool:
+        if self.last_date is not None and date <= self.last_date:
+            return False
+        for ind in self.indicators.values():
+            ind.update(close, high, low)
+        self.last_date = date
+        return True
+
+    def update_many(self, data: BarSeries) -> int:
+        """Apply the bars of `data` newer than the last applied one. Returns how many."""
+        start = 0 if self.last_date is None else int(data.date.searchsorted(self.last_date, side="right"))
+        for date, close, high, low in zip(data.date[start:].tolist(), data.close[start:].tolist(),
+                                          data.high[start:].tolist(), data.low[start:].tolist()):
+            self.update(date, close, high, low)
+        return len(data) - start
+
+    def preview(self, date: int, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        """
+        Values as if a bar were applied, leaving the state untouched: for a bar that
+        is still forming, whose close will change before it is final.
+        """
+        trial = IndicatorState.restore(self.snapshot())
+        trial.update(date, close, high, low)
+        return trial.values()
+
+    def values(self) -> Dict[str, float]:
+        out = {}
+        for spec, ind in self.indicators.items():
+            for suffix, value in ind.values().items():
+                out[spec + suffix] = value
+        return out
+
+    def snapshot(self) -> Dict:
+        return {
+            "symbol": self.symbol,
+            "last_date": self.last_date,
+            "indicators": {spec: ind.snapshot() for spec, ind in self.indicators.items()},
+        }
+
+    @classmethod
+    def restore(cls, snapshot: Dict) -> "IndicatorState":
+        state = cls(snapshot["symbol"], snapshot["indicators"].keys())
+        state.last_date = snapshot["last_date"]
+        for spec, ind_state in snapshot["indicators"].items():
+            state.indicators[spec].restore(ind_state)
+        return state
+
+
+def save_states(path: str, states: Dict[str, IndicatorState]) -> None:
+    """Write all states to one JSON file (atomically replaced)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({symbol: state.snapshot() for symbol, state in states.items()}, f)
+    os.replace(tmp_path, path)
+
+
+def load_states(path: str) -> Dict[str, IndicatorState]:
+    try:
+        with open(path) as f:
+            snapshots = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {symbol: IndicatorState.restore(snap) for symbol, snap in snapshots.items()}
@@ -0,0 +1,158 @@
+import csv
+import heapq
+import os
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Set
+
+SYMBOL_CATALOG_PATH = os.getenv(
+    "SYMBOL_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "symbols.csv"),
+)
+
+_TOKEN = re.compile(r"[A-Z0-9]+")
+
+# Match classes, best first.
+EXACT_SYMBOL, EXACT_BASE, SYMBOL_PREFIX, NAME_PREFIX, SYMBOL_SUBSTRING = range(5)
+
+
+class SymbolCatalog:
+    """
+    Symbol listings loaded once from a CSV (symbol,name,exchange) and indexed for
+    type-ahead search:
+
+    - exact lookup on the symbol and on its base (the part before ".NS"/".BO");
+    - sorted arrays of symbols and of every symbol suffix, so a bisect finds symbol
+      prefix and substring matches in O(log n) instead of scanning every listing;
+    - an inverted index from name tokens to listings, with a sorted token array
+      for prefix lookups ("tata mot" -> Tata Motors).
+    """
+
+    def __init__(self, path: str = SYMBOL_CATALOG_PATH):
+        self.path = path
+        self.listings: List[Dict[str, str]] = []
+        self._by_symbol: Dict[str, int] = {}
+        self._by_base: Dict[str, List[int]] = {}
+        self._symbols_sorted: List[str] = []
+        self._symbols_sorted_ids: List[int] = []
+        self._suffixes: List[str] = []
+        self._suffix_ids: List[int] = []
+        self._tokens: List[str] = []
+        self._token_ids: Dict[str, List[int]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._build()
+                self._loaded = True
+
+    def _build(self) -> None:
+        with open(self.path, newline="", encoding="utf-8") as f:
+            self.listings = [
+                {"symbol": row["symbol"].strip().upper(), "name": row["name"].strip(), "exchange": (row.get("exchange") or "").strip()}
+                for row in csv.DictReader(f) if row.get("symbol")
+            ]
+
+        suffixes = []
+        token_ids: Dict[str, List[int]] = {}
+        for i, listing in enumerate(self.listings):
+            symbol = listing["symbol"]
+            self._by_symbol.setdefault(symbol, i)
+            self._by_base.setdefault(symbol.split(".")[0], []).append(i)
+            suffixes.extend((symbol[k:], i) for k in range(len(symbol)))
+            for token in set(_TOKEN.findall(listing["name"].upper())):
+                token_ids.setdefault(token, []).append(i)
+
+        by_symbol = sorted((listing["symbol"], i) for i, listing in enumerate(self.listings))
+        self._symbols_sorted = [s for s, _ in by_symbol]
+        self._symbols_sorted_ids = [i for _, i in by_symbol]
+        suffixes.sort()
+        self._suffixes = [s for s, _ in suffixes]
+        self._suffix_ids = [i for _, i in suffixes]
+        self._tokens = sorted(token_ids)
+        self._token_ids = token_ids
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.listings)
+
+    def symbols(self) -> List[str]:
+        self._ensure_loaded()
+        return [listing["symbol"] for listing in self.listings]
+
+    def get(self, symbol: str) -> Optional[Dict[str, str]]:
+        self._ensure_loaded()
+        i = self._by_symbol.get(symbol.upper())
+        return None if i is None else self.listings[i]
+
+    def _suffix_matches(self, q: str) -> Iterator[int]:
+        """Listings with `q` somewhere in the symbol (every symbol suffix starting with q)."""
+        start = bisect_left(self._suffixes, q)
+        for k in range(start, len(self._suffixes)):
+            if not self._suffixes[k].startswith(q):
+                break
+            yield self._suffix_ids[k]
+
+    def _prefix_matches(self, q: str) -> Iterator[int]:
+        start = bisect_left(self._symbols_sorted, q)
+        for k in range(start, len(self._symbols_sorted)):
+            if not self._symbols_sorted[k].startswith(q):
+                break
+            yield self._symbols_sorted_ids[k]
+
+    def _token_prefix_matches(self, prefix: str) -> Set[int]:
+        ids: Set[int] = set()
+        start = bisect_left(self._tokens, prefix)
+        for k in range(start, len(self._tokens)):
+            token = self._tokens[k]
+            if not token.startswith(prefix):
+                break
+            ids.update(self._token_ids[token])
+        return ids
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, str]]:
+        """Listings matching `query`, best match first, at most `limit` of them."""
+        self._ensure_loaded()
+        q = query.strip().upper()
+        if not q:
+            return self.listings[:limit]
+
+        best: Dict[int, int] = {}
+
+        def offer(i: int, rank: int) -> None:
+            if rank < best.get(i, SYMBOL_SUBSTRING + 1):
+                best[i] = rank
+
+        if q in self._by_symbol:
+            offer(self._by_symbol[q], EXACT_SYMBOL)
+        for i in self._by_base.get(q, ()):
+            offer(i, EXACT_BASE)
+        if len(q) > 1:
+            for i in self._suffix_matches(q):
+                offer(i, SYMBOL_PREFIX if self.listings[i]["symbol"].startswith(q) else SYMBOL_SUBSTRING)
+        else:
+            for i in self._prefix_matches(q):
+                offer(i, SYMBOL_PREFIX)
+
+        # Every query token must prefix-match some token of the name. A single
+        # character would match most of a large catalog, so only symbols count then.
+        tokens = _TOKEN.findall(q)
+        if tokens and len(q) > 1:
+            name_ids = self._token_prefix_matches(tokens[0])
+            for token in tokens[1:]:
+                if not name_ids:
+                    break
+                name_ids &= self._token_prefix_matches(token)
+            for i in name_ids:
+                offer(i, NAME_PREFIX)
+
+        ranked = heapq.nsmallest(limit, best, key=lambda i: (best[i], len(self.listings[i]["symbol"]), self.listings[i]["symbol"]))
+        return [self.listings[i] for i in ranked]
+
+
+symbol_catalog = SymbolCatalog()
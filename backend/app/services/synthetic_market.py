@@ -0,0 +1,186 @@
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+from ..models.bar_series import BarSeries
+from .resample_service import DAY_NS, INTRADAY_MINUTES, MINUTE_NS, resample
+
+# Daily paths start here, so any date range is a slice of the same path and
+# stored bars stay consistent with later top-ups.
+SYNTHETIC_ORIGIN = np.datetime64("2000-01-03")
+MOCK_SEED = int(os.getenv("MOCK_SEED", 0))
+
+SESSION_OPEN_MINUTES = 9 * 60 + 30
+SESSION_MINUTES = 390
+
+# Market regimes: (annual drift, volatility multiplier) for bull and bear markets.
+# The market is bearish while a slow AR(1) indicator sits in its bottom ~20%.
+REGIMES = ((0.14, 1.0), (-0.2, 1.6))
+REGIME_PERSISTENCE = 0.995
+BEAR_THRESHOLD = -0.85  # In stationary standard deviations
+
+# Log-volatility AR(1): persistence and shock size (daily).
+VOL_PERSISTENCE = 0.98
+VOL_SHOCK = 0.06
+
+
+def _symbol_key(symbol: str) -> int:
+    return zlib.crc32(symbol.encode())
+
+
+def _ar1(noise: np.ndarray, phi: float) -> np.ndarray:
+    """
+    x[t] = phi * x[t - 1] + noise[t] along axis 0, as a causal FFT convolution with
+    phi^k truncated below 1e-9. Values only depend on earlier noise, so a longer
+    input leaves the prefix unchanged.
+    """
+    n = len(noise)
+    taps = min(n, int(np.ceil(np.log(1e-9) / np.log(phi))))
+    kernel = phi ** np.arange(taps)
+    size = 1 << int(np.ceil(np.log2(n + taps)))
+    spectrum = np.fft.rfft(noise, size, axis=0) * np.fft.rfft(kernel, size)[:, None]
+    return np.fft.irfft(spectrum, size, axis=0)[:n]
+
+
+class SyntheticMarket:
+    """
+    Deterministic, vectorized OHLCV generator: the offline provider behind the mock
+    data fallback and DATA_PROVIDER=mock.
+
+    Every symbol loads on one market factor (pairwise return correlation
+    `correlation`), which carries the regime (drift and volatility level) and
+    clustered volatility (AR(1) log-volatility). Paths depend only on the seed, the
+    symbol and the bar index, never on which other symbols are generated alongside.
+    Each call uses its own np.random.Generator streams, so it is thread-safe.
+    """
+
+    def __init__(self, seed: int = MOCK_SEED, correlation: float = 0.4,
+                 regimes: bool = True, vol_clustering: bool = True):
+        self.seed = seed
+        self.correlation = correlation
+        self.regimes = regimes
+        self.vol_clustering = vol_clustering
+
+    def _streams(self, *key: int) -> List[np.random.Generator]:
+        # Separate streams per component, so drawing more bars from one leaves the others unchanged.
+        return [np.random.default_rng(s) for s in np.random.SeedSequence([self.seed, *key]).spawn(4)]
+
+    def market(self, n_bars: int) -> Dict[str, np.ndarray]:
+        """Market-wide daily drift, volatility multiplier and factor shocks for n_bars bars."""
+        regime_rng, vol_rng, shock_rng, _ = self._streams(0)
+        drift = np.full(n_bars, REGIMES[0][0] / 252)
+        level = np.ones(n_bars)
+        if self.regimes:
+            indicator = _ar1(regime_rng.standard_normal((n_bars, 1)), REGIME_PERSISTENCE)[:, 0]
+            state = (indicator < BEAR_THRESHOLD / np.sqrt(1 - REGIME_PERSISTENCE ** 2)).astype(int)
+            drift = np.array([r[0] for r in REGIMES])[state] / 252
+            level = np.array([r[1] for r in REGIMES])[state]
+        if self.vol_clustering:
+            log_vol = _ar1(vol_rng.normal(0.0, VOL_SHOCK, (n_bars, 1)), VOL_PERSISTENCE)[:, 0]
+            # Normalized so the mean squared multiplier is 1.
+            level = level * np.exp(log_vol - VOL_SHOCK ** 2 / (1 - VOL_PERSISTENCE ** 2))
+        return {"drift": drift, "level": level, "shock": shock_rng.standard_normal(n_bars)}
+
+    def paths(self, symbols: List[str], n_bars: int) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        OHLCV columns (no dates) for n_bars daily bars per symbol, computed as
+        (n_bars, symbols) matrices in one pass.
+        """
+        market = self.market(n_bars)
+        k = len(symbols)
+        idio = np.empty((n_bars, k))
+        bar_noise = np.empty((n_bars, 3, k))
+        volume_noise = np.empty((n_bars, k))
+        params = np.empty((4, k))
+        for j, symbol in enumerate(symbols):
+            param_rng, shock_rng, bar_rng, volume_rng = self._streams(1, _symbol_key(symbol))
+            # Start price, annual volatility, beta-like drift scale and typical volume.
+            params[:, j] = (np.exp(param_rng.uniform(np.log(10), np.log(500))), param_rng.uniform(0.15, 0.4),
+                            param_rng.uniform(0.5, 1.5), np.exp(param_rng.uniform(np.log(1e5), np.log(5e7))))
+            idio[:, j] = shock_rng.standard_normal(n_bars)
+            bar_noise[:, :, j] = bar_rng.standard_normal((n_bars, 3))  # Row-major: bar t always gets the same draws
+            volume_noise[:, j] = volume_rng.standard_normal(n_bars)
+        start, annual_vol, drift_scale, base_volume = params
+
+        rho = self.correlation
+        shocks = np.sqrt(rho) * market["shock"][:, None] + np.sqrt(1 - rho) * idio
+        daily_vol = annual_vol / np.sqrt(252) * market["level"][:, None]
+        returns = market["drift"][:, None] * drift_scale + daily_vol * shocks - daily_vol ** 2 / 2
+
+        close = start * np.exp(np.cumsum(returns, axis=0))
+        # Part of each return happens overnight: the open gaps away from the previous close.
+        prev_close = np.vstack([start[None, :], close[:-1]])
+        gap, up, down = bar_noise[:, 0], bar_noise[:, 1], bar_noise[:, 2]
+        open_ = prev_close * np.exp(0.3 * returns + 0.1 * daily_vol * gap)
+        high = np.maximum(open_, close) * np.exp(0.5 * daily_vol * np.abs(up))
+        low = np.minimum(open_, close) * np.exp(-0.5 * daily_vol * np.abs(down))
+        # Busier on big moves.
+        volume = base_volume * np.exp(0.3 * volume_noise) * (1 + 2 * np.abs(shocks))
+        return {
+            symbol: {"open": open_[:, j], "high": high[:, j], "low": low[:, j],
+                     "close": close[:, j], "volume": volume[:, j].astype(np.int64)}
+            for j, symbol in enumerate(symbols)
+        }
+
+    def daily(self, symbols: List[str], start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """Daily store columns on business days from `start` (default: the origin) through `end` (default: today)."""
+        last = np.datetime64((end or datetime.now()).date(), "D")
+        days = np.arange(SYNTHETIC_ORIGIN, last + 1, dtype="datetime64[D]")
+        days = days[np.is_busday(days)]
+        first = 0 if start is None else int(np.searchsorted(days, np.datetime64(start.date(), "D")))
+        dates = days[first:].astype("datetime64[ns]").astype(np.int64)
+        return {symbol: {"date": dates, **{col: values[first:] for col, values in bars.items()}}
+                for symbol, bars in self.paths(symbols, len(days)).items()}
+
+    def intraday(self, symbols: List[str], minutes: int, start: datetime, end: Optional[datetime] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Intraday store columns for a regular 9:30-16:00 session. Each day's 1m path is
+        a Brownian bridge from the daily open to the daily close, so intraday bars
+        agree with the daily series; coarser intervals are resampled from it.
+        """
+        end = end or datetime.now()
+        daily = self.daily(symbols, start, end)
+        out = {}
+        for symbol, bars in daily.items():
+            n_days = len(bars["date"])
+            # One stream per day, so a day's path is the same whatever range it is requested in.
+            noise = np.empty((3, n_days, SESSION_MINUTES))
+            for d, date in enumerate(bars["date"]):
+                rng = np.random.default_rng([self.seed, 2, _symbol_key(symbol), int(date) // DAY_NS])
+                noise[:, d] = rng.standard_normal((3, SESSION_MINUTES))
+            steps = np.arange(1, SESSION_MINUTES + 1) / SESSION_MINUTES
+            day_vol = np.abs(np.log(bars["high"] / bars["low"]))[:, None] / 2
+            walk = np.cumsum(noise[0], axis=1) / np.sqrt(SESSION_MINUTES)
+            bridge = (walk - steps * walk[:, -1:]) * day_vol
+            log_open = np.log(bars["open"])[:, None]
+            close = np.exp(log_open + steps * (np.log(bars["close"])[:, None] - log_open) + bridge)
+            open_ = np.hstack([bars["open"][:, None], close[:, :-1]])
+            wiggle = np.exp(np.abs(noise[1:]) * day_vol[None] / np.sqrt(SESSION_MINUTES))
+            # U-shaped volume: busiest at the open and close.
+            shape = 1 + 1.5 * ((steps - 0.5) * 2) ** 2
+            volume = np.maximum((bars["volume"][:, None] * shape / shape.sum()).astype(np.int64), 1)
+            dates = bars["date"][:, None] + (SESSION_OPEN_MINUTES + np.arange(SESSION_MINUTES)) * MINUTE_NS
+            series = BarSeries(dates.ravel(), open_.ravel(), (np.maximum(open_, close) * wiggle[0]).ravel(),
+                               (np.minimum(open_, close) / wiggle[1]).ravel(), close.ravel(), volume.ravel(),
+                               symbol=symbol, interval="1m")
+            series = series.since(int(np.datetime64(start, "ns").astype(np.int64)))
+            series = series[:int(np.searchsorted(series.date, int(np.datetime64(end, "ns").astype(np.int64)), side="right"))]
+            if minutes != 1:
+                series = resample(series, next(name for name, m in INTRADAY_MINUTES.items() if m == minutes))
+            out[symbol] = series.columns()
+        return out
+
+    def columns(self, symbols: List[str], interval: str, start: Optional[datetime] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """Store columns per symbol at `interval`, from `start` (None: as far back as the interval goes)."""
+        if interval in INTRADAY_MINUTES:
+            start = start or datetime.now() - timedelta(days=7)
+            return self.intraday(symbols, INTRADAY_MINUTES[interval], start)
+        daily = self.daily(symbols, start)
+        if interval == "1d":
+            return daily
+        return {symbol: resample(BarSeries.from_columns(cols, symbol=symbol), interval).columns()
+                for symbol, cols in daily.items()}
+
+
+synthetic_market = SyntheticMarket()
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from ..models.sql_models import HoldingSQL, PortfolioSnapshotSQL
+from ..models.schemas import Portfolio, Position
+from .data_service import DataService
+from .ledger_service import LedgerService
+
+QUOTE_TTL = float(os.getenv("QUOTE_TTL", 30))
+
+
+class QuoteCache:
+    """
+    Last prices with a short TTL. Expired or missing symbols are refreshed together
+    in one batched fetch; if the provider returns nothing for a symbol its last
+    known (expired) price is still used. The lock only guards the cache itself:
+    fetches run outside it, and a symbol already being fetched by another caller
+    is waited for rather than fetched again.
+    """
+
+    def __init__(self, ttl: float = QUOTE_TTL):
+        self.ttl = ttl
+        self._quotes: Dict[str, tuple] = {}  # symbol -> (price, fetched_at)
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def get_many(self, symbols: List[str]) -> Dict[str, float]:
+        with self._lock:
+            now = time.monotonic()
+            expired = [s for s in symbols if s not in self._quotes or now - self._quotes[s][1] > self.ttl]
+            waiting = {self._in_flight[s] for s in expired if s in self._in_flight}
+            mine = [s for s in expired if s not in self._in_flight]
+            if mine:
+                fetch = Future()
+                self._in_flight.update((s, fetch) for s in mine)
+                self.fetches += 1
+
+        if mine:
+            try:
+                prices = DataService.get_current_prices(mine)
+            except Exception as e:
+                self._finish(mine, fetch, {}, now)
+                fetch.set_exception(e)
+                raise
+            self._finish(mine, fetch, prices, now)
+            fetch.set_result(None)
+        for other in waiting:
+            other.result()
+        with self._lock:
+            return {s: self._quotes[s][0] for s in symbols if s in self._quotes}
+
+    def _finish(self, symbols: List[str], fetch: Future, prices: Dict[str, float], fetched_at: float) -> None:
+        with self._lock:
+            for symbol, price in prices.items():
+                self._quotes[symbol] = (price, fetched_at)
+            for symbol in symbols:
+                if self._in_flight.get(symbol) is fetch:
+                    del self._in_flight[symbol]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._quotes.clear()
+
+
+quote_cache = QuoteCache()
+
+
+class ValuationService:
+    """Marks the portfolio to market: one batched quote fetch, then array math over positions."""
+
+    def __init__(self, db: Session, quotes: QuoteCache = quote_cache):
+        self.db = db
+        self.quotes = quotes
+
+    def value(self) -> Portfolio:
+        holdings = {h.symbol: h.quantity for h in self.db.query(HoldingSQL).filter(HoldingSQL.quantity != 0)}
+        ledger = LedgerService(self.db)
+        cash = ledger.cash()
+        symbols = sorted(holdings)
+        prices = self.quotes.get_many(symbols) if symbols else {}
+        basis = ledger.cost_basis(symbols) if symbols else {}
+
+        quantity = np.array([holdings[s] for s in symbols], dtype=np.float64)
+        price = np.array([prices.get(s, np.nan) for s in symbols], dtype=np.float64)
+        cost = np.array([basis.get(s, np.nan) for s in symbols], dtype=np.float64)
+        market_value = quantity * price
+        priced = ~np.isnan(market_value)
+        total_value = cash + float(market_value[priced].sum())
+        unrealized = market_value - cost
+        weight = market_value / total_value if total_value else np.full(len(symbols), np.nan)
+
+        def opt(v: float) -> Optional[float]:
+            return None if np.isnan(v) else float(v)
+
+        positions = [
+            Position(symbol=s, quantity=holdings[s], price=opt(price[i]), market_value=opt(market_value[i]),
+                     cost_basis=opt(cost[i]), unrealized_pnl=opt(unrealized[i]), weight=opt(weight[i]))
+            for i, s in enumerate(symbols)
+        ]
+        return Portfolio(
+            cash=cash,
+            holdings=holdings,
+            total_value=total_value,
+            market_value=float(market_value[priced].sum()),
+            unrealized_pnl=float(np.nansum(unrealized)),
+            realized_pnl=ledger.realized_pnl(),
+            positions=positions,
+            unpriced=[s for s, ok in zip(symbols, priced) if not ok],
+            as_of=datetime.now(),
+        )
+
+    def snapshot(self) -> Portfolio:
+        """Value the portfolio and record it as a PortfolioSnapshotSQL row."""
+        portfolio = self.value()
+        self.db.add(PortfolioSnapshotSQL(date=portfolio.as_of, cash=portfolio.cash, total_value=portfolio.total_value))
+        self.db.commit()
+        return portfolio
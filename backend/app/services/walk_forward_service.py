@@ -0,0 +1,197 @@
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple
+import numpy as np
+from ..models.bar_series import BarSeries
+from .indicator_service import IndicatorService
+from .backtest_service import BacktestService
+from .batch_service import BATCH_WORKERS, get_executor, recycle_executor
+from .metrics import timed
+
+WINDOW_MODES = ("rolling", "anchored")
+OBJECTIVES = ("sharpe_ratio", "total_return", "annualized_return", "max_drawdown")
+
+# Only max_drawdown scoring walks every pair's path over every window, about 20ns
+# per (pair x window bar) cell; shipping the return matrix to a worker costs about
+# 30ns per (pair x bar) value plus ~2ms per task. From ~1M cells (e.g. 100 pairs
+# over 10 years of rolling 504/126 windows) the pool wins; compare
+# `bench.py --filter backtest.walk_forward` runs with and without parallel. The
+# prefix-sum objectives cost O(pairs) per window, less than the transfer, so they
+# always run in-process.
+PARALLEL_MIN_CELLS = 1_000_000
+
+
+def _windows(n: int, train_bars: int, test_bars: int, mode: str) -> List[Tuple[int, int, int]]:
+    """(train_start, test_start, test_end) bar indices; train ends where test starts."""
+    windows = []
+    test_start = train_bars
+    while test_start < n:
+        train_start = 0 if mode == "anchored" else test_start - train_bars
+        windows.append((train_start, test_start, min(test_start + test_bars, n)))
+        test_start += test_bars
+    return windows
+
+
+def _prefix_stats(returns: np.ndarray) -> np.ndarray:
+    """(3, pairs, bars) running sums of r, r^2 and log(1 + r), with a leading zero column."""
+    stats = np.zeros((3,) + returns.shape[:1] + (returns.shape[1] + 1,))
+    np.cumsum(returns, axis=1, out=stats[0, :, 1:])
+    np.cumsum(returns * returns, axis=1, out=stats[1, :, 1:])
+    np.cumsum(np.log1p(returns), axis=1, out=stats[2, :, 1:])
+    return stats
+
+
+def _window_metrics(stats: np.ndarray, i: int, j: int, n_bars: int) -> Dict[str, np.ndarray]:
+    """_metrics_matrix minus max drawdown for returns [i, j) of every pair, in O(pairs)."""
+    m = j - i
+    total, squares, log_growth = stats[:, :, j] - stats[:, :, i]
+    total_return = np.expm1(log_growth)
+    mean = total / m
+    variance = np.maximum(squares - total * mean, 0.0) / (m - 1) if m > 1 else np.zeros_like(mean)
+    std_dev = np.sqrt(variance)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe_ratio = np.where(std_dev > 1e-12, mean / std_dev * np.sqrt(252), 0.0)
+        annualized_return = (1 + total_return) ** (252 / n_bars) - 1
+    clean = lambda a: np.where(np.isfinite(a), a, 0.0)
+    return {"total_return": clean(total_return), "annualized_return": clean(annualized_return), "sharpe_ratio": clean(sharpe_ratio)}
+
+
+def _score_windows(returns: np.ndarray, offset: int, windows: List[Tuple[int, int, int]], objective: str) -> List[Dict]:
+    """
+    Pick the best parameter row on each train window and score it on the test window.
+    `returns` is the (pairs, bars - 1) strategy return matrix, starting at bar `offset`;
+    column k is the return from bar k to k + 1. Runs in worker processes.
+    """
+    stats = _prefix_stats(returns) if objective != "max_drawdown" else None
+    out = []
+    for train_start, test_start, test_end in windows:
+        # Bars [a, b) own the returns between consecutive bars inside the range.
+        i, j = train_start - offset, test_start - offset - 1
+        if stats is not None:
+            # Return sums over any window come from the shared prefix sums.
+            best = int(np.argmax(_window_metrics(stats, i, j, test_start - train_start)[objective]))
+        else:
+            # Drawdown needs the path, so every pair's window is walked. A pair that stayed
+            # in cash has no drawdown at all, so only pairs invested in the window compete.
+            drawdown = BacktestService._metrics_matrix(returns[:, i:j], test_start - train_start)[objective]
+            invested = (returns[:, i:j] != 0).any(axis=1)
+            best = int(np.argmax(np.where(invested, drawdown, -np.inf) if invested.any() else drawdown))
+        train = BacktestService._metrics_matrix(returns[best:best + 1, i:j], test_start - train_start)
+        # The test window starts with the return into its first bar, so windows stitch without gaps.
+        test = BacktestService._metrics_matrix(returns[best:best + 1, j:test_end - offset - 1], test_end - test_start + 1)
+        out.append({
+            "best": best,
+            "train": {name: float(values[0]) for name, values in train.items()},
+            "test": {name: float(values[0]) for name, values in test.items()},
+        })
+    return out
+
+
+class WalkForwardService:
+    @staticmethod
+    @timed("backtest.walk_forward")
+    def run_sma_cross(data: BarSeries, short_windows: List[int], long_windows: List[int],
+                      train_bars: int = 504, test_bars: int = 126, mode: str = "rolling",
+                      objective: str = "sharpe_ratio", initial_capital: float = 10000.0,
+                      parallel: bool = True) -> Dict:
+        """
+        Walk-forward SMA cross optimization. Each train window picks the (short, long)
+        pair with the best `objective`; that pair then trades the following test window.
+        Train windows slide ("rolling") or grow from the first bar ("anchored").
+
+        SMAs are trailing, so every window reads the same full-length SMAs and strategy
+        returns, computed once, and train windows are scored from their prefix sums.
+        Large max_drawdown grids are scored in the batch process pool.
+        Returns the stitched out-of-sample equity curve and a per-window report.
+        """
+        if mode not in WINDOW_MODES:
+            raise ValueError(f"Unknown window mode: {mode} (expected one of {', '.join(WINDOW_MODES)})")
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective} (expected one of {', '.join(OBJECTIVES)})")
+        if train_bars < 2 or test_bars < 1:
+            raise ValueError("train_bars must be >= 2 and test_bars >= 1")
+        n = len(data)
+        if n <= train_bars:
+            raise ValueError(f"Not enough data for walk-forward: {n} bars, {train_bars} needed for the first train window")
+        pairs = [(s, l) for s in sorted(set(short_windows)) for l in sorted(set(long_windows)) if 0 < s < l]
+        if not pairs:
+            raise ValueError("No valid (short, long) window pairs")
+
+        sma = IndicatorService.compute(data, [f"SMA_{w}" for w in {w for pair in pairs for w in pair}])
+        with np.errstate(invalid="ignore"):
+            # Long when SMA_short > SMA_long, acting on the next bar (NaN compares False -> cash).
+            position = np.vstack([sma[f"SMA_{s}"][:-1] > sma[f"SMA_{l}"][:-1] for s, l in pairs])
+        returns = (data.close[1:] / data.close[:-1] - 1)[None, :] * position  # (pairs, n - 1)
+
+        windows = _windows(n, train_bars, test_bars, mode)
+        chunks = WalkForwardService._chunks(windows, len(pairs), objective, parallel)
+        if len(chunks) == 1:
+            scored = _score_windows(returns, 0, windows, objective)
+        else:
+            # Each worker gets only the bar columns its windows touch.
+            executor = get_executor()
+            try:
+                futures = [
+                    executor.submit(_score_windows, returns[:, chunk[0][0]:chunk[-1][2] - 1], chunk[0][0], chunk, objective)
+                    for chunk in chunks
+                ]
+                scored = [row for future in futures for row in future.result()]
+            except (BrokenProcessPool, RuntimeError):
+                # The pool was recycled under us (a batch backtest timed out): score here instead.
+                recycle_executor(executor, [])
+                scored = _score_windows(returns, 0, windows, objective)
+
+        first_bar = windows[0][1] - 1
+        oos_returns = np.concatenate([
+            returns[row["best"], test_start - 1:test_end - 1]
+            for (_, test_start, test_end), row in zip(windows, scored)
+        ])
+        equity = initial_capital * np.concatenate([[1.0], np.cumprod(1 + oos_returns)])
+        oos = BacktestService._metrics_matrix(oos_returns[None, :], len(equity))
+        dates = np.datetime_as_string(data.date[first_bar:].view("datetime64[ns]"), unit="D").tolist()
+
+        report = []
+        for i, ((train_start, test_start, test_end), row) in enumerate(zip(windows, scored)):
+            short, long = pairs[row["best"]]
+            report.append({
+                "window": i,
+                "train_start": WalkForwardService._date(data, train_start),
+                "train_end": WalkForwardService._date(data, test_start - 1),
+                "test_start": WalkForwardService._date(data, test_start),
+                "test_end": WalkForwardService._date(data, test_end - 1),
+                "short_window": short,
+                "long_window": long,
+                "train": row["train"],
+                "test": row["test"],
+            })
+
+        in_sample = np.mean([row["train"]["annualized_return"] for row in scored])
+        out_of_sample = float(oos["annualized_return"][0])
+        return {
+            "symbol": data.symbol,
+            "mode": mode,
+            "objective": objective,
+            "pairs_evaluated": len(pairs),
+            "windows": len(windows),
+            "initial_capital": initial_capital,
+            "final_value": float(equity[-1]),
+            **{name: float(values[0]) for name, values in oos.items()},
+            # Out-of-sample over mean in-sample annualized return; well below 1 suggests overfitting.
+            "walk_forward_efficiency": out_of_sample / in_sample if in_sample > 0 else 0.0,
+            "equity_curve": {"date": dates, "equity": equity.tolist()},
+            "report": report,
+        }
+
+    @staticmethod
+    def _chunks(windows: List[Tuple[int, int, int]], n_pairs: int, objective: str, parallel: bool) -> List[List[Tuple[int, int, int]]]:
+        """Split max_drawdown windows into contiguous chunks, one per worker, when the grid is worth it."""
+        if not parallel or BATCH_WORKERS < 2 or objective != "max_drawdown":
+            return [windows]
+        cells = sum(test_end - train_start for train_start, _, test_end in windows) * n_pairs
+        if cells < PARALLEL_MIN_CELLS:
+            return [windows]
+        size = -(-len(windows) // BATCH_WORKERS)
+        return [windows[i:i + size] for i in range(0, len(windows), size)]
+
+    @staticmethod
+    def _date(data: BarSeries, i: int) -> str:
+        return str(data.date[i].astype("datetime64[ns]").astype("datetime64[D]"))
@@ -0,0 +1,369 @@
+"""
+Offline benchmarks for the data -> indicator -> signal -> backtest pipeline,
+the API endpoints and the portfolio database paths.
+
+    python benchmarks/bench.py                      # full run, compared with benchmarks/baseline.json
+    python benchmarks/bench.py --quick              # smaller sizes, for a quick check
+    python benchmarks/bench.py --filter backtest    # only the backtest group ("backtest.sweep": one case)
+    python benchmarks/bench.py --filter startup     # cold import and startup, in fresh interpreters
+    python benchmarks/bench.py --save-baseline      # store this run as the new baseline
+    python benchmarks/bench.py --check              # regression gate: fail without a baseline too
+
+Bars come from the synthetic market (DATA_PROVIDER=mock) and the bar store and
+database live in a scratch directory, so a run needs no network and touches no
+real data. Each run is saved to benchmarks/results/<timestamp>.json. Runs are
+compared on each case's best time, the least noisy statistic. A case more than
+--threshold slower than the baseline (and slower by at least --min-delta seconds,
+to ignore timer noise) is a regression: the run exits with 1.
+Baselines are machine-specific, so none is committed; record one with
+--save-baseline on the machine that runs the comparison. Without a baseline a
+plain run only records its results, while a --check run exits with 2.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRATCH = tempfile.mkdtemp(prefix="stock-bench-")
+
+# Point the app at synthetic data and throwaway storage before anything imports it.
+os.environ.update({
+    "DATA_PROVIDER": "mock",
+    "PRICE_FEED": "fake",
+    "BAR_STORE_DIR": os.path.join(SCRATCH, "bar_store"),
+    "DATABASE_URL": f"sqlite:///{os.path.join(SCRATCH, 'bench.db')}",
+})
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+import pandas as pd
+
+from app.models.bar_series import BarSeries
+from app.models.migrate import upgrade_database
+from app.models.schemas import Trade
+from app.models.db import SessionLocal
+from app.services.backtest_engine import KERNEL, BacktestEngine
+from app.services.backtest_service import BacktestService
+from app.services.cache_service import response_cache
+from app.services.data_service import DataService
+from app.services.indicator_service import IndicatorService
+from app.services.ledger_service import LedgerService
+from app.services.resample_service import resample
+from app.services.signal_service import SignalService
+from app.services.synthetic_market import synthetic_market
+from app.services.valuation_service import ValuationService
+from app.services.walk_forward_service import WalkForwardService
+
+SIZES = {
+    "full": {"bars": [1_000, 10_000, 100_000], "universe": [10, 100, 500]},
+    "quick": {"bars": [1_000, 10_000], "universe": [10, 50]},
+}
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+STRATEGIES = [
+    {"name": "SMA_CROSS", "short_window": 50, "long_window": 200},
+    {"name": "RSI"},
+    {"name": "MACD"},
+]
+
+
+class Runner:
+    """Times cases and collects results. Each case runs once to warm up, then repeats for ~`budget` seconds."""
+
+    def __init__(self, name_filter: Optional[str] = None, budget: float = 1.0, max_repeat: int = 50):
+        self.name_filter = name_filter
+        self.budget = budget
+        self.max_repeat = max_repeat
+        self.results: List[Dict[str, Any]] = []
+
+    def measure(self, name: str, func: Callable[[], Any], **params) -> None:
+        if self.name_filter and self.name_filter not in name:
+            return
+        func()
+        times = [self._time(func)]
+        repeat = int(min(self.max_repeat, max(3, self.budget / max(times[0], 1e-6))))
+        times += [self._time(func) for _ in range(repeat - 1)]
+        result = {
+            "key": f"{name}[{','.join(f'{k}={v}' for k, v in params.items())}]",
+            "name": name, "params": params, "repeat": len(times),
+            "min": min(times), "median": statistics.median(times), "mean": statistics.fmean(times),
+        }
+        self.results.append(result)
+        print(f"{result['key']:<60} {_fmt(result['min']):>10} best {_fmt(result['median']):>10} median  (x{len(times)})", flush=True)
+
+    @staticmethod
+    def _time(func: Callable[[], Any]) -> float:
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+
+def _series(symbol: str, n: int) -> BarSeries:
+    """n synthetic daily bars (calendar days from 2000-01-03, so any length fits)."""
+    bars = synthetic_market.paths([symbol], n)[symbol]
+    dates = (np.datetime64("2000-01-03", "ns") + np.arange(n) * np.timedelta64(1, "D")).astype(np.int64)
+    return BarSeries(dates, bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"], symbol=symbol)
+
+
+def _universe(n: int) -> List[str]:
+    return [f"SYM{i:04d}" for i in range(n)]
+
+
+def bench_data(run: Runner, sizes: Dict[str, List[int]]) -> None:
+    for n in sizes["bars"]:
+        data = _series("DATA", n)
+        # Shaped like a yfinance history frame: capitalized columns, tz-aware index.
+        frame = pd.DataFrame({"Open": data.open, "High": data.high, "Low": data.low, "Close": data.close,
+                              "Volume": data.volume.astype(float)},
+                             index=pd.DatetimeIndex(data.datetimes).tz_localize("America/New_York"))
+        run.measure("data.to_columns", lambda: DataService._to_columns(frame.copy(deep=False)), bars=n)
+        run.measure("data.to_ohlcv", lambda: data.to_ohlcv(), bars=n)
+        minutes = BarSeries(data.date[0] + np.arange(n * 10) * 60_000_000_000, *(np.resize(c, n * 10) for c in
+                            (data.open, data.high, data.low, data.close, data.volume)), interval="1m")
+        run.measure("data.resample_1m_1h", lambda: resample(minutes, "1h"), bars=n * 10)
+
+    for k in sizes["universe"]:
+        batch = iter(range(1_000_000))
+        # Fresh symbols every call: synthetic download plus bar store write.
+        run.measure("data.fetch_many.cold", lambda: DataService.fetch_many([f"C{next(batch)}_{s}" for s in _universe(k)], "10y"), universe=k)
+        symbols = _universe(k)
+        DataService.fetch_many(symbols, "10y")
+        run.measure("data.fetch_many.warm", lambda: DataService.fetch_many(symbols, "10y"), universe=k)
+        run.measure("data.fetch_many.warm_1wk", lambda: DataService.fetch_many(symbols, "10y", "1wk"), universe=k)
+
+
+def bench_indicators(run: Runner, sizes: Dict[str, List[int]]) -> None:
+    every = IndicatorService.available()
+    for n in sizes["bars"]:
+        data = _series("IND", n)
+        run.measure("indicators.chart", lambda: IndicatorService.compute(data, ["SMA_20", "SMA_50", "RSI"]), bars=n)
+        run.measure("indicators.all", lambda: IndicatorService.compute(data, every), bars=n)
+
+
+def bench_signals(run: Runner, sizes: Dict[str, List[int]]) -> None:
+    for n in sizes["bars"]:
+        data = [_series("SIG", n)]
+        run.measure("signals.scan", lambda: SignalService.scan(data, STRATEGIES), bars=n, universe=1)
+    for k in sizes["universe"]:
+        series = [_series(s, 2520) for s in _universe(k)]
+        run.measure("signals.scan", lambda: SignalService.scan(series, STRATEGIES), bars=2520, universe=k)
+
+
+def bench_backtest(run: Runner, sizes: Dict[str, List[int]]) -> None:
+    for n in sizes["bars"]:
+        data = _series("BT", n)
+        run.measure("backtest.sma_cross", lambda: BacktestService.run_sma_cross_backtest(data), bars=n)
+        run.measure("backtest.sweep", lambda: BacktestService.run_sma_cross_sweep(data, [10, 20, 30, 40, 50], [100, 150, 200]), bars=n)
+        if n > 504:
+            run.measure("backtest.walk_forward", lambda: WalkForwardService.run_sma_cross(
+                data, [10, 20, 30, 40, 50], [100, 150, 200], parallel=False), bars=n)
+            for parallel in (False, True):
+                run.measure("backtest.walk_forward.max_drawdown", lambda: WalkForwardService.run_sma_cross(
+                    data, [10, 20, 30, 40, 50], [100, 150, 200], objective="max_drawdown", parallel=parallel),
+                    bars=n, parallel=parallel)
+    for k in sizes["universe"]:
+        series = {s: _series(s, 2520) for s in _universe(k)}
+        run.measure("backtest.engine.sma_cross", lambda: BacktestEngine.run(series, {"name": "SMA_CROSS"}, include_trades=False),
+                    bars=2520, universe=k)
+        run.measure("backtest.engine.momentum", lambda: BacktestEngine.run(series, {"name": "MOMENTUM"}, rebalance="monthly",
+                                                                           include_trades=False), bars=2520, universe=k)
+
+
+def bench_api(run: Runner, sizes: Dict[str, List[int]]) -> None:
+    from fastapi.testclient import TestClient
+    from main import app
+
+    # No lifespan: the scheduler and stream hub stay off.
+    client = TestClient(app)
+
+    def get(path: str, **kwargs) -> Callable[[], None]:
+        def call():
+            response_cache.clear()  # Measure rendering, not the response cache
+            response = client.get(path, **kwargs)
+            assert response.status_code == 200, (path, response.status_code, response.text[:200])
+        return call
+
+    def post(path: str, **kwargs) -> Callable[[], None]:
+        def call():
+            response_cache.clear()
+            response = client.post(path, **kwargs)
+            assert response.status_code == 200, (path, response.status_code, response.text[:200])
+        return call
+
+    DataService.fetch_history("AAPL", "10y")  # Bars stored up front; requests measure the warm path
+    for period in ("1y", "10y"):
+        for fmt in ("json", "columnar", "msgpack"):
+            run.measure("api.data", get(f"/api/data/AAPL?period={period}&format={fmt}"), period=period, format=fmt)
+    run.measure("api.data", get("/api/data/AAPL?period=10y&interval=1wk&format=json"), period="10y", format="json", interval="1wk")
+    run.measure("api.backtest", post("/api/backtest?symbol=AAPL"))
+    run.measure("api.search", get("/api/search?query=A"))
+    for k in sizes["universe"]:
+        symbols = _universe(k)
+        DataService.fetch_many(symbols, "10y")
+        run.measure("api.signals", post("/api/signals", json={"symbols": symbols, "strategies": STRATEGIES}), universe=k)
+        run.measure("api.backtest_portfolio", post("/api/backtest/portfolio", json={
+            "symbols": symbols, "strategy": {"name": "MOMENTUM"}, "rebalance": "monthly", "include_trades": False,
+        }), universe=k)
+    run.measure("api.portfolio", get("/api/portfolio"))
+
+
+def bench_portfolio(run: Runner, sizes: Dict[str, List[int]]) -> None:
+    start = datetime(2024, 1, 2)
+    minutes = itertools.count()
+
+    def trades(n: int) -> List[Trade]:
+        # Later than everything recorded so far (nothing is backdated), and small
+        # enough that cash never runs out however many batches are recorded.
+        return [Trade(date=start + timedelta(minutes=next(minutes)), symbol=f"P{i % 20}", trade_type="BUY", price=1.0, quantity=1)
+                for i in range(n)]
+
+    # Rebuild first, over a ledger of known size; the record cases below keep adding to it.
+    with SessionLocal() as db:
+        LedgerService(db).record(trades(5000))
+
+    def rebuild():
+        with SessionLocal() as db:
+            LedgerService(db).rebuild()
+
+    run.measure("portfolio.rebuild", rebuild, trades=5000)
+
+    for n in (100, 1000):
+        def record():
+            with SessionLocal() as db:
+                LedgerService(db).record(trades(n))
+        run.measure("portfolio.record", record, trades=n)
+
+    def value():
+        with SessionLocal() as db:
+            ValuationService(db).value()
+
+    run.measure("portfolio.value", value, positions=20)
+
+
+def bench_startup(run: Runner, sizes: Dict[str, List[int]]) -> None:
+    # Fresh interpreters, so nothing is imported or warmed up yet. Compare with STARTUP_BUDGET in main.py.
+    backend = os.path.dirname(BENCH_DIR)
+
+    def python(code: str) -> Callable[[], None]:
+        def call():
+            subprocess.run([sys.executable, "-c", code], cwd=backend, check=True,
+                           env={**os.environ, "SCHEDULER_MODE": "off"})
+        return call
+
+    run.measure("startup.import", python("import main"))
+    run.measure("startup.lifespan", python("from fastapi.testclient import TestClient; import main\n"
+                                           "with TestClient(main.app): pass"))
+
+
+GROUPS = {
+    "data": bench_data,
+    "indicators": bench_indicators,
+    "signals": bench_signals,
+    "backtest": bench_backtest,
+    "api": bench_api,
+    "portfolio": bench_portfolio,
+    "startup": bench_startup,
+}
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float, min_delta: float) -> List[Dict]:
+    """Print each case against the baseline and return the regressions."""
+    previous = {r["key"]: r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'case':<60} {'baseline':>10} {'now':>10} {'change':>8}")
+    for result in results:
+        base = previous.get(result["key"])
+        if base is None:
+            print(f"{result['key']:<60} {'-':>10} {_fmt(result['min']):>10} {'new':>8}")
+            continue
+        change = result["min"] / base["min"] - 1
+        regressed = change > threshold and result["min"] - base["min"] > min_delta
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{result['key']:<60} {_fmt(base['min']):>10} {_fmt(result['min']):>10} {change:>+8.1%}{flag}")
+        if regressed:
+            regressions.append({**result, "baseline": base["min"], "change": change})
+    return regressions
+
+
+def _fmt(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+def _meta(mode: str) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "mode": mode,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "backtest_kernel": KERNEL,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="smaller series and universes")
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds of repeats per case (default 1.0)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run to --baseline")
+    parser.add_argument("--check", action="store_true", help="fail (exit 2) when there is no baseline to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression (default 0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.0005, help="ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    mode = "quick" if args.quick else "full"
+    upgrade_database()
+    run = Runner(args.filter, budget=args.budget)
+    # "--filter backtest" or "--filter backtest.sweep" only sets up that group; other filters run every group.
+    only = args.filter.split(".")[0] if args.filter and args.filter.split(".")[0] in GROUPS else None
+    for group, bench in GROUPS.items():
+        if only is None or group == only:
+            bench(run, SIZES[mode])
+
+    report = {"meta": _meta(mode), "results": run.results}
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults: {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline to compare with at {args.baseline} (run with --save-baseline to create one)")
+        return 2 if args.check else 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("mode") != mode:
+        print(f"{'error' if args.check else 'warning'}: baseline is a {baseline['meta'].get('mode')} run, this is a {mode} run")
+        if args.check:
+            return 2
+    regressions = compare(run.results, baseline, args.threshold, args.min_delta)
+    print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,7 +11,7 @@ try:
     data = DataService.fetch_history("AAPL")
     if data:
         print(f"SUCCESS: Fetched {len(data)} records for AAPL")
-        print(f"First record: {data[0]}")
+        print(f"First record: {data[:1].to_ohlcv()[0]}")
     else:
         print("FAILURE: Returned empty list for AAPL")
 except Exception as e:
@@ -1,13 +1,54 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api import routes
-from app.models import sql_models
-from app.models.db import engine
+from app.models.migrate import upgrade_database
+from app.services.scheduler_service import start_scheduler, stop_scheduler
+from app.services.batch_service import shutdown_executor
+from app.services.stream_service import stream_hub
+from app.services.cache_service import response_cache
+from app.services.resample_service import resample_cache
+from app.services.valuation_service import quote_cache
+from app.services.host_lock import hold_lock
+from app.services.metrics import (HTTP_REQUEST_DURATION, PROFILING_ENABLED, StackSampler, end_request,
+                                  registry, server_timing, track_request)
+
+logger = logging.getLogger(__name__)
+
+# Apply schema migrations at startup. Set to 0 when they run as a separate deploy
+# step (`alembic upgrade head`).
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") == "1"
+# Seconds importing the app plus the startup handler may take before a warning is logged.
+STARTUP_BUDGET = float(os.getenv("STARTUP_BUDGET", 2.0))
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+startup_seconds = None
 
-# Create Tables
-sql_models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global startup_seconds
+    started = time.perf_counter()
+    if MIGRATE_ON_STARTUP:
+        # Workers start together: the first migrates, the rest wait and find nothing to do.
+        with hold_lock("migrations"):
+            upgrade_database()
+    start_scheduler()
+    startup_seconds = time.perf_counter() - started
+    total = IMPORT_SECONDS + startup_seconds
+    log = logger.warning if total > STARTUP_BUDGET else logger.info
+    log(f"Started in {total:.2f}s (imports {IMPORT_SECONDS:.2f}s, startup {startup_seconds:.2f}s, budget {STARTUP_BUDGET:.2f}s)")
+    yield
+    stream_hub.stop()
+    stop_scheduler()
+    shutdown_executor()
 
-app = FastAPI(title="Stock Market Data Analyzer")
+app = FastAPI(title="Stock Market Data Analyzer", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -20,11 +61,63 @@ app.add_middleware(
 
 app.include_router(routes.router, prefix="/api")
 
-from app.services.scheduler_service import start_scheduler
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    """
+    Record request latency by route template and report per-stage time in a
+    Server-Timing header. With PROFILING=1, ?profile=1 (or X-Profile: 1) returns
+    the request's folded-stack profile instead of its response.
+    """
+    profile = PROFILING_ENABLED and "1" in (request.query_params.get("profile"), request.headers.get("x-profile"))
+    sampler = StackSampler().start() if profile else None
+    stages, token = track_request()
+    started = time.perf_counter()
+    status = 500  # Unless call_next returns: an unhandled error becomes a 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        end_request(token)
+        folded = sampler.stop() if sampler else None
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(elapsed, method=request.method,
+                                      route=getattr(route, "path", "unmatched"), status=status)
+    if folded is not None:
+        return PlainTextResponse(folded, headers={"X-Profile-Format": "folded", "Server-Timing": server_timing(stages, elapsed)})
+    response.headers["Server-Timing"] = server_timing(stages, elapsed)
+    return response
 
-@app.on_event("startup")
-def on_startup():
-    start_scheduler()
+@registry.collector
+def cache_metrics():
+    cache = response_cache.stats()
+    resampled = resample_cache.stats()
+    streams = stream_hub.stats()
+    return [
+        ("response_cache_lookups_total", "counter", "Response cache lookups by result",
+         {"result": result}, cache[result]) for result in ("hits", "stale_hits", "misses")
+    ] + [
+        ("response_cache_hit_ratio", "gauge", "Share of response cache lookups served from the cache", {}, cache["hit_ratio"]),
+        ("response_cache_entries", "gauge", "Entries in the response cache", {}, cache["entries"]),
+        ("response_cache_evictions_total", "counter", "Entries evicted from the response cache", {}, cache["evictions"]),
+        ("resample_cache_lookups_total", "counter", "Resample cache lookups by result", {"result": "hits"}, resampled["hits"]),
+        ("resample_cache_lookups_total", "counter", "Resample cache lookups by result", {"result": "misses"}, resampled["misses"]),
+        ("resample_cache_entries", "gauge", "Series in the resample cache", {}, resampled["entries"]),
+        ("quote_cache_fetches_total", "counter", "Batched quote refreshes", {}, quote_cache.fetches),
+        ("stream_clients", "gauge", "Connected streaming clients", {}, streams["clients"]),
+    ]
+
+@registry.collector
+def startup_metrics():
+    samples = [("app_import_seconds", "gauge", "Time to import the application", {}, IMPORT_SECONDS)]
+    if startup_seconds is not None:
+        samples.append(("app_startup_seconds", "gauge", "Time spent in the startup handler", {}, startup_seconds))
+    return samples
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 def read_root():
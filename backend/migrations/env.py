@@ -0,0 +1,43 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.models import sql_models  # noqa: F401 - registers the tables on Base.metadata
+from app.models.db import Base, engine, make_engine
+
+config = context.config
+
+# Only configure logging when run from the alembic CLI; in-process upgrades
+# (app/models/migrate.py) keep the application's logging setup.
+if config.config_file_name is not None and not config.attributes.get("embedded"):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url") or str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    url = config.get_main_option("sqlalchemy.url")
+    connectable = make_engine(url) if url else engine
+    with connectable.connect() as connection:
+        # Batch mode lets ALTERs work on SQLite, which rebuilds tables for them.
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,128 @@
+"""Initial schema
+
+Databases created before migrations existed (by create_all at startup) already
+have some or all of these tables; only the missing ones are created, so
+upgrading such a database is safe without stamping it first.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_table(existing, name, *columns, indexes=(), unique_indexes=()):
+    if name in existing:
+        return
+    op.create_table(name, *columns)
+    for column in indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column])
+    for column in unique_indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column], unique=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    _create_table(
+        existing, "trades",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("date", sa.DateTime()),
+        sa.Column("symbol", sa.String()),
+        sa.Column("trade_type", sa.String()),
+        sa.Column("price", sa.Float()),
+        sa.Column("quantity", sa.Integer()),
+        sa.Column("pnl", sa.Float()),
+        indexes=("id", "symbol"),
+    )
+    _create_table(
+        existing, "holdings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("symbol", sa.String()),
+        sa.Column("quantity", sa.Integer()),
+        indexes=("id",), unique_indexes=("symbol",),
+    )
+    _create_table(
+        existing, "portfolio_snapshots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("date", sa.DateTime()),
+        sa.Column("cash", sa.Float()),
+        sa.Column("total_value", sa.Float()),
+        indexes=("id",),
+    )
+    _create_table(
+        existing, "lots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("symbol", sa.String()),
+        sa.Column("date", sa.DateTime()),
+        sa.Column("price", sa.Float()),
+        sa.Column("quantity", sa.Integer()),
+        indexes=("id", "symbol"),
+    )
+    _create_table(
+        existing, "cash_ledger",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("date", sa.DateTime()),
+        sa.Column("kind", sa.String()),
+        sa.Column("amount", sa.Float()),
+        sa.Column("trade_id", sa.Integer(), sa.ForeignKey("trades.id"), nullable=True),
+        sa.Column("description", sa.String()),
+        indexes=("id", "date", "trade_id"),
+    )
+    _create_table(
+        existing, "watchlists",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        indexes=("id",), unique_indexes=("name",),
+    )
+    _create_table(
+        existing, "watchlist_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("watchlist_id", sa.Integer(), sa.ForeignKey("watchlists.id")),
+        sa.Column("symbol", sa.String()),
+        sa.UniqueConstraint("watchlist_id", "symbol"),
+        indexes=("id", "watchlist_id", "symbol"),
+    )
+    _create_table(
+        existing, "alert_rules",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("watchlist_id", sa.Integer(), sa.ForeignKey("watchlists.id"), nullable=True),
+        sa.Column("symbol", sa.String(), nullable=True),
+        sa.Column("indicator", sa.String()),
+        sa.Column("operator", sa.String()),
+        sa.Column("threshold", sa.Float(), nullable=True),
+        sa.Column("compare_to", sa.String(), nullable=True),
+        sa.Column("enabled", sa.Boolean()),
+        indexes=("id",),
+    )
+    _create_table(
+        existing, "alerts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("rule_id", sa.Integer(), sa.ForeignKey("alert_rules.id")),
+        sa.Column("symbol", sa.String()),
+        sa.Column("bar_date", sa.DateTime()),
+        sa.Column("value", sa.Float()),
+        sa.Column("message", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.UniqueConstraint("rule_id", "symbol", "bar_date"),
+        indexes=("id", "rule_id", "symbol", "created_at"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ("alerts", "alert_rules", "watchlist_items", "watchlists", "cash_ledger",
+                 "lots", "portfolio_snapshots", "holdings", "trades"):
+        op.drop_table(name)
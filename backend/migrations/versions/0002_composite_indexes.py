@@ -0,0 +1,36 @@
+"""Composite index on trades (symbol, date) and index on portfolio_snapshots (date)
+
+Ledger replays and per-symbol history read trades by symbol in date order;
+the latest snapshot is looked up by date.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if "ix_trades_symbol_date" not in {i["name"] for i in inspector.get_indexes("trades")}:
+        op.create_index("ix_trades_symbol_date", "trades", ["symbol", "date"])
+    if "ix_portfolio_snapshots_date" not in {i["name"] for i in inspector.get_indexes("portfolio_snapshots")}:
+        op.create_index("ix_portfolio_snapshots_date", "portfolio_snapshots", ["date"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_portfolio_snapshots_date", table_name="portfolio_snapshots")
+    op.drop_index("ix_trades_symbol_date", table_name="trades")
@@ -0,0 +1,44 @@
+"""
+Shared setup: the app runs on synthetic data (DATA_PROVIDER=mock, PRICE_FEED=fake)
+with its bar store, database and alert state in a scratch directory, so tests need
+no network and never touch real data. Run from backend/: python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+SCRATCH = tempfile.mkdtemp(prefix="stock-tests-")
+
+# Set before anything imports the app: these are read at import time.
+os.environ.update({
+    "DATA_PROVIDER": "mock",
+    "PRICE_FEED": "fake",
+    "SCHEDULER_MODE": "off",
+    "BAR_STORE_DIR": os.path.join(SCRATCH, "bar_store"),
+    "INDICATOR_STATE_PATH": os.path.join(SCRATCH, "indicator_state.json"),
+    "LOCK_DIR": SCRATCH,
+    "DATABASE_URL": os.environ.get("TEST_SQLITE_URL", f"sqlite:///{os.path.join(SCRATCH, 'test.db')}"),
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from app.models.bar_series import BarSeries
+
+
+def make_series(closes, start: str = "2024-01-01", symbol: str = "TEST", opens=None) -> BarSeries:
+    """Daily bars on consecutive calendar days from `start`, with the given closes."""
+    close = np.asarray(closes, dtype=np.float64)
+    dates = (np.datetime64(start, "ns") + np.arange(len(close)) * np.timedelta64(1, "D")).astype(np.int64)
+    open_ = close if opens is None else np.asarray(opens, dtype=np.float64)
+    return BarSeries(dates, open_, np.maximum(open_, close) * 1.01, np.minimum(open_, close) * 0.99, close,
+                     np.full(len(close), 1000.0), symbol=symbol)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """The scratch database, migrated to the latest revision."""
+    from app.models.migrate import upgrade_database
+    upgrade_database()
+    return os.environ["DATABASE_URL"]
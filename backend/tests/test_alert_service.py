@@ -0,0 +1,85 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from app.models.bar_series import BarSeries
+from app.models.db import SessionLocal
+from app.models.schemas import AlertRule
+from app.services.alert_service import AlertEngine, AlertService
+from app.services.indicator_service import IndicatorService
+from conftest import make_series
+
+SPECS = ["EMA_20", "RSI_14", "SMA_20"]
+
+
+def _forming(data: BarSeries, close: float) -> BarSeries:
+    """`data` with its last bar caught mid-session at `close`."""
+    closes = data.close.copy()
+    closes[-1] = close
+    return BarSeries(data.date, data.open, np.maximum(data.high, close), np.minimum(data.low, close), closes,
+                     data.volume, symbol=data.symbol)
+
+
+def _batch_last(data: BarSeries) -> dict:
+    return {key: values[-1] for key, values in IndicatorService.compute(data, SPECS).items()}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = AlertEngine(state_path=str(tmp_path / "state.json"))
+    engine.states = {}
+    return engine
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(7)
+    return make_series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 120))))
+
+
+def test_forming_bar_is_not_saved_into_the_state(engine, history):
+    day = history[:100]
+    for close in (day.close[-1] * 0.9, day.close[-1] * 1.1, day.close[-1]):
+        engine._advance("TEST", _forming(day, close), SPECS)
+    assert engine.states["TEST"].last_date == int(day.date[-2])
+
+    # The next session starts: the finished bar is applied with its final close.
+    engine._advance("TEST", _forming(history[:101], 1.0), SPECS)
+    state = engine.states["TEST"].values()
+    for key, value in _batch_last(day).items():
+        assert state[key] == pytest.approx(value, rel=1e-9)
+
+
+def test_current_values_follow_the_forming_bar(engine, history):
+    day = history[:100]
+    for close in (day.close[-1] * 0.9, day.close[-1] * 1.1):
+        forming = _forming(day, close)
+        bar_date = engine._advance("TEST", forming, SPECS)
+        assert bar_date == int(day.date[-1])
+        current = engine.current["TEST"]
+        assert current["close"] == close
+        for key, value in _batch_last(forming).items():
+            assert current[key] == pytest.approx(value, rel=1e-9)
+        for key, value in _batch_last(day[:-1]).items():
+            assert engine.previous["TEST"][key] == pytest.approx(value, rel=1e-9)
+
+
+def test_state_that_took_a_forming_bar_is_rebuilt(engine, history):
+    # A state file written before forming bars were kept out of it.
+    engine._advance("TEST", history[:101], SPECS)
+    engine.states["TEST"].update_many(history[:101])
+    engine._advance("TEST", history[:101], SPECS)
+    for key, value in _batch_last(history[:100]).items():
+        assert engine.states["TEST"].values()[key] == pytest.approx(value, rel=1e-9)
+
+
+def test_create_rule_stores_and_returns_the_rule(database):
+    with SessionLocal() as db, warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        created = AlertService(db).create_rule(AlertRule(symbol="aapl", indicator="RSI_14", operator="<", threshold=30))
+        assert created.id is not None and created.symbol == "AAPL"
+        assert created.model_dump(exclude={"id"}) == {
+            "watchlist_id": None, "symbol": "AAPL", "indicator": "RSI_14", "operator": "<",
+            "threshold": 30.0, "compare_to": None, "enabled": True}
+        assert any(r.id == created.id for r in AlertService(db).list_rules())
@@ -0,0 +1,35 @@
+import numpy as np
+
+from app.models.bar_series import BarSeries
+from app.services.backtest_engine import BacktestEngine, _rebalance_mask
+
+
+def _weekdays(start: str, end: str) -> np.ndarray:
+    days = np.arange(np.datetime64(start), np.datetime64(end))
+    return days[np.is_busday(days)].astype("datetime64[ns]").astype(np.int64)
+
+
+def _series(dates: np.ndarray, closes: np.ndarray, symbol: str) -> BarSeries:
+    return BarSeries(dates, closes, closes, closes, closes, np.full(len(dates), 1000.0), symbol=symbol)
+
+
+def test_weekly_rebalance_flags_the_last_bar_of_each_monday_week():
+    dates = _weekdays("2024-01-01", "2024-01-20")  # Mon 1 Jan .. Fri 19 Jan
+    mask = _rebalance_mask(dates, np.ones((len(dates), 1)), "weekly")[:, 0]
+    flagged = np.datetime_as_string(dates[mask].view("datetime64[ns]"), unit="D").tolist()
+    assert flagged == ["2024-01-05", "2024-01-12", "2024-01-19"]
+
+
+def test_weekly_rebalance_trades_on_mondays():
+    dates = _weekdays("2024-01-01", "2024-01-20")
+    steps = np.arange(len(dates))
+    series = {"A": _series(dates, 100 * 1.01 ** steps, "A"), "B": _series(dates, 100 * 0.99 ** steps, "B")}
+    result = BacktestEngine.run(series, {"name": "EQUAL_WEIGHT"}, rebalance="weekly")
+    assert sorted({t["date"] for t in result["trades"]}) == ["2024-01-08", "2024-01-15"]
+
+
+def test_monthly_rebalance_flags_month_ends():
+    dates = _weekdays("2024-01-25", "2024-03-05")
+    mask = _rebalance_mask(dates, np.ones((len(dates), 1)), "monthly")[:, 0]
+    flagged = np.datetime_as_string(dates[mask].view("datetime64[ns]"), unit="D").tolist()
+    assert flagged == ["2024-01-31", "2024-02-29", "2024-03-04"]
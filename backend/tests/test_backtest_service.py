@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from app.models.bar_series import BarSeries
+from app.services.backtest_service import BacktestService
+from app.services.synthetic_market import synthetic_market
+
+METRICS = ("final_value", "total_return", "annualized_return", "sharpe_ratio", "max_drawdown")
+
+
+def test_sweep_matches_single_backtests():
+    bars = synthetic_market.paths(["SWEEP"], 600)["SWEEP"]
+    dates = (np.datetime64("2020-01-01", "ns") + np.arange(600) * np.timedelta64(1, "D")).astype(np.int64)
+    data = BarSeries(dates, bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"], symbol="SWEEP")
+    rows = BacktestService.run_sma_cross_sweep(data, [5, 20, 50], [20, 100, 200])
+    # Pairs with short >= long are skipped.
+    assert {(r["short_window"], r["long_window"]) for r in rows} == {
+        (5, 20), (5, 100), (5, 200), (20, 100), (20, 200), (50, 100), (50, 200)}
+    assert [r["sharpe_ratio"] for r in rows] == sorted((r["sharpe_ratio"] for r in rows), reverse=True)
+    for row in rows:
+        single = BacktestService.run_sma_cross_backtest(data, short_window=row["short_window"], long_window=row["long_window"])
+        for metric in METRICS:
+            assert row[metric] == pytest.approx(single[metric], rel=1e-9, abs=1e-12), (row["short_window"], row["long_window"], metric)
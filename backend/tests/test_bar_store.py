@@ -0,0 +1,77 @@
+import os
+import threading
+
+import numpy as np
+
+from app.services.bar_store import COLUMNS, BarStore
+
+
+def _columns(n: int, start: int = 0) -> dict:
+    date = (np.arange(start, start + n) * 86_400_000_000_000).astype(np.int64)
+    price = np.arange(start, start + n, dtype=np.float64) + 100
+    return {"date": date, "open": price, "high": price, "low": price, "close": price, "volume": np.ones(n, np.int64)}
+
+
+def _generations(directory: str) -> set:
+    return {name.split(".", 1)[0] for name in os.listdir(directory) if name.endswith(".npy")}
+
+
+def test_write_keeps_the_replaced_generation_for_readers(tmp_path):
+    store = BarStore(str(tmp_path))
+    with store.lock("AAPL", "1d"):
+        store.write("AAPL", "1d", _columns(5), fetched_at=1.0)
+    first = store.meta("AAPL", "1d")["files"]
+    with store.lock("AAPL", "1d"):
+        store.append("AAPL", "1d", _columns(3, start=5), fetched_at=2.0)
+    second = store.meta("AAPL", "1d")["files"]
+    directory = os.path.join(str(tmp_path), "AAPL", "1d")
+    # A reader that read meta.json just before the append can still open the first generation.
+    assert _generations(directory) == {first, second}
+    assert np.load(os.path.join(directory, f"{first}.close.npy")).tolist() == _columns(5)["close"].tolist()
+
+    with store.lock("AAPL", "1d"):
+        store.append("AAPL", "1d", _columns(1, start=8))
+    assert first not in _generations(directory)
+    loaded = store.load("AAPL", "1d")
+    assert loaded["date"].tolist() == _columns(9)["date"].tolist()
+    assert store.meta("AAPL", "1d")["fetched_at"] == 2.0
+
+
+def test_load_follows_meta_to_a_newer_generation(tmp_path):
+    store = BarStore(str(tmp_path))
+    for n in (3, 4, 5):
+        with store.lock("MSFT", "1d"):
+            store.write("MSFT", "1d", _columns(n))
+    meta = store.meta("MSFT", "1d")
+    stale = {**meta, "files": "1-gone"}
+    original = store.meta
+    calls = []
+
+    def meta_once_stale(symbol, interval):
+        calls.append(1)
+        return stale if len(calls) == 1 else original(symbol, interval)
+
+    store.meta = meta_once_stale
+    assert len(store.load("MSFT", "1d")["date"]) == 5
+
+
+def test_concurrent_writers_never_leave_the_key_unreadable(tmp_path):
+    stores = [BarStore(str(tmp_path)) for _ in range(4)]  # Separate instances, as in separate processes
+    failures = []
+
+    def writer(store, offset):
+        for i in range(25):
+            with store.lock("TCS.NS", "1d"):
+                store.write("TCS.NS", "1d", _columns(10 + i, start=offset))
+            if store.load("TCS.NS", "1d") is None:
+                failures.append(i)
+
+    threads = [threading.Thread(target=writer, args=(store, k)) for k, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+    meta = stores[0].meta("TCS.NS", "1d")
+    assert meta["generation"] == 100
+    assert all(len(stores[0].load("TCS.NS", "1d")[col]) == meta["rows"] for col in COLUMNS)
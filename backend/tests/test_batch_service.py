@@ -0,0 +1,31 @@
+import time
+
+from app.services import batch_service
+from app.services.batch_service import BatchBacktestService, run_tasks
+
+
+def test_backtests_run_in_spawned_workers():
+    results = {r["symbol"]: r for r in BatchBacktestService.run(["AAPL", "MSFT"], period="1y", timeout=60)}
+    assert set(results) == {"AAPL", "MSFT"}
+    assert all("error" not in r and r["bars"] > 200 for r in results.values())
+    assert batch_service.get_executor()._mp_context.get_start_method() == "spawn"
+
+
+def test_a_hung_task_is_killed_and_queued_tasks_still_run():
+    # More tasks than workers: the quick ones queue behind the hung one, and the
+    # time they spend queued does not count against their own timeout.
+    quick = [(f"quick{i}", time.sleep, (0.05,)) for i in range(batch_service.BATCH_WORKERS + 2)]
+    tasks = [(f"hung{i}", time.sleep, (60,)) for i in range(batch_service.BATCH_WORKERS)] + quick
+    started = time.monotonic()
+    results = {key: error for key, _, error in run_tasks(tasks, timeout=1.0, max_in_flight=len(tasks))}
+    assert time.monotonic() - started < 30
+    assert all(results[f"hung{i}"] == "Timed out after 1s" for i in range(batch_service.BATCH_WORKERS))
+    assert all(results[key] is None for key, _, _ in quick)
+    # The pool that ran the hung tasks was replaced; the new one works.
+    assert list(run_tasks([("after", abs, (-1,))], timeout=5)) == [("after", 1, None)]
+
+
+def test_task_errors_are_reported_per_task():
+    results = {key: (result, error) for key, result, error in run_tasks([("ok", abs, (-2,)), ("bad", abs, ("x",))], timeout=10)}
+    assert results["ok"] == (2, None)
+    assert results["bad"][0] is None and "bad operand" in results["bad"][1]
@@ -0,0 +1,121 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import cache_service
+from app.services.cache_service import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only the cache's clock: the event loop keeps the real one.
+    fake = Clock()
+    monkeypatch.setattr(cache_service, "time", SimpleNamespace(monotonic=fake))
+    return fake
+
+
+def _counter():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    return compute, calls
+
+
+def test_fresh_then_expired(clock):
+    cache = ResponseCache(stale_factor=0.0)
+    compute, calls = _counter()
+
+    async def scenario():
+        assert await cache.get_or_compute("k", 10, compute) == 1
+        clock.now += 9.9
+        assert await cache.get_or_compute("k", 10, compute) == 1
+        clock.now += 0.1
+        assert await cache.get_or_compute("k", 10, compute) == 2
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    assert cache.stats()["hit_ratio"] == pytest.approx(1 / 3)
+
+
+def test_stale_value_is_served_while_it_revalidates(clock):
+    cache = ResponseCache(stale_factor=1.0)
+    compute, calls = _counter()
+
+    async def scenario():
+        await cache.get_or_compute("k", 10, compute)
+        clock.now += 15  # Past the TTL, inside the stale window
+        assert await cache.get_or_compute("k", 10, compute) == 1
+        assert await cache.get_or_compute("k", 10, compute) == 1  # Refresh already running
+        await asyncio.sleep(0)
+        await asyncio.gather(*cache._background)
+        assert await cache.get_or_compute("k", 10, compute) == 2  # Refreshed value, fresh again
+        clock.now += 25  # Beyond ttl * (1 + stale_factor): a plain miss
+        assert await cache.get_or_compute("k", 10, compute) == 3
+
+    asyncio.run(scenario())
+    counters = cache.stats()
+    assert counters["stale_hits"] == 2 and counters["refreshes"] == 1
+    assert counters["hits"] == 1 and counters["misses"] == 2 and len(calls) == 3
+
+
+def test_failed_refresh_keeps_the_stale_value(clock):
+    cache = ResponseCache(stale_factor=1.0)
+
+    async def failing():
+        raise RuntimeError("provider down")
+
+    async def scenario():
+        cache.set("k", "old", 10)
+        clock.now += 15
+        assert await cache.get_or_compute("k", 10, failing) == "old"
+        await asyncio.gather(*cache._background, return_exceptions=True)
+        assert await cache.get_or_compute("k", 10, failing) == "old"
+
+    asyncio.run(scenario())
+    assert cache.stats()["errors"] >= 1
+
+
+def test_concurrent_misses_share_one_computation(clock):
+    cache = ResponseCache()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", 10, slow) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert len(calls) == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+    compute, _ = _counter()
+
+    async def scenario():
+        cache.set("a", "A", 10)
+        cache.set("b", "B", 10)
+        assert await cache.get_or_compute("a", 10, compute) == "A"  # "b" is now least recent
+        cache.set("c", "C", 10)
+
+    asyncio.run(scenario())
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+    cache.invalidate("a")
+    assert list(cache._entries) == ["c"]
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.bar_series import BarSeries
+from app.services.indicator_service import IndicatorService, parse_spec
+from app.services.synthetic_market import synthetic_market
+
+
+@pytest.fixture(scope="module")
+def data() -> BarSeries:
+    bars = synthetic_market.paths(["IND"], 300)["IND"]
+    dates = (np.datetime64("2020-01-01", "ns") + np.arange(300) * np.timedelta64(1, "D")).astype(np.int64)
+    return BarSeries(dates, bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"], symbol="IND")
+
+
+@pytest.fixture(scope="module")
+def frame(data) -> pd.DataFrame:
+    return pd.DataFrame({"high": data.high, "low": data.low, "close": data.close, "volume": data.volume.astype(float)})
+
+
+def _wilder(values: pd.Series, window: int, start: int) -> np.ndarray:
+    """Wilder's smoothing as published: a simple mean of the first `window` values, then recursive."""
+    out = np.full(len(values), np.nan)
+    seed = start + window - 1
+    out[seed] = values.iloc[start:seed + 1].mean()
+    for i in range(seed + 1, len(values)):
+        out[i] = out[i - 1] + (values.iloc[i] - out[i - 1]) / window
+    return out
+
+
+def _check(actual: np.ndarray, expected) -> None:
+    np.testing.assert_allclose(actual, np.asarray(expected, dtype=float), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_parse_spec():
+    assert parse_spec("sma") == ("SMA", (20,))
+    assert parse_spec("SMA_50") == ("SMA", (50,))
+    assert parse_spec("bb_20_2.5") == ("BB", (20, 2.5))
+    assert parse_spec("MACD") == ("MACD", (12, 26, 9))
+    with pytest.raises(ValueError, match="Unknown indicator"):
+        parse_spec("FOO_10")
+    with pytest.raises(ValueError):
+        parse_spec("SMA_x")
+
+
+def test_output_names(data):
+    out = IndicatorService.compute(data, ["SMA_5", "MACD", "BB_20_2"])
+    assert set(out) == {"SMA_5", "MACD", "MACD_signal", "MACD_hist", "BB_20_2_mid", "BB_20_2_upper", "BB_20_2_lower"}
+    assert all(len(v) == len(data) for v in out.values())
+
+
+def test_moving_averages_and_bands(data, frame):
+    out = IndicatorService.compute(data, ["SMA_20", "EMA_12", "BB_20_2", "STD_10"])
+    close = frame["close"]
+    _check(out["SMA_20"], close.rolling(20).mean())
+    _check(out["EMA_12"], close.ewm(span=12, adjust=False).mean())
+    mid, std = close.rolling(20).mean(), close.rolling(20).std(ddof=0)
+    _check(out["BB_20_2_mid"], mid)
+    _check(out["BB_20_2_upper"], mid + 2 * std)
+    _check(out["BB_20_2_lower"], mid - 2 * std)
+    _check(out["STD_10"], close.rolling(10).std(ddof=0))
+
+
+def test_macd(data, frame):
+    out = IndicatorService.compute(data, ["MACD_12_26_9"])
+    close = frame["close"]
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    _check(out["MACD_12_26_9"], macd)
+    _check(out["MACD_12_26_9_signal"], signal)
+    _check(out["MACD_12_26_9_hist"], macd - signal)
+
+
+def test_rsi_and_atr_use_wilder_smoothing(data, frame):
+    out = IndicatorService.compute(data, ["RSI_14", "ATR_14"])
+    change = frame["close"].diff()
+    gain, loss = _wilder(change.clip(lower=0), 14, 1), _wilder((-change).clip(lower=0), 14, 1)
+    _check(out["RSI_14"], 100 - 100 / (1 + gain / loss))
+    prev_close = frame["close"].shift(1).fillna(frame["close"])
+    true_range = pd.concat([frame["high"], prev_close], axis=1).max(axis=1) - \
+        pd.concat([frame["low"], prev_close], axis=1).min(axis=1)
+    _check(out["ATR_14"], _wilder(true_range, 14, 0))
+
+
+def test_rsi_is_100_without_losses():
+    up = np.arange(1.0, 31.0)
+    series = BarSeries(np.arange(30, dtype=np.int64), up, up, up, up, np.ones(30))
+    rsi = IndicatorService.compute(series, ["RSI_14"])["RSI_14"]
+    assert np.isnan(rsi[:14]).all() and (rsi[14:] == 100).all()
+
+
+def test_volume_and_momentum_indicators(data, frame):
+    out = IndicatorService.compute(data, ["VWAP", "VWAP_20", "OBV", "ROC_20"])
+    typical = (frame["high"] + frame["low"] + frame["close"]) / 3
+    pv = typical * frame["volume"]
+    _check(out["VWAP"], pv.cumsum() / frame["volume"].cumsum())
+    _check(out["VWAP_20"], pv.rolling(20).sum() / frame["volume"].rolling(20).sum())
+    _check(out["OBV"], (np.sign(frame["close"].diff()).fillna(0) * frame["volume"]).cumsum())
+    _check(out["ROC_20"], frame["close"] / frame["close"].shift(20) - 1)
+
+
+def test_short_series_is_all_nan():
+    series = BarSeries(np.arange(5, dtype=np.int64), *[np.linspace(1, 2, 5)] * 4, np.ones(5))
+    out = IndicatorService.compute(series, ["SMA_20", "RSI_14", "ATR_14", "ROC_20"])
+    assert all(np.isnan(v).all() for v in out.values())
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db import make_engine
+from app.models.migrate import upgrade_database
+from app.models.schemas import Trade
+from app.models.sql_models import HoldingSQL, LotSQL
+from app.services.ledger_service import INITIAL_CASH, LedgerService, LotBook
+
+
+def _trade(day: int, side: str, price: float, quantity: int, symbol: str = "AAPL") -> Trade:
+    return Trade(date=datetime(2024, 1, day), symbol=symbol, trade_type=side, price=price, quantity=quantity)
+
+
+@pytest.fixture
+def db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'ledger.db'}"
+    upgrade_database(url)
+    engine = make_engine(url)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def test_fifo_sells_close_the_oldest_lots_first():
+    book = LotBook("fifo")
+    book.apply("AAPL", "BUY", datetime(2024, 1, 1), 10.0, 10)
+    book.apply("AAPL", "BUY", datetime(2024, 1, 2), 20.0, 10)
+    assert book.apply("AAPL", "SELL", datetime(2024, 1, 3), 25.0, 15) == pytest.approx(10 * 15 + 5 * 5)
+    assert [lot[1:] for lot in book.lots["AAPL"]] == [[20.0, 5]]
+    assert book.held["AAPL"] == 5
+
+
+def test_average_cost_keeps_one_lot():
+    book = LotBook("average")
+    book.apply("AAPL", "BUY", datetime(2024, 1, 1), 10.0, 10)
+    book.apply("AAPL", "BUY", datetime(2024, 1, 2), 20.0, 10)
+    assert book.apply("AAPL", "SELL", datetime(2024, 1, 3), 25.0, 15) == pytest.approx(15 * (25 - 15))
+    assert [lot[1:] for lot in book.lots["AAPL"]] == [[15.0, 5]]
+
+
+def test_selling_more_than_held_is_rejected():
+    book = LotBook("fifo")
+    book.apply("AAPL", "BUY", datetime(2024, 1, 1), 10.0, 10)
+    with pytest.raises(ValueError, match="only 10 held"):
+        book.apply("AAPL", "SELL", datetime(2024, 1, 2), 10.0, 11)
+    with pytest.raises(ValueError, match="Unknown lot method"):
+        LotBook("lifo")
+
+
+def test_record_stores_pnl_lots_holdings_and_cash(db):
+    ledger = LedgerService(db, method="fifo")
+    stored = ledger.record([_trade(1, "BUY", 10.0, 10), _trade(2, "BUY", 20.0, 10), _trade(3, "SELL", 25.0, 15)])
+    assert [t.pnl for t in stored] == [0.0, 0.0, pytest.approx(175.0)]
+    assert ledger.realized_pnl() == pytest.approx(175.0)
+    assert ledger.cost_basis() == {"AAPL": pytest.approx(100.0)}
+    assert db.query(HoldingSQL.quantity).filter(HoldingSQL.symbol == "AAPL").scalar() == 5
+    assert ledger.cash() == pytest.approx(INITIAL_CASH - 100 - 200 + 375)
+
+
+def test_backdated_trade_replays_later_pnl(db):
+    ledger = LedgerService(db, method="fifo")
+    ledger.record([_trade(2, "BUY", 20.0, 10), _trade(5, "SELL", 25.0, 10)])
+    assert ledger.realized_pnl() == pytest.approx(50.0)
+    # An earlier, cheaper lot is now the one the sale closes.
+    ledger.record([_trade(1, "BUY", 10.0, 10)])
+    assert ledger.realized_pnl() == pytest.approx(150.0)
+    assert [(lot.price, lot.quantity) for lot in db.query(LotSQL).all()] == [(20.0, 10)]
+    assert ledger.rebuild()["realized_pnl"] == pytest.approx(150.0)
+
+
+def test_invalid_batch_stores_nothing(db):
+    ledger = LedgerService(db)
+    with pytest.raises(ValueError):
+        ledger.record([_trade(1, "BUY", 10.0, 10), _trade(2, "SELL", 10.0, 20)])
+    assert ledger.realized_pnl() == 0.0 and ledger.cash() == INITIAL_CASH
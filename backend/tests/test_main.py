@@ -0,0 +1,30 @@
+import logging
+
+from fastapi.testclient import TestClient
+
+import main
+from app.services.metrics import registry
+
+
+def test_unhandled_errors_are_recorded_as_500():
+    def boom():
+        raise RuntimeError("boom")
+
+    main.app.add_api_route("/api/test-boom", boom)
+    client = TestClient(main.app, raise_server_exceptions=False)
+    assert client.get("/api/test-boom").status_code == 500
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/test-boom",status="500"} 1' in \
+        client.get("/metrics").text
+
+
+def test_failing_collector_is_logged(caplog):
+    @registry.collector
+    def broken():
+        raise RuntimeError("no data")
+
+    try:
+        with caplog.at_level(logging.ERROR, logger="app.services.metrics"):
+            registry.render()
+        assert "Metrics collector broken failed" in caplog.text
+    finally:
+        registry.collectors.remove(broken)
@@ -0,0 +1,72 @@
+import pytest
+
+from app.services import rate_limit
+from app.services.rate_limit import TokenBucket, is_transient, with_retries
+
+
+class YFRateLimitError(Exception):
+    """Stands in for yfinance's exception of the same name (matched by name)."""
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.taken = []
+
+    def acquire(self, tokens: float = 1) -> None:
+        self.taken.append(tokens)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "sleep", lambda seconds: None)
+
+
+def _failing(errors):
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    return call, calls
+
+
+@pytest.mark.parametrize("error", [ConnectionResetError(), TimeoutError(), YFRateLimitError(), HTTPError(429), HTTPError(503)])
+def test_transient_errors_are_retried(error):
+    assert is_transient(error)
+    call, calls = _failing([error, error])
+    assert with_retries(call) == "ok"
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("error", [ValueError("No data found, symbol may be delisted"), KeyError("Close"), HTTPError(404)])
+def test_other_errors_fail_on_the_first_attempt(error):
+    assert not is_transient(error)
+    call, calls = _failing([error])
+    with pytest.raises(type(error)):
+        with_retries(call)
+    assert len(calls) == 1
+
+
+def test_every_attempt_takes_tokens():
+    limiter = CountingLimiter()
+    call, calls = _failing([ConnectionError(), ConnectionError()])
+    with_retries(call, limiter=limiter, tokens=5)
+    assert limiter.taken == [5, 5, 5]
+
+
+def test_file_backed_buckets_share_one_balance(tmp_path):
+    path = str(tmp_path / "provider.rate")
+    # Two processes' buckets over the same file: the second sees what the first took.
+    first, second = TokenBucket(rate=1, capacity=3, path=path), TokenBucket(rate=1, capacity=3, path=path)
+    assert first._reserve(2) == 0
+    assert second._reserve(1) == 0
+    assert second._reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert first._reserve(1) == pytest.approx(2.0, abs=0.05)
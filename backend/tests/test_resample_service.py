@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app.models.bar_series import BarSeries
+from app.services.resample_service import bucket_starts, normalize_interval, resample
+from conftest import make_series
+
+
+def _ns(*days: str) -> np.ndarray:
+    return np.array(days, dtype="datetime64[ns]").astype(np.int64)
+
+
+def _days(values: np.ndarray) -> list:
+    return np.datetime_as_string(values.view("datetime64[ns]"), unit="D").tolist()
+
+
+def test_calendar_buckets():
+    # 2024-01-04 is a Thursday, 2024-01-07 a Sunday, 2024-01-08 a Monday.
+    dates = _ns("2024-01-04", "2024-01-07", "2024-01-08", "2024-02-29", "2024-04-01")
+    assert _days(bucket_starts(dates, "1wk")) == ["2024-01-01", "2024-01-01", "2024-01-08", "2024-02-26", "2024-04-01"]
+    assert _days(bucket_starts(dates, "1mo")) == ["2024-01-01", "2024-01-01", "2024-01-01", "2024-02-01", "2024-04-01"]
+    assert _days(bucket_starts(dates, "3mo")) == ["2024-01-01", "2024-01-01", "2024-01-01", "2024-01-01", "2024-04-01"]
+
+
+def test_hourly_buckets_start_at_the_session_open():
+    minutes = np.datetime64("2024-01-08T09:30", "ns") + np.arange(390) * np.timedelta64(1, "m")
+    starts = np.unique(bucket_starts(minutes.astype(np.int64), "1h")).view("datetime64[ns]")
+    assert np.datetime_as_string(starts, unit="m").tolist() == [
+        f"2024-01-08T{h:02d}:30" for h in range(9, 16)]
+
+
+def test_resample_aggregates_ohlcv():
+    data = make_series([10, 12, 11, 13, 9, 14, 15], start="2024-01-03", opens=[9, 11, 12, 12, 10, 13, 14])
+    weekly = resample(data, "1wk")
+    assert weekly.interval == "1wk"
+    assert _days(weekly.date) == ["2024-01-01", "2024-01-08"]
+    # 2024-01-03..07 (5 bars), then 2024-01-08..09.
+    assert weekly.open.tolist() == [9, 13]
+    assert weekly.close.tolist() == [9, 15]
+    assert weekly.high.tolist() == pytest.approx([data.high[:5].max(), data.high[5:].max()])
+    assert weekly.low.tolist() == pytest.approx([data.low[:5].min(), data.low[5:].min()])
+    assert weekly.volume.tolist() == [5000, 2000]
+    assert resample(BarSeries.empty("X", "1d"), "1wk").date.size == 0
+
+
+def test_intervals_are_normalized():
+    assert normalize_interval("60m") == "1h" and normalize_interval("1w") == "1wk"
+    with pytest.raises(ValueError, match="Unsupported interval"):
+        normalize_interval("2d")
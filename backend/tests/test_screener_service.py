@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from app.models.bar_series import BarSeries
+from app.services import screener_service
+from app.services.indicator_service import IndicatorService
+from app.services.screener_service import Screener, Universe
+from conftest import make_series
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Count snapshot builds, over a small universe."""
+    calls = []
+    fetch_many = screener_service.DataService.fetch_many
+
+    def counting(symbols, period="1y", interval="1d"):
+        calls.append(len(symbols))
+        return fetch_many(["AAPL", "MSFT", "TCS.NS", "INFY.NS"], period, interval)
+
+    monkeypatch.setattr(screener_service.DataService, "fetch_many", counting)
+    return calls
+
+
+def test_other_processes_load_the_saved_snapshot(tmp_path, builds):
+    path = str(tmp_path / "screener.npz")
+    scheduler, worker = Screener(path), Screener(path)
+    built = scheduler.refresh(scheduler.current())
+    loaded = worker.universe()
+    assert len(builds) == 1
+    assert loaded.symbols == built.symbols and loaded.built_at == built.built_at
+    for name in ("close", "RSI_14", "SMA_50"):
+        np.testing.assert_array_equal(loaded.field(name), built.field(name))
+    assert worker.screen(filter="close > 0")["matched"] == len(built.symbols)
+
+
+def test_a_newer_snapshot_replaces_the_loaded_one(tmp_path, builds):
+    path = str(tmp_path / "screener.npz")
+    scheduler, worker = Screener(path), Screener(path)
+    scheduler.refresh(None)
+    first = worker.universe()
+    second = scheduler.refresh(scheduler.current())
+    assert worker.universe().built_at == second.built_at > first.built_at
+    assert len(builds) == 2
+
+
+def test_expired_snapshot_is_rebuilt(tmp_path, builds, monkeypatch):
+    path = str(tmp_path / "screener.npz")
+    Screener(path).refresh(None)
+    monkeypatch.setattr(screener_service, "SCREENER_REFRESH", -1)
+    Screener(path).universe()
+    assert len(builds) == 2
+
+
+def _without(data, holidays):
+    keep = ~holidays
+    return BarSeries(data.date[keep], data.open[keep], data.high[keep], data.low[keep], data.close[keep],
+                     data.volume[keep], symbol=data.symbol)
+
+
+def test_fields_use_each_symbols_own_bars():
+    # Two calendars with different holidays, plus a symbol that stopped trading long ago.
+    rng = np.random.default_rng(7)
+    us = make_series(100 + rng.normal(0, 1, 120).cumsum(), symbol="US")
+    nse = make_series(200 + rng.normal(0, 1, 120).cumsum(), start="2024-01-02", symbol="NSE.NS")
+    us = _without(us, np.arange(len(us)) % 7 == 3)
+    nse = _without(nse, np.arange(len(nse)) % 9 == 5)
+    stale = make_series(np.linspace(10, 20, 50), start="2023-01-01", symbol="OLD")
+    universe = Universe({"US": us, "NSE.NS": nse, "OLD": stale}, lookback=60)
+    assert universe.symbols == ["US", "NSE.NS"]
+    assert universe.as_of == max(us.date[-1], nse.date[-1])
+    for j, data in enumerate((us, nse)):
+        expected = IndicatorService.compute(data[-60:], ["SMA_20", "RSI_14", "EMA_10", "BB_20_2"])
+        for name in ("SMA_20", "RSI_14", "EMA_10", "BB_20_2_upper"):
+            assert universe.field(name)[j] == pytest.approx(expected[name][-1])
+        assert universe.field("close")[j] == data.close[-1]
+
+
+def test_numeric_filter_keeps_nonzero_values(tmp_path, builds):
+    screener = Screener(str(tmp_path / "screener.npz"))
+    everything = screener.screen(filter="close > 0")["matched"]
+    assert screener.screen(filter="close")["matched"] == everything
+    assert screener.screen(filter="close - close")["matched"] == 0
+    assert screener.screen(filter="rsi_14")["matched"] == int((~np.isnan(screener.universe().field("RSI_14"))).sum())
@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services import serialization
+from app.services.serialization import encode_table, negotiate
+
+
+@pytest.fixture
+def columns():
+    dates = np.array(["2024-01-02T00:00", "2024-01-03T00:00", "2024-01-04T14:30"], dtype="datetime64[ns]").astype(np.int64)
+    return {"date": dates, "close": np.array([10.5, np.nan, 11.25]), "volume": np.array([100, 200, 300], dtype=np.int64)}
+
+
+ISO = ["2024-01-02T00:00:00", "2024-01-03T00:00:00", "2024-01-04T14:30:00"]
+
+
+def test_json_rows(columns):
+    assert json.loads(encode_table(columns, "json")) == [
+        {"date": ISO[0], "close": 10.5, "volume": 100},
+        {"date": ISO[1], "close": None, "volume": 200},
+        {"date": ISO[2], "close": 11.25, "volume": 300},
+    ]
+
+
+def test_columnar_round_trip(columns):
+    body = json.loads(encode_table(columns, "columnar", {"symbol": "AAPL"}))
+    assert body == {"symbol": "AAPL", "date": ISO, "close": [10.5, None, 11.25], "volume": [100, 200, 300]}
+
+
+def test_msgpack_round_trip(columns):
+    msgpack = pytest.importorskip("msgpack")
+    body = msgpack.unpackb(encode_table(columns, "msgpack", {"symbol": "AAPL"}))
+    assert body["symbol"] == "AAPL"
+    assert body["date"] == (columns["date"] // 1_000_000).tolist()
+    np.testing.assert_array_equal(body["close"], columns["close"])  # NaN kept
+    assert body["volume"] == [100, 200, 300]
+
+
+def test_arrow_round_trip(columns):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(encode_table(columns, "arrow", {"symbol": "AAPL"})).read_all()
+    assert json.loads(table.schema.metadata[b"meta"]) == {"symbol": "AAPL"}
+    assert str(table.schema.field("date").type) == "timestamp[ns]"
+    np.testing.assert_array_equal(table.column("date").to_numpy().astype(np.int64), columns["date"])
+    assert table.column("close").to_pylist() == [10.5, None, 11.25]
+    assert table.column("volume").to_pylist() == [100, 200, 300]
+
+
+def test_unknown_format_is_rejected(columns):
+    with pytest.raises(ValueError, match="Unsupported format"):
+        encode_table(columns, "xml")
+
+
+def test_negotiate_by_q_value_then_header_order():
+    assert negotiate(None) == "json"
+    assert negotiate("application/x-msgpack;q=0.5, application/vnd.columnar+json") == "columnar"
+    assert negotiate("application/vnd.columnar+json;q=0.8, application/x-msgpack;q=0.9") == "msgpack"
+    # Equal q: the first listed wins.
+    assert negotiate("application/vnd.msgpack, application/json") == "msgpack"
+
+
+def test_negotiate_skips_q_zero_and_unknown_types():
+    assert negotiate("application/x-msgpack;q=0, application/json;q=0.1") == "json"
+    assert negotiate("text/html, application/xml;q=0.9, application/json;q=0.5") == "json"
+    assert negotiate("application/json;q=bogus, application/x-msgpack;q=0.1") == "msgpack"
+    with pytest.raises(ValueError, match="None of the accepted media types"):
+        negotiate("text/html, application/json;q=0")
+
+
+def test_negotiate_wildcards_mean_json():
+    assert negotiate("*/*") == "json"
+    assert negotiate("text/html, application/*;q=0.5") == "json"
+    with pytest.raises(ValueError):
+        negotiate("text/*")
+
+
+def test_explicit_format_wins_and_missing_packages_are_skipped(monkeypatch):
+    assert negotiate("application/json", fmt="columnar") == "columnar"
+    with pytest.raises(ValueError, match="Unsupported format"):
+        negotiate(None, fmt="xml")
+    monkeypatch.setitem(serialization._REQUIRES, "msgpack", "no_such_module_for_tests")
+    assert negotiate("application/x-msgpack, application/json;q=0.5") == "json"
+    with pytest.raises(ValueError):
+        negotiate(None, fmt="msgpack")
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.signal_service import SignalService, _crossings
+from app.services.synthetic_market import synthetic_market
+from conftest import make_series
+
+
+def _legacy_sma_cross(data, short_window, long_window):
+    """The original iterrows implementation, kept as the reference: (date ns, type, price) per signal."""
+    df = pd.DataFrame({"close": data.close}, index=data.date)
+    short = df["close"].rolling(window=short_window).mean()
+    long = df["close"].rolling(window=long_window).mean()
+    df["Signal"] = 0
+    df.loc[short > long, "Signal"] = 1
+    df.loc[short < long, "Signal"] = -1
+    df["Position"] = df["Signal"].diff()
+    signals = []
+    for date, row in df.iterrows():
+        if row["Position"] == 2:
+            signals.append((date, "BUY", row["close"]))
+        elif row["Position"] == -2:
+            signals.append((date, "SELL", row["close"]))
+    return signals
+
+
+def test_crossings_fire_on_the_flip_bar():
+    fast = np.array([np.nan, 1.0, 3.0, 3.0, 1.0, 2.0, 2.0, 3.0])
+    slow = np.array([np.nan, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0])
+    buys, sells = _crossings(fast, slow)
+    # Below -> above on bar 2, above -> below on bar 4. Touching (bar 5-6) and then
+    # leaving upward is not a cross, nor is the first bar out of NaN.
+    assert buys.tolist() == [2] and sells.tolist() == [4]
+
+
+def test_scan_matches_the_legacy_iterrows_signals():
+    bars = synthetic_market.paths(["SIG"], 1500)["SIG"]
+    data = make_series(bars["close"], symbol="SIG")
+    for short, long in ((5, 20), (20, 50), (50, 200)):
+        expected = _legacy_sma_cross(data, short, long)
+        assert expected, "the synthetic path should cross"
+        table = SignalService.scan([data], [{"name": "SMA_CROSS", "short_window": short, "long_window": long}])
+        assert list(zip(table["date"].tolist(), table["signal_type"].tolist(), table["price"].tolist())) == \
+            [(int(d), t, pytest.approx(p)) for d, t, p in expected]
+        assert set(table["symbol"]) == {"SIG"} and set(table["strategy"]) == {"SMA_CROSS"}
+        signals = SignalService.generate_sma_cross_signals(data, short, long)
+        assert [(s.signal_type, s.price) for s in signals] == [(t, pytest.approx(p)) for _, t, p in expected]
+        assert [np.datetime64(s.date, "ns").astype(np.int64) for s in signals] == [int(d) for d, _, _ in expected]
+
+
+def test_scan_merges_symbols_by_date_and_filters_since():
+    series = [make_series(synthetic_market.paths([s], 600)[s]["close"], symbol=s) for s in ("A", "B")]
+    strategies = [{"name": "SMA_CROSS", "short_window": 5, "long_window": 20}, {"name": "RSI"}]
+    table = SignalService.scan(series, strategies)
+    assert (np.diff(table["date"]) >= 0).all()
+    assert set(table["symbol"]) == {"A", "B"} and set(table["strategy"]) == {"SMA_CROSS", "RSI"}
+    since = int(table["date"][len(table["date"]) // 2])
+    later = SignalService.scan(series, strategies, since=since)
+    keep = table["date"] >= since
+    for column in ("date", "signal_type", "symbol"):
+        assert sorted(zip(later["date"].tolist(), later[column].tolist())) == \
+            sorted(zip(table["date"][keep].tolist(), table[column][keep].tolist()))
+    with pytest.raises(ValueError, match="Unknown strategy"):
+        SignalService.scan(series, [{"name": "NOPE"}])
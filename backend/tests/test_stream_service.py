@@ -0,0 +1,107 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.models.db import SessionLocal
+from app.models.schemas import AlertRule
+from app.services.alert_service import AlertEngine, AlertService
+from app.services.stream_service import FakePriceFeed, StreamHub, Subscriber
+
+
+def _day(date_ns: int) -> str:
+    return str(np.datetime64(int(date_ns), "ns").astype("datetime64[D]"))
+
+
+async def _collect(subscriber: Subscriber, count: int, timeout: float = 2.0) -> list:
+    messages = []
+    while len(messages) < count:
+        batch = await subscriber.next_batch(timeout=timeout)
+        if not batch:
+            break
+        messages += batch
+    return messages
+
+
+async def _alerts(subscriber: Subscriber, timeout: float) -> list:
+    """Alert messages received within `timeout` seconds (bar updates are skipped)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    alerts = []
+    while not alerts and loop.time() < deadline:
+        batch = await subscriber.next_batch(timeout=deadline - loop.time())
+        alerts += [m for m in batch if m["type"] == "alert"]
+    return alerts
+
+
+def test_quotes_update_the_last_session_bar_until_a_new_session_opens(database):
+    async def scenario():
+        feed = FakePriceFeed(seed=1)
+        hub = StreamHub(feed=feed, poll_interval=0.01, snapshot_period="1mo")
+        subscriber = Subscriber()
+        await hub.subscribe(subscriber, ["AAPL"])
+        last_bar = hub.history["AAPL"].date[-1]
+        try:
+            (snapshot,) = await _collect(subscriber, 1)
+            assert snapshot["type"] == "snapshot"
+            same_session = await _collect(subscriber, 3)
+            session = feed.next_session()
+            new_session = await _collect(subscriber, 3)
+        finally:
+            hub.unsubscribe(subscriber)
+            hub.stop()
+        return last_bar, session, same_session, new_session
+
+    last_bar, session, same_session, new_session = asyncio.run(scenario())
+    # However long the polls run (weekend, holiday, pre-open), no bar until the session changes.
+    assert {m["bar"]["date"][:10] for m in same_session} == {_day(last_bar)}
+    assert {m["bar"]["date"][:10] for m in new_session} == {_day(session)}
+    assert np.is_busday(np.datetime64(_day(session))) and session > last_bar
+    first = new_session[0]["bar"]
+    assert first["open"] == first["close"] and first["volume"] == 0
+
+
+def test_stale_quotes_are_ignored():
+    hub = StreamHub(feed=FakePriceFeed())
+    hub._on_price("AAPL", 2 * 86_400_000_000_000, 100.0)
+    hub._on_price("AAPL", 86_400_000_000_000, 90.0)
+    assert hub.bars["AAPL"]["close"] == 100.0
+
+
+def test_alerts_reach_subscribers_of_the_symbol(database, tmp_path):
+    with SessionLocal() as db:
+        rule = AlertService(db).create_rule(AlertRule(symbol="MSFT", indicator="close", operator=">", threshold=0))
+
+    async def scenario():
+        # The engine hands nothing to the hub directly: as in a worker that does not
+        # run the scheduler, alerts arrive through the alerts table.
+        hub = StreamHub(feed=FakePriceFeed(), poll_interval=0.05)
+        engine = AlertEngine(state_path=str(tmp_path / "state.json"))
+        watching, other = Subscriber(), Subscriber()
+        await hub.subscribe(watching, ["MSFT"])
+        await hub.subscribe(other, ["AAPL"])
+        try:
+            await _collect(watching, 1)
+            await _collect(other, 1)
+
+            def tick():
+                with SessionLocal() as db:
+                    return engine.tick(db)
+
+            stats = await asyncio.to_thread(tick)
+            received = await _alerts(watching, timeout=2.0)
+            unrelated = await _alerts(other, timeout=0.3)
+        finally:
+            for subscriber in (watching, other):
+                hub.unsubscribe(subscriber)
+            hub.stop()
+        return stats, received, unrelated
+
+    try:
+        stats, received, unrelated = asyncio.run(scenario())
+    finally:
+        with SessionLocal() as db:
+            AlertService(db).delete_rule(rule.id)
+    assert stats["new_alerts"] >= 1
+    assert [(m["rule_id"], m["symbol"]) for m in received] == [(rule.id, "MSFT")]
+    assert unrelated == []
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from app.models.bar_series import BarSeries
+from app.services.indicator_service import IndicatorService
+from app.services.streaming_indicators import IndicatorState
+from app.services.synthetic_market import synthetic_market
+
+SPECS = ["SMA_20", "EMA_20", "RSI_14", "MACD_12_26_9", "BB_20_2", "ATR_14"]
+
+
+@pytest.fixture(scope="module")
+def data() -> BarSeries:
+    bars = synthetic_market.paths(["STREAM"], 400)["STREAM"]
+    dates = (np.datetime64("2020-01-01", "ns") + np.arange(400) * np.timedelta64(1, "D")).astype(np.int64)
+    return BarSeries(dates, bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"], symbol="STREAM")
+
+
+def test_streaming_matches_batch_on_every_bar(data):
+    batch = IndicatorService.compute(data, SPECS)
+    state = IndicatorState(data.symbol, SPECS)
+    for i in range(len(data)):
+        state.update(int(data.date[i]), float(data.close[i]), float(data.high[i]), float(data.low[i]))
+        for name, value in state.values().items():
+            expected = batch[name][i]
+            if np.isnan(expected):
+                assert np.isnan(value), (name, i)
+            else:
+                assert value == pytest.approx(expected, rel=1e-9, abs=1e-9), (name, i)
+
+
+def test_snapshot_round_trip_continues_identically(data):
+    half = len(data) // 2
+    straight = IndicatorState.from_series(data, SPECS)
+    resumed = IndicatorState.restore(IndicatorState.from_series(data[:half], SPECS).snapshot())
+    assert resumed.update_many(data) == len(data) - half
+    assert resumed.values() == straight.values()
+
+
+def test_preview_leaves_the_state_untouched(data):
+    state = IndicatorState.from_series(data[:-1], SPECS)
+    before = state.snapshot()
+    preview = state.preview(int(data.date[-1]), float(data.close[-1]), float(data.high[-1]), float(data.low[-1]))
+    assert state.snapshot() == before
+    assert preview == IndicatorState.from_series(data, SPECS).values()
@@ -0,0 +1,64 @@
+import pytest
+
+from app.services.symbol_catalog import SymbolCatalog
+
+LISTINGS = """symbol,name,exchange
+TATAMOTORS.NS,Tata Motors Limited,NSE
+TATASTEEL.NS,Tata Steel Limited,NSE
+TATAMOTORS.BO,Tata Motors Limited,BSE
+MOTOGP,Motor Grand Prix Holdings,NYSE
+AMOT,Allied Motion Technologies,NASDAQ
+XMOTX,Example Holdings,NYSE
+T,AT&T Inc.,NYSE
+TSLA,Tesla Inc.,NASDAQ
+AAPL,Apple Inc.,NASDAQ
+"""
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / "symbols.csv"
+    path.write_text(LISTINGS)
+    return SymbolCatalog(str(path))
+
+
+def _symbols(results):
+    return [r["symbol"] for r in results]
+
+
+def test_exact_symbol_then_base_then_prefix(catalog):
+    assert _symbols(catalog.search("t"))[:2] == ["T", "TSLA"]
+    # The bare base finds both exchange listings ahead of other prefix matches.
+    assert _symbols(catalog.search("tatamotors")) == ["TATAMOTORS.BO", "TATAMOTORS.NS"]
+    assert _symbols(catalog.search("TATAMOTORS.NS"))[0] == "TATAMOTORS.NS"
+
+
+def test_symbol_prefix_beats_name_token_beats_substring(catalog):
+    # MOTOGP starts with "MOT"; Allied Motion and Tata Motors have a name token
+    # starting with it (shorter symbols first within a class); XMOTX only contains it.
+    assert _symbols(catalog.search("mot")) == ["MOTOGP", "AMOT", "TATAMOTORS.BO", "TATAMOTORS.NS", "XMOTX"]
+
+
+def test_every_name_token_must_match(catalog):
+    assert _symbols(catalog.search("tata mot")) == ["TATAMOTORS.BO", "TATAMOTORS.NS"]
+    assert _symbols(catalog.search("tata st")) == ["TATASTEEL.NS"]
+    assert catalog.search("tata xyz") == []
+
+
+def test_single_character_only_matches_symbols(catalog):
+    # "A" prefixes AT&T's and Allied's name tokens, but one character is symbols only.
+    assert _symbols(catalog.search("a")) == ["AAPL", "AMOT"]
+
+
+def test_limit_keeps_the_best_matches(catalog):
+    # Ties within a class go to the shorter symbol, then alphabetically.
+    assert _symbols(catalog.search("ta", limit=2)) == ["TATASTEEL.NS", "TATAMOTORS.BO"]
+    assert len(catalog.search("", limit=3)) == 3
+    assert catalog.search("zzz") == []
+
+
+def test_lookup_and_symbols(catalog):
+    assert len(catalog) == 9
+    assert catalog.get("tsla")["name"] == "Tesla Inc."
+    assert catalog.get("NOPE") is None
+    assert "AAPL" in catalog.symbols()
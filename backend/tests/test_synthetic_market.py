@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import numpy as np
+
+from app.services.synthetic_market import SyntheticMarket
+
+
+def test_intraday_day_is_the_same_whatever_the_range():
+    market = SyntheticMarket(seed=1)
+    end = datetime(2024, 3, 8, 23, 59)
+    wide = market.intraday(["AAPL"], 1, datetime(2024, 3, 1), end)["AAPL"]
+    narrow = market.intraday(["AAPL"], 1, datetime(2024, 3, 6), end)["AAPL"]
+    overlap = np.searchsorted(wide["date"], narrow["date"][0])
+    assert len(narrow["date"]) == 3 * 390
+    for column in ("date", "open", "high", "low", "close", "volume"):
+        np.testing.assert_array_equal(wide[column][overlap:], narrow[column])
+
+
+def test_intraday_agrees_with_daily_bars():
+    market = SyntheticMarket(seed=1)
+    bars = market.intraday(["MSFT"], 1, datetime(2024, 3, 4), datetime(2024, 3, 4, 23, 59))["MSFT"]
+    daily = market.daily(["MSFT"], datetime(2024, 3, 4), datetime(2024, 3, 4))["MSFT"]
+    assert bars["open"][0] == daily["open"][0]
+    assert np.isclose(bars["close"][-1], daily["close"][0])
@@ -0,0 +1,118 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.db import make_engine
+from app.models.migrate import upgrade_database
+from app.models.schemas import Trade
+from app.services import valuation_service
+from app.services.ledger_service import INITIAL_CASH, LedgerService
+from app.services.valuation_service import QuoteCache, ValuationService
+
+
+class FakeProvider:
+    """Stands in for DataService.get_current_prices; symbols listed in `slow` block until released."""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+        self.slow = set()
+        self.release = threading.Event()
+
+    def __call__(self, symbols):
+        self.calls.append(sorted(symbols))
+        if self.slow & set(symbols):
+            self.release.wait(5)
+        return {s: self.prices[s] for s in symbols if s in self.prices}
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = FakeProvider({"AAPL": 200.0, "MSFT": 400.0})
+    monkeypatch.setattr(valuation_service.DataService, "get_current_prices", fake)
+    return fake
+
+
+@pytest.fixture
+def db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'valuation.db'}"
+    upgrade_database(url)
+    engine = make_engine(url)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def test_quotes_are_cached_until_they_expire(provider):
+    quotes = QuoteCache(ttl=60)
+    assert quotes.get_many(["AAPL", "MSFT"]) == {"AAPL": 200.0, "MSFT": 400.0}
+    assert quotes.get_many(["MSFT"]) == {"MSFT": 400.0}
+    assert provider.calls == [["AAPL", "MSFT"]]
+    expiring = QuoteCache(ttl=-1)
+    expiring.get_many(["AAPL"])
+    provider.prices.pop("AAPL")
+    # Nothing new from the provider: the last known price is kept.
+    assert expiring.get_many(["AAPL"]) == {"AAPL": 200.0}
+    assert len(provider.calls) == 3
+
+
+def test_a_slow_fetch_does_not_block_cached_symbols(provider):
+    quotes = QuoteCache(ttl=60)
+    quotes.get_many(["MSFT"])
+    provider.prices["SLOW"] = 1.0
+    provider.slow = {"SLOW"}
+    blocked = threading.Thread(target=quotes.get_many, args=(["SLOW"],))
+    blocked.start()
+    try:
+        started = time.monotonic()
+        assert quotes.get_many(["MSFT"]) == {"MSFT": 400.0}
+        assert time.monotonic() - started < 1
+    finally:
+        provider.release.set()
+        blocked.join()
+
+
+def test_concurrent_callers_share_one_fetch(provider):
+    quotes = QuoteCache(ttl=60)
+    provider.slow = {"AAPL"}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(quotes.get_many(["AAPL"]))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    provider.release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [{"AAPL": 200.0}] * 4
+    assert provider.calls == [["AAPL"]] and quotes.fetches == 1
+
+
+def test_value_marks_holdings_to_market(provider, db):
+    LedgerService(db, method="fifo").record([
+        Trade(date=datetime(2024, 1, 2), symbol="AAPL", trade_type="BUY", price=150.0, quantity=10),
+        Trade(date=datetime(2024, 1, 3), symbol="MSFT", trade_type="BUY", price=300.0, quantity=5),
+        Trade(date=datetime(2024, 1, 4), symbol="GONE", trade_type="BUY", price=10.0, quantity=3),
+        Trade(date=datetime(2024, 1, 5), symbol="AAPL", trade_type="SELL", price=180.0, quantity=4),
+    ])
+    portfolio = ValuationService(db, QuoteCache()).value()
+    cash = INITIAL_CASH - 1500 - 1500 - 30 + 720
+    assert portfolio.cash == pytest.approx(cash)
+    assert portfolio.holdings == {"AAPL": 6, "GONE": 3, "MSFT": 5}
+    assert portfolio.market_value == pytest.approx(6 * 200 + 5 * 400)
+    assert portfolio.total_value == pytest.approx(cash + 3200)
+    assert portfolio.realized_pnl == pytest.approx(4 * 30)
+    assert portfolio.unrealized_pnl == pytest.approx(6 * 50 + 5 * 100)
+    assert portfolio.unpriced == ["GONE"]
+    positions = {p.symbol: p for p in portfolio.positions}
+    assert positions["AAPL"].cost_basis == pytest.approx(900.0)
+    assert positions["MSFT"].weight == pytest.approx(2000 / portfolio.total_value)
+    assert positions["GONE"].price is None and positions["GONE"].market_value is None
+
+
+def test_empty_portfolio_is_all_cash(provider, db):
+    portfolio = ValuationService(db, QuoteCache()).value()
+    assert portfolio.total_value == INITIAL_CASH and portfolio.positions == []
+    assert provider.calls == []
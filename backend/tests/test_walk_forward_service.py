@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from app.models.bar_series import BarSeries
+from app.services.backtest_service import BacktestService
+from app.services.synthetic_market import synthetic_market
+from app.services.walk_forward_service import WalkForwardService, _score_windows, _windows
+
+
+def test_rolling_windows_tile_the_test_bars():
+    assert _windows(10, 4, 3, "rolling") == [(0, 4, 7), (3, 7, 10)]
+    # The last test window is cut short at the end of the series.
+    assert _windows(11, 4, 3, "rolling") == [(0, 4, 7), (3, 7, 10), (6, 10, 11)]
+
+
+def test_anchored_windows_train_from_the_first_bar():
+    assert _windows(11, 4, 3, "anchored") == [(0, 4, 7), (0, 7, 10), (0, 10, 11)]
+    assert _windows(4, 4, 3, "anchored") == []
+
+
+def test_out_of_sample_curve_stitches_the_test_windows():
+    bars = synthetic_market.paths(["WF"], 900)["WF"]
+    dates = (np.datetime64("2020-01-01", "ns") + np.arange(900) * np.timedelta64(1, "D")).astype(np.int64)
+    data = BarSeries(dates, bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"], symbol="WF")
+    result = WalkForwardService.run_sma_cross(data, [5, 10, 20], [50, 100], train_bars=300, test_bars=100,
+                                              parallel=False)
+    assert result["windows"] == 6
+    curve = result["equity_curve"]
+    # The curve starts at the close before the first test bar and runs to the last bar.
+    assert len(curve["date"]) == len(curve["equity"]) == 900 - 300 + 1
+    assert curve["date"][0] == result["report"][0]["train_end"]
+    growth = 1.0
+    for window in result["report"]:
+        test_start = int(np.searchsorted(dates, np.datetime64(window["test_start"], "ns").astype(np.int64)))
+        test_end = int(np.searchsorted(dates, np.datetime64(window["test_end"], "ns").astype(np.int64))) + 1
+        # The chosen pair's own backtest over the test bars plus the close before them.
+        single = BacktestService.run_sma_cross_backtest(data, short_window=window["short_window"],
+                                                        long_window=window["long_window"])
+        equity = np.array(list(single["equity_curve"].values()))
+        growth *= equity[test_end - 1] / equity[test_start - 1]
+    assert result["final_value"] == pytest.approx(result["initial_capital"] * growth)
+
+
+def test_max_drawdown_ignores_pairs_that_never_trade():
+    rng = np.random.default_rng(3)
+    cash = np.zeros(99)
+    calm = rng.normal(0.001, 0.002, 99)
+    wild = rng.normal(0.001, 0.03, 99)
+    returns = np.vstack([cash, wild, calm])
+    scored = _score_windows(returns, 0, _windows(100, 60, 40, "rolling"), "max_drawdown")
+    assert [row["best"] for row in scored] == [2]
+    # With nobody invested there is nothing to exclude.
+    assert _score_windows(np.zeros((2, 99)), 0, _windows(100, 60, 40, "rolling"), "max_drawdown")[0]["best"] == 0